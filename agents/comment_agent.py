@@ -1,21 +1,22 @@
-from utils.gpt_api_utils import call_gpt, load_prompt
+from utils.gpt_api_utils import call_gpt
+from utils.prompt_registry import get_prompt_registry
 
 class CommentAgent:
     def __init__(self, prompt_path="config/prompts/comment_agent.txt"):
         self.prompt_path = prompt_path
+        self.prompts = get_prompt_registry()
+        self.prompts.get(prompt_path)
 
     def generate_comment(self, department: str, document: str):
         """
         생활기록부 주요 내용 요약 및 코멘트 생성
         """
         # 프롬프트 불러오기 + 변수 치환
-        prompt = load_prompt(
+        system_prompt, user_prompt = self.prompts.render(
             self.prompt_path,
             department=department,
             document=document
         )
-
-        system_prompt, user_prompt= prompt.split("---", 1)
         # ChatGPT API 호출
         comment = call_gpt(system_prompt, user_prompt)
         return comment
\ No newline at end of file
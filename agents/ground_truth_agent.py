@@ -1,46 +1,55 @@
 import re
 from typing import List
-from utils.gpt_api_utils import call_gpt, load_prompt
+from utils.gpt_api_utils import call_gpt, STRUCTURED_OUTPUT
+from utils.llm_cache import get_llm_cache
+from utils.prompt_registry import get_prompt_registry
+from utils.structured_output import (GROUND_TRUTH_SCHEMA, with_json_instruction, parse_ground_truth, fill_missing,
+                                     map_reask_answers)
 class GroundTruthAgent:
-    def __init__(self, prompt_path="config/prompts/ground_truth_agent.txt"):
+    def __init__(self, prompt_path="config/prompts/ground_truth_agent.txt", structured_output=STRUCTURED_OUTPUT):
         self.prompt_path = prompt_path
+        self.prompts = get_prompt_registry()
+        self.prompts.get(prompt_path)
+        # True면 JSON schema structured output으로 받고, 아니면 텍스트 응답을 파싱
+        self.structured_output = structured_output
 
-    def generate_ground_truth(self, department: str, document: str, questions: List[str]):
-        """
-        생성된 질문에 ground truth 생성
-        """
+    def question_key(self, question: str, position: int) -> str:
+        """응답에서 질문을 가리키는 번호 ("순위. [카테고리]질문"이면 순위, 아니면 1부터의 위치)."""
+        match = re.match(r'^\s*\(?(\d+)\)?[.)]', question)
+        return match.group(1) if match else str(position)
+
+    def request_ground_truth(self, department: str, document: str, questions: List[str]):
         # 프롬프트 불러오기 + 변수 치환
-        prompt = load_prompt(
+        system_prompt, user_prompt = self.prompts.render(
             self.prompt_path,
             department=department,
             document=document,
             questions=questions
         )
 
-        system_prompt, user_prompt= prompt.split("---", 1)
-        
         # ChatGPT API 호출
-        result = call_gpt(system_prompt, user_prompt, 0.8)
+        if self.structured_output:
+            result = call_gpt(system_prompt, with_json_instruction(user_prompt, GROUND_TRUTH_SCHEMA), 0.8,
+                              json_schema=GROUND_TRUTH_SCHEMA)
+        else:
+            result = call_gpt(system_prompt, user_prompt, 0.8)
         print(result)
-        ground_truth={}
-        # 정규식으로 groundtruth 전처리        
-        # 패턴 1
-        pattern1 = re.compile(r'\(?(\d+)\)?\s*:\s*\[(.*?)\]', re.DOTALL)
-        matches1 = pattern1.findall(result)
+        return parse_ground_truth(result)
 
-        for key, val in matches1:
-            # 쉼표 기준으로 나누고, 빈 문자열 제거
-            answers = [a.strip().strip('()"') for a in val.split('.,') if a.strip()]
-            ground_truth[key] = answers
+    def generate_ground_truth(self, department: str, document: str, questions: List[str]):
+        """
+        생성된 질문에 ground truth 생성
+        응답에서 빠진 질문은 그 질문들만 다시 요청해서 채움
+        """
+        keys = [self.question_key(q, i) for i, q in enumerate(questions, start=1)]
+        ground_truth = self.request_ground_truth(department, document, questions)
 
-        # 2) 괄호 패턴: (숫자): [(답변1), (답변2), ...]
-        pattern2 = re.compile(r'\(?(\d+)\)?\s*:\s*\[\s*(\([^\]]*?\))\s*\]', re.DOTALL)
-        matches2 = pattern2.findall(result)
+        def ask(missing_keys):
+            missing = [(key, q) for key, q in zip(keys, questions) if key in missing_keys]
+            # 캐시에서 읽으면 이전 실행에서 같은 번호를 빠뜨린 같은 응답이 돌아옴
+            with get_llm_cache().refresh():
+                answers = self.request_ground_truth(department, document, [q for _, q in missing])
+            # 다시 요청한 질문을 원래 번호 대신 1부터 새로 매겨 답하는 경우도 받아들임
+            return map_reask_answers(answers, [key for key, _ in missing])
 
-        for key, val in matches2:
-            # 괄호 안 문자열 추출
-            answers = re.findall(r'\((.*?)\)', val, re.DOTALL)
-            answers = [a.strip().replace('"',"").replace("'","") for a in answers if a.strip()]
-            ground_truth[key] = answers
-            
-        return ground_truth
\ No newline at end of file
+        return fill_missing(ground_truth, keys, ask)
@@ -1,51 +1,80 @@
-import re
+from collections import Counter
 from typing import List
-from utils.gpt_api_utils import call_gpt, load_prompt
+from utils.gpt_api_utils import call_gpt, STRUCTURED_OUTPUT
+from utils.prompt_registry import get_prompt_registry
+from utils.structured_output import (PRIORITY_SCHEMA, with_json_instruction, parse_priority, parse_priority_line,
+                                    clean_priority_question)
 class PriorityAgent:
-    def __init__(self, prompt_path="config/prompts/priority_agent.txt"):
+    def __init__(self, prompt_path="config/prompts/priority_agent.txt", structured_output=STRUCTURED_OUTPUT):
         self.prompt_path = prompt_path
+        self.prompts = get_prompt_registry()
+        self.prompts.get(prompt_path)
+        # True면 JSON schema structured output으로 받고, 아니면 텍스트 응답을 파싱
+        self.structured_output = structured_output
 
     def clean_question(self, question: str) -> str:
-        # 번호 제거
-        question = re.sub(r'^\d+\).?\s*', '', question)
-        # category 뒤 나머지 텍스트만 추출
-        parts = re.split(r'\[.*?\]', question, maxsplit=1)
-        return parts[-1].strip().replace('\"',"").replace("'","") if parts else question.strip().replace('\"',"").replace("'","")
+        # 번호, level, category 제거
+        return clean_priority_question(question)
 
     def parse_question(self, question: str) -> dict:
-        # ranking 추출 (앞번호)
-        ranking = question.split(")")[0].split(".")[0].strip()
-        
-        # level 추출
-        level_match = re.search(r'level:(\d+)', question)
-        level = int(level_match.group(1)) if level_match else None
+        # "(순위). level:(난이도)\t[카테고리](질문)" 한 줄을 정규식 한 번으로 분해
+        parsed = parse_priority_line(question)
+        if parsed is None:
+            return {"ranking": None, "level": None, "category": None, "question": self.clean_question(question)}
+        return parsed
 
-        # category 추출
-        cat_match = re.search(r'\[(.*?)\]', question)
-        category = cat_match.group(1) if cat_match else None
-
-        # 질문 내용
-        q_text = self.clean_question(question)
-
-        return {
-            "ranking": ranking,
-            "level": level,
-            "category": category,
-            "question": q_text
-        }
-
-    def generate_priority(self, department: str, questions: List[str]):
-        prompt = load_prompt(
+    def request_priority(self, department: str, questions: List[str]):
+        system_prompt, user_prompt = self.prompts.render(
             self.prompt_path,
             department=department,
             questions=questions,
         )
-        system_prompt, user_prompt = prompt.split("---", 1)
 
         # ChatGPT API 호출
-        result = call_gpt(system_prompt, user_prompt)
+        if self.structured_output:
+            result = call_gpt(system_prompt, with_json_instruction(user_prompt, PRIORITY_SCHEMA),
+                              json_schema=PRIORITY_SCHEMA)
+        else:
+            result = call_gpt(system_prompt, user_prompt)
+        return parse_priority(result)
+
+    def find_missing(self, questions: List[str], ranked: List[dict]) -> List[int]:
+        """순위 목록에 빠진 입력 질문의 위치(0부터)."""
+        if all(item.get("index") for item in ranked):
+            # structured output은 입력 질문 번호를 함께 돌려줌
+            seen = {item["index"] for item in ranked}
+            return [i for i in range(len(questions)) if i + 1 not in seen]
+        if len(ranked) >= len(questions):
+            return []
+        # 텍스트 응답은 질문 내용으로 맞춰 보고, 빠진 개수와 정확히 맞을 때만 빠진 질문으로 판단
+        # (모델이 질문을 다듬어 쓰면 내용이 달라져 다시 요청할 대상을 특정할 수 없음)
+        remaining = Counter(item["question"] for item in ranked)
+        unmatched = []
+        for i, question in enumerate(questions):
+            question = self.clean_question(question)
+            if remaining[question] > 0:
+                remaining[question] -= 1
+            else:
+                unmatched.append(i)
+        return unmatched if len(unmatched) == len(questions) - len(ranked) else []
+
+    def generate_priority(self, department: str, questions: List[str]):
+        """
+        질문을 우선순위대로 정렬
+        응답에서 빠진 질문은 그 질문들만 다시 정렬해 달라고 요청해서 목록 뒤에 이어 붙임
+        """
+        ranked = self.request_priority(department, questions)
+        missing = self.find_missing(questions, ranked)
+        if missing:
+            print(f"    응답에서 {len(missing)}개 질문을 찾지 못해 해당 질문만 다시 요청합니다.")
+            extra = self.request_priority(department, [questions[i] for i in missing])
+            # 다시 받은 질문은 기존 목록 뒤의 순위로 이어 붙임
+            for item in extra:
+                item["ranking"] = str(len(ranked) + 1)
+                ranked.append(item)
 
-        # 줄바꿈 기준으로 나누고, 빈줄 제거 후 parse
-        questions_parsed = [self.parse_question(q) 
-                            for q in result.split("\n") if q.strip() != ""]
-        return questions_parsed
\ No newline at end of file
+        # 입력 질문 번호(index)는 중복 확인용이라 저장하지 않음
+        return [
+            {"ranking": item["ranking"], "level": item["level"], "category": item["category"], "question": item["question"]}
+            for item in ranked
+        ]
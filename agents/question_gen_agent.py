@@ -1,22 +1,23 @@
 import re
-from utils.gpt_api_utils import call_gpt, load_prompt
+from utils.gpt_api_utils import call_gpt
+from utils.prompt_registry import get_prompt_registry
 class QuestionGenAgent:
     def __init__(self, prompt_path="config/prompts/question_gen_agent.txt"):
         self.prompt_path = prompt_path
+        self.prompts = get_prompt_registry()
+        self.prompts.get(prompt_path)
 
     def generate_questions(self, department: str, document: str, comment: str):
         """
         생활기록부 주요 내용 및 코멘트를 바탕으로 질문 생성
         """
         # 프롬프트 불러오기 + 변수 치환
-        prompt = load_prompt(
+        system_prompt, user_prompt = self.prompts.render(
             self.prompt_path,
             department=department,
             document=document,
             comment=comment
         )
-
-        system_prompt, user_prompt= prompt.split("---", 1)
         
         # ChatGPT API 호출
         result = call_gpt(system_prompt, user_prompt)
@@ -1,13 +1,17 @@
-from utils.gpt_api_utils import call_gpt
+from utils.gpt_api_utils import call_gpt, STRUCTURED_OUTPUT
+from utils.structured_output import NUMBERED_ANSWERS_SCHEMA, with_json_instruction
 from typing import List
 
 class StudentAgent:
-    def __init__(self):
-        pass
+    def __init__(self, structured_output=STRUCTURED_OUTPUT):
+        # True면 답변 목록을 JSON schema structured output으로 받음
+        self.structured_output = structured_output
+        self.json_schema = NUMBERED_ANSWERS_SCHEMA if structured_output else None
 
-    def generate_student_answer(self, department: str, document: str, questions: List[str]):
+    def build_prompts(self, department: str, document: str, questions: List[str]):
         """
-        학생처럼 답변을 생성하는 에이전트
+        학생 답변 생성용 system/user 프롬프트를 만듭니다.
+        structured_output이면 JSON 응답 지시문이 붙습니다.
         """
         # 질문들을 문자열로 변환
         questions_text = "\n".join([f"{i+1}. {q}" for i, q in enumerate(questions)])
@@ -36,9 +40,18 @@ Document:
 
 Answer list format (no extra text):
 (question index): (answer)"""
+        if self.structured_output:
+            user_prompt = with_json_instruction(user_prompt, self.json_schema)
+        return system_prompt, user_prompt
+
+    def generate_student_answer(self, department: str, document: str, questions: List[str]):
+        """
+        학생처럼 답변을 생성하는 에이전트
+        """
+        system_prompt, user_prompt = self.build_prompts(department, document, questions)
 
         # ChatGPT API 호출
-        student_answers = call_gpt(system_prompt, user_prompt)
+        student_answers = call_gpt(system_prompt, user_prompt, json_schema=self.json_schema)
         
         return student_answers
 
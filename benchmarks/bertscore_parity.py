@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BERTScore 백엔드 parity / 속도 비교.
+
+같은 (후보, 정답) 쌍을 기본 fp32 torch 경로와 다른 백엔드(기본: int8)로 채점해서
+precision/recall/F1의 최대/평균 차이와 채점 시간을 출력합니다.
+쌍은 ground truth QA 파일의 같은 질문에 대한 정답들끼리 만들고, 파일이 없으면 합성 문장을 씁니다.
+
+    python benchmarks/bertscore_parity.py --max_pairs 2000
+    python benchmarks/bertscore_parity.py --backend int8 --num_threads 8 --json parity.json
+"""
+
+import os
+import sys
+import glob
+import json
+import random
+import argparse
+from itertools import combinations
+from typing import List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BASE_DIR, os.path.join(BASE_DIR, "pipelines")]
+
+from pipeline_benchmark import synthetic_text
+from utils.bertscore_engine import BERTScoreEngine, DEFAULT_MODEL_TYPE, BACKENDS, parity_report
+
+
+def load_pairs(qa_dir: str, max_pairs: int, seed: int) -> List[Tuple[str, str]]:
+    """QA 파일의 질문별 ground truth 답변들로 (후보, 정답) 쌍을 만듭니다."""
+    pairs = []
+    for path in sorted(glob.glob(os.path.join(qa_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        records = [data] if "qa" in data else [v for v in data.values() if isinstance(v, dict)]
+        for record in records:
+            for qa in record.get("qa", []):
+                answers = [a for a in qa.get("ground_truth", []) if isinstance(a, str) and a.strip()]
+                pairs.extend(combinations(answers, 2))
+    if not pairs:
+        rng = random.Random(seed)
+        pairs = [(synthetic_text(rng, rng.randint(10, 80)), synthetic_text(rng, rng.randint(10, 80)))
+                 for _ in range(max_pairs)]
+    random.Random(seed).shuffle(pairs)
+    return pairs[:max_pairs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BERTScore 백엔드 parity / 속도 비교")
+    parser.add_argument("--backend", choices=[b for b in BACKENDS if b != "torch"], default="int8")
+    parser.add_argument("--model_type", default=DEFAULT_MODEL_TYPE)
+    parser.add_argument("--num_layers", type=int, help="기본: bert_score의 모델별 기본 층 수")
+    parser.add_argument("--num_threads", type=int, help="CPU 스레드 수 (기준 경로와 비교 대상 모두 같은 값으로 잼)")
+    parser.add_argument("--token_budget", type=int, help="비교 대상 백엔드의 배치당 토큰 수 상한")
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--qa_dir", default=os.path.join(BASE_DIR, "data", "qa", "ground_truth_1"))
+    parser.add_argument("--max_pairs", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.qa_dir, args.max_pairs, args.seed)
+    candidates, references = [list(x) for x in zip(*pairs)]
+
+    # 기준 경로도 CPU에서 실행해야 같은 장비에서의 속도를 비교할 수 있음
+    baseline = BERTScoreEngine(args.model_type, num_layers=args.num_layers, batch_size=args.batch_size, device="cpu")
+    engine = BERTScoreEngine(args.model_type, num_layers=args.num_layers, batch_size=args.batch_size,
+                             backend=args.backend, num_threads=args.num_threads, token_budget=args.token_budget)
+    report = parity_report(baseline, engine, candidates, references)
+
+    print(f"\n쌍 {report['pairs']}개: {report['baseline']} vs {report['engine']} "
+          f"(두 엔진 모두 threads={report['torch_threads']}, interop={report['interop_threads']}, "
+          f"flush_denormal={report['flush_denormal']})")
+    print(f"  채점 시간: {report['baseline_s']:.2f}s -> {report['engine_s']:.2f}s (x{report['speedup']:.2f})")
+    for metric in ("precision", "recall", "f1"):
+        print(f"  {metric:9s} 차이: 최대 {report[f'max_{metric}_drift']:.5f}, 평균 {report[f'mean_{metric}_drift']:.5f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
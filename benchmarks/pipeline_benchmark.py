@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+생성 / 평가 파이프라인 end-to-end 벤치마크.
+
+합성 코퍼스(문서, QA 파일, 통합 QA 세트)를 임시 작업 디렉토리에 만들고, 기본적으로 mock LLM 백엔드
+(LLM_BACKEND=mock)로 다음 세 가지를 각각 별도 프로세스에서 실행합니다.
+
+  generation : main.py의 ground truth 생성 (pipeline / thread 모드)
+  bertscore  : BERTScoreEvalPipeline.run_evaluation
+  rouge      : MultiModelEvaluator.run_full_evaluation
+
+단계별 p50/p95 지연, 처리량, peak RSS, CPU 시간을 JSON으로 저장하므로 커밋 간 비교에 사용할 수 있습니다.
+
+    python benchmarks/pipeline_benchmark.py --num_docs 200 --num_qa 1000 --output bench.json
+    MOCK_LLM_LATENCY=lognormal:800:0.5 python benchmarks/pipeline_benchmark.py --suites generation
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import functools
+import importlib.util
+import statistics
+import subprocess
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUITES = ("generation", "bertscore", "rouge")
+
+DEPARTMENTS = ["물리학과", "컴퓨터공학과", "국어국문학과", "경영학과", "생명과학과"]
+WORDS = ["탐구", "실험", "동아리", "봉사", "발표", "보고서", "협력", "문제", "해결", "독서", "토론", "진로",
+         "프로젝트", "분석", "데이터", "수업", "리더십", "성장", "관심", "전공"]
+
+
+# ---------------------------------------------------------------- 합성 코퍼스
+
+def synthetic_text(rng: random.Random, num_words: int) -> str:
+    words = [rng.choice(WORDS) for _ in range(num_words)]
+    return " ".join(words[i] + ("을 했습니다." if i % 8 == 7 else "") for i in range(num_words))
+
+
+def write_raw_corpus(path: str, num_docs: int, doc_words: int, seed: int):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1, num_docs + 1):
+            record = {"id": str(i), "department": rng.choice(DEPARTMENTS), "document": synthetic_text(rng, doc_words)}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def iter_synthetic_qa(num_qa: int, questions_per_doc: int, doc_words: int, seed: int, ground_truths_per_qa: int = 3):
+    """(doc 번호, department, document, [(question, [ground_truth x ground_truths_per_qa])])를 문서 단위로 만듭니다."""
+    rng = random.Random(seed)
+    remaining = num_qa
+    doc_index = 0
+    while remaining > 0:
+        doc_index += 1
+        count = min(questions_per_doc, remaining)
+        remaining -= count
+        qa = [(synthetic_text(rng, 12) + "?", [synthetic_text(rng, 40) for _ in range(ground_truths_per_qa)])
+              for _ in range(count)]
+        yield doc_index, rng.choice(DEPARTMENTS), synthetic_text(rng, doc_words), qa
+
+
+def write_ground_truth_files(qa_dir: str, num_qa: int, questions_per_doc: int, doc_words: int, seed: int,
+                             ground_truths_per_qa: int = 3) -> Tuple[int, int]:
+    """BERTScoreEvalPipeline이 읽는 ground_truth_1/qa_{id}.json 파일들을 만들고 (파일 수, 채점 쌍 수)를 반환합니다.
+
+    채점 쌍은 질문마다 학생 답변 1개 x ground truth 개수입니다.
+    """
+    os.makedirs(qa_dir, exist_ok=True)
+    num_files = 0
+    num_pairs = 0
+    for doc_index, department, document, qa in iter_synthetic_qa(num_qa, questions_per_doc, doc_words, seed,
+                                                                 ground_truths_per_qa):
+        data = {
+            "department": department,
+            "document": document,
+            "qa": [{"ranking": str(i + 1), "question": q, "ground_truth": gts} for i, (q, gts) in enumerate(qa)],
+        }
+        with open(os.path.join(qa_dir, f"qa_{doc_index}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        num_files += 1
+        num_pairs += sum(len(gts) for _, gts in qa)
+    return num_files, num_pairs
+
+
+def write_unified_qa_sets(path: str, num_qa: int, questions_per_doc: int, doc_words: int, seed: int,
+                          as_store: bool = False, ground_truths_per_qa: int = 3):
+    """prepare_dataset.py와 같은 형식의 통합 QA 데이터를 만듭니다 (as_store면 path에 QA 저장소, 아니면 JSON 파일)."""
+    from utils.qa_store import QAStore
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    items = []
+    for doc_id, department, document, qa in iter_synthetic_qa(num_qa, questions_per_doc, doc_words, seed,
+                                                              ground_truths_per_qa):
+        for question, gts in qa:
+            items.append({"unified_id": len(items) + 1, "source_dir": "synthetic", "source_file": f"qa_{doc_id}.json",
+                          "department": department, "document": document,
+                          "question": question, "ground_truths": gts})
+    if as_store:
+        QAStore.write(path, items)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f, ensure_ascii=False)
+
+
+# ---------------------------------------------------------------- 측정 도구
+
+class StageTimer:
+    """이름별 호출 지연을 모아 p50/p95를 계산합니다. 여러 스레드에서 호출해도 안전합니다."""
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        with self._lock:
+            for name, samples in self._samples.items():
+                ordered = sorted(samples)
+                result[name] = {
+                    "count": len(ordered),
+                    "p50_ms": ordered[int(0.50 * (len(ordered) - 1))] * 1000,
+                    "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+                    "mean_ms": statistics.fmean(ordered) * 1000,
+                    "total_s": sum(ordered),
+                }
+        return result
+
+
+def instrument(cls: type, method_names: List[str], timer: StageTimer):
+    """클래스 메서드를 감싸 호출마다 지연을 기록합니다 (벤치마크 프로세스 안에서만 적용)."""
+    for name in method_names:
+        original = getattr(cls, name)
+
+        def make_wrapper(func: Callable, stage: str):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    timer.record(stage, time.perf_counter() - started)
+            return wrapper
+
+        setattr(cls, name, make_wrapper(original, name))
+
+
+# ---------------------------------------------------------------- suite
+
+def run_generation(args, timer: StageTimer) -> Dict[str, Any]:
+    import main as gen_main
+    from pipelines.ground_truth_gen_pipeline import GroundTruthGenPipeline
+    from utils.stream_io import iter_raw_documents
+
+    instrument(GroundTruthGenPipeline, ["run_summary_stage", "run_comment_stage", "run_question_stage",
+                                        "run_priority_stage", "run_ground_truth_stage", "save_result"], timer)
+
+    raw_path = os.path.join("data", "raw", "raw.jsonl")
+    os.makedirs(os.path.dirname(raw_path), exist_ok=True)
+    write_raw_corpus(raw_path, args.num_docs, args.doc_words, args.seed)
+
+    counts = {"docs": 0, "failed_docs": 0, "questions": 0}
+
+    def on_result(id, result):
+        counts["docs"] += 1
+        if result is None:
+            counts["failed_docs"] += 1
+            return
+        counts["questions"] += sum(len(v.get("qa", [])) for v in result.values())
+
+    args_iter = ((id, department, document, os.getcwd()) for id, department, document in iter_raw_documents(raw_path))
+    started = time.perf_counter()
+    extra = {}
+    if args.gen_mode == "pipeline":
+        extra["stage_graph"] = gen_main.run_with_stage_graph(args_iter, os.getcwd(), args.workers, on_result,
+                                                             report_interval=3600)
+    else:
+        gen_main.run_with_threads(args_iter, os.getcwd(), args.workers, on_result)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": args.gen_mode,
+        "counts": counts,
+        "throughput": {"docs_per_sec": counts["docs"] / elapsed, "questions_per_sec": counts["questions"] / elapsed},
+        **extra,
+    }
+
+
+def run_bertscore(args, timer: StageTimer) -> Dict[str, Any]:
+    if importlib.util.find_spec("bert_score") is None or importlib.util.find_spec("torch") is None:
+        return {"skipped": "bert_score / torch가 설치되어 있지 않습니다."}
+    from pipelines.bertscore_eval_pipeline import BERTScoreEvalPipeline
+
+    instrument(BERTScoreEvalPipeline, ["prepare_qa", "generate_student_answers", "score_prepared_batch"], timer)
+    num_files, pairs = write_ground_truth_files(os.path.join("data", "qa", "ground_truth_1"), args.num_qa,
+                                                args.questions_per_doc, args.doc_words, args.seed,
+                                                args.ground_truths_per_qa)
+
+    pipeline = BERTScoreEvalPipeline(score_batch_size=args.score_batch_size, files_per_batch=args.files_per_batch,
+                                     backend=args.bertscore_backend, num_workers=args.bertscore_workers)
+    started = time.perf_counter()
+    pipeline.run_evaluation()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "counts": {"qa_files": num_files, "questions": args.num_qa, "pairs": pairs},
+        "throughput": {"questions_per_sec": args.num_qa / elapsed, "pairs_per_sec": pairs / elapsed},
+    }
+
+
+def run_rouge(args, timer: StageTimer) -> Dict[str, Any]:
+    from pipelines.unified_student_eval_pipeline import MultiModelEvaluator
+
+    instrument(MultiModelEvaluator, ["dispatch_api_call", "dispatch_group_call", "score_run_results"], timer)
+    evaluator = MultiModelEvaluator(tokenizer=args.tokenizer, group_questions=args.group_questions,
+                                    max_questions_per_call=args.questions_per_doc)
+    if args.qa_format == "store":
+        write_unified_qa_sets(evaluator.unified_store_path, args.num_qa, args.questions_per_doc, args.doc_words,
+                              args.seed, as_store=True, ground_truths_per_qa=args.ground_truths_per_qa)
+    else:
+        write_unified_qa_sets(evaluator.unified_data_path, args.num_qa, args.questions_per_doc, args.doc_words, args.seed,
+                              ground_truths_per_qa=args.ground_truths_per_qa)
+
+    started = time.perf_counter()
+    evaluator.run_full_evaluation()
+    elapsed = time.perf_counter() - started
+
+    calls = args.num_qa * len(evaluator.models_to_evaluate)
+    return {
+        "counts": {"questions": args.num_qa, "models": len(evaluator.models_to_evaluate), "answers": calls},
+        "throughput": {"answers_per_sec": calls / elapsed},
+    }
+
+
+SUITE_FUNCS = {"generation": run_generation, "bertscore": run_bertscore, "rouge": run_rouge}
+
+
+def run_suite_in_process(suite: str, args) -> Dict[str, Any]:
+    """작업 디렉토리로 이동해 suite 하나를 실행하고 지연/자원 사용량을 함께 반환합니다."""
+    os.chdir(args.work_dir)
+    sys.path[:0] = [BASE_DIR, os.path.join(BASE_DIR, "pipelines")]
+
+    timer = StageTimer()
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    result = SUITE_FUNCS[suite](args, timer)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    result.update({
+        "wall_s": time.perf_counter() - wall_started,
+        "cpu_s": time.process_time() - cpu_started,
+        "cpu_children_s": children.ru_utime + children.ru_stime,
+        # 리눅스에서 ru_maxrss 단위는 KB (macOS는 byte)
+        "peak_rss_mb": usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        "stages": timer.summary(),
+    })
+    from utils.telemetry import get_telemetry
+    result["telemetry"] = get_telemetry().summary()
+    if os.getenv("LLM_BACKEND") == "mock":
+        from utils.llm_client import get_llm_client
+        result["mock_usage"] = get_llm_client().mock_usage()
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="생성/평가 파이프라인 end-to-end 벤치마크")
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--num_docs", type=int, default=100, help="generation에 쓸 합성 문서 수")
+    parser.add_argument("--num_qa", type=int, default=1000, help="평가에 쓸 합성 QA 항목 수 (100 ~ 100k)")
+    parser.add_argument("--questions_per_doc", type=int, default=10)
+    parser.add_argument("--ground_truths_per_qa", type=int, default=3,
+                        help="합성 질문마다 만들 ground truth 수 (bertscore suite의 채점 쌍 수 = 질문 수 x 이 값)")
+    parser.add_argument("--doc_words", type=int, default=300, help="합성 문서 길이 (단어 수)")
+    parser.add_argument("--gen_mode", choices=["pipeline", "thread"], default="pipeline")
+    parser.add_argument("--workers", type=int, default=8, help="generation의 stage 워커 수 / 스레드 수")
+    parser.add_argument("--score_batch_size", type=int, default=64)
+    parser.add_argument("--files_per_batch", type=int, default=8)
+    parser.add_argument("--bertscore_backend", choices=["torch", "int8"], default="torch")
+    parser.add_argument("--bertscore_workers", type=int, default=1, help="bertscore suite의 채점 프로세스 수")
+    parser.add_argument("--tokenizer", default="korean", help="rouge suite의 ROUGE 토크나이저")
+    parser.add_argument("--qa_format", choices=["store", "json"], default="store",
+                        help="rouge suite의 통합 QA 데이터 형식 (store: 정규화 QA 저장소, json: 기존 통합 JSON)")
+    parser.add_argument("--group_questions", action="store_true",
+                        help="rouge suite에서 같은 문서의 질문들을 한 번의 호출로 물음")
+    parser.add_argument("--backend", choices=["mock", "live"], default="mock", help="LLM 백엔드 (live는 실제 API 호출)")
+    parser.add_argument("--keep_rate_limits", action="store_true",
+                        help="mock 백엔드에서도 provider rate limit을 그대로 적용")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--work_dir", help="작업 디렉토리 (기본: 임시 디렉토리, 끝나면 삭제)")
+    parser.add_argument("--output", default="benchmark_results.json", help="결과 JSON 경로")
+    parser.add_argument("--_child", choices=SUITES, help=argparse.SUPPRESS)
+    parser.add_argument("--_result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._child:
+        result = run_suite_in_process(args._child, args)
+        with open(args._result, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2, default=float)
+        return
+
+    env = dict(os.environ, LLM_BACKEND=args.backend)
+    if args.backend == "mock":
+        # 응답 캐시를 끄고 (매번 같은 양의 작업), 재시도 대기를 짧게
+        env.setdefault("LLM_CACHE_MODE", "off")
+        if not args.keep_rate_limits:
+            for provider in ("OPENAI", "CLAUDE", "GEMINI"):
+                env.setdefault(f"{provider}_MAX_CONCURRENCY", "256")
+                env.setdefault(f"{provider}_RPM", str(10 ** 9))
+                env.setdefault(f"{provider}_TPM", str(10 ** 12))
+
+    report = {
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if not k.startswith("_") and k != "output"},
+        "mock_env": {k: v for k, v in env.items() if k.startswith("MOCK_LLM_")},
+        "suites": {},
+    }
+
+    cleanup = args.work_dir is None
+    root_dir = args.work_dir or tempfile.mkdtemp(prefix="pipeline_bench_")
+    try:
+        for suite in args.suites:
+            # suite마다 새 작업 디렉토리와 새 프로세스 (peak RSS / 캐시 상태가 섞이지 않도록)
+            work_dir = os.path.join(root_dir, suite)
+            os.makedirs(work_dir, exist_ok=True)
+            if not os.path.exists(os.path.join(work_dir, "config")):
+                os.symlink(os.path.join(BASE_DIR, "config"), os.path.join(work_dir, "config"))
+            result_path = os.path.join(work_dir, "result.json")
+            log_path = os.path.join(work_dir, "run.log")
+
+            # 같은 인자를 그대로 넘기고, 마지막 --work_dir가 우선하도록 suite 디렉토리를 덧붙임
+            cmd = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + [
+                "--_child", suite, "--_result", result_path, "--work_dir", work_dir]
+            print(f"[{suite}] 실행 중... (로그: {log_path})")
+            with open(log_path, "w", encoding="utf-8") as log:
+                proc = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+            if proc.returncode != 0:
+                report["suites"][suite] = {"error": f"exit code {proc.returncode}", "log": log_path}
+                print(f"[{suite}] 실패 (exit code {proc.returncode})")
+                continue
+            with open(result_path, "r", encoding="utf-8") as f:
+                report["suites"][suite] = json.load(f)
+            summary = report["suites"][suite]
+            if "skipped" in summary:
+                print(f"[{suite}] 건너뜀: {summary['skipped']}")
+            else:
+                print(f"[{suite}] {summary['wall_s']:.1f}s, CPU {summary['cpu_s']:.1f}s, "
+                      f"peak RSS {summary['peak_rss_mb']:.0f}MB, 처리량 {summary['throughput']}")
+    finally:
+        if cleanup:
+            shutil.rmtree(root_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"벤치마크 결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+엔트리 포인트별 cold start(import) 시간을 측정합니다.
+
+각 엔트리 포인트 모듈을 `python -X importtime`으로 새 프로세스에서 import하여
+전체 소요 시간과 누적 import 시간이 큰 모듈 목록을 출력합니다.
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --repeat 5 --top 15 --json startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 엔트리 포인트 이름 -> import할 모듈 (모두 __main__ 가드가 있어 import만으로는 실행되지 않음)
+ENTRY_POINTS = {
+    "main.py": "main",
+    "bertscore_eval_main.py": "bertscore_eval_main",
+    "unified_student_eval_pipeline.py": "unified_student_eval_pipeline",
+    "gpt_api_utils (agent worker)": "utils.gpt_api_utils",
+}
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """'import time: self [us] | cumulative | imported package' 형식의 줄을 파싱합니다."""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            records.append({
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            })
+        except ValueError:
+            continue
+    return records
+
+
+def measure(module: str) -> Dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [BASE_DIR, os.path.join(BASE_DIR, "pipelines")] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+    )
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    records = parse_importtime(proc.stderr)
+    error = None
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"
+    return {"wall_ms": wall_ms, "records": records, "error": error}
+
+
+def summarize(name: str, module: str, runs: List[Dict], top: int) -> Dict:
+    # 모듈별 누적 시간은 마지막 실행 기준 (OS 파일 캐시가 데워진 상태)
+    last = runs[-1]
+    top_level = [r for r in last["records"] if r["depth"] == 1]
+    heaviest = sorted(last["records"], key=lambda r: r["cumulative_us"], reverse=True)[:top]
+    wall = [r["wall_ms"] for r in runs]
+    return {
+        "entry_point": name,
+        "module": module,
+        "error": last["error"],
+        "wall_ms_first": wall[0],
+        "wall_ms_median": statistics.median(wall),
+        "import_ms": sum(r["cumulative_us"] for r in top_level) / 1000,
+        "num_modules": len(last["records"]),
+        "heaviest": [{"module": r["module"].strip(), "cumulative_ms": r["cumulative_us"] / 1000} for r in heaviest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="엔트리 포인트별 import 시간 측정")
+    parser.add_argument("--repeat", type=int, default=3, help="엔트리 포인트별 측정 횟수")
+    parser.add_argument("--top", type=int, default=10, help="출력할 무거운 모듈 수")
+    parser.add_argument("--only", nargs="+", choices=list(ENTRY_POINTS), help="측정할 엔트리 포인트")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    results = []
+    for name, module in ENTRY_POINTS.items():
+        if args.only and name not in args.only:
+            continue
+        runs = [measure(module) for _ in range(max(args.repeat, 1))]
+        summary = summarize(name, module, runs, args.top)
+        results.append(summary)
+
+        print(f"\n=== {name} (import {module}) ===")
+        if summary["error"]:
+            print(f"  import 실패: {summary['error']}")
+        print(f"  프로세스 시간: 첫 실행 {summary['wall_ms_first']:.1f}ms, 중앙값 {summary['wall_ms_median']:.1f}ms")
+        print(f"  import 합계: {summary['import_ms']:.1f}ms ({summary['num_modules']}개 모듈)")
+        for item in summary["heaviest"]:
+            print(f"    {item['cumulative_ms']:9.1f}ms  {item['module']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
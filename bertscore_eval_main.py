@@ -9,30 +9,58 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from pipelines.bertscore_eval_pipeline import BERTScoreEvalPipeline
+# 파이프라인과 같은 utils.* 경로로 import해야 모듈이 두 번 로드되지 않음
+from utils.batch_api import create_batch_runner
+from utils.telemetry import start_exporter
 
 def main():
     parser = argparse.ArgumentParser(description="BERTScore 평가 실행")
     parser.add_argument("--qa_ids", nargs="+", help="평가할 QA ID 목록 (예: 1 2 3)")
     parser.add_argument("--all", action="store_true", help="모든 QA 파일 평가")
+    parser.add_argument("--batch_size", type=int, default=64, help="BERTScore 배치 크기 (문장 쌍 수)")
+    parser.add_argument("--files_per_batch", type=int, default=1, help="한 번에 묶어 채점할 QA 파일 수")
+    parser.add_argument("--no_embedding_cache", action="store_true", help="ground truth 임베딩 캐시 사용 안 함")
+    parser.add_argument("--batch", choices=["openai", "fake"], help="학생 답변을 배치 API로 생성 (fake: 로컬 가짜 배치 서버)")
+    parser.add_argument("--text_tokenizer", help="채점 전 답변 정규화에 쓸 토크나이저 (예: korean, 기본: 사용 안 함)")
+    parser.add_argument("--backend", choices=["torch", "int8"], default="torch",
+                        help="BERTScore 모델 실행 방식 (int8: CPU용 int8 quantization + 길이별 배치)")
+    parser.add_argument("--num_threads", type=int, help="BERTScore CPU 추론 스레드 수 (기본: torch 기본값)")
+    parser.add_argument("--num_workers", type=int, default=1,
+                        help="채점 프로세스 수 (2 이상: 답변 생성 후 QA 파일 배치를 여러 프로세스로 나눠 채점, CPU 전용)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="입력(QA 파일, 프롬프트, 모델 설정, 채점 방식)이 바뀐 QA 파일만 다시 평가 (data/qa/eval/run_ledger.json)")
     
     args = parser.parse_args()
+    start_exporter()
     
     # BERTScore 평가 pipeline 초기화
-    pipeline = BERTScoreEvalPipeline()
+    pipeline = BERTScoreEvalPipeline(
+        score_batch_size=args.batch_size,
+        files_per_batch=args.files_per_batch,
+        use_embedding_cache=not args.no_embedding_cache,
+        text_tokenizer=args.text_tokenizer,
+        backend=args.backend,
+        num_threads=args.num_threads,
+        num_workers=args.num_workers,
+        incremental=args.incremental
+    )
+    batch_runner = None
+    if args.batch:
+        batch_runner = create_batch_runner(args.batch, os.path.join(pipeline.eval_dir_path, "batches"))
     
     try:
         if args.all:
             # 모든 QA 파일 평가
             print("모든 QA 파일에 대해 BERTScore 평가를 시작합니다...")
-            results = pipeline.run_evaluation()
+            results = pipeline.run_evaluation(batch_runner=batch_runner)
         elif args.qa_ids:
             # 특정 QA ID들만 평가
             print(f"QA ID {args.qa_ids}에 대해 BERTScore 평가를 시작합니다...")
-            results = pipeline.run_evaluation(args.qa_ids)
+            results = pipeline.run_evaluation(args.qa_ids, batch_runner=batch_runner)
         else:
             # 기본적으로 모든 QA 파일 평가
             print("모든 QA 파일에 대해 BERTScore 평가를 시작합니다...")
-            results = pipeline.run_evaluation()
+            results = pipeline.run_evaluation(batch_runner=batch_runner)
         
         if results:
             print(f"\n평가 완료! 총 {len(results)}개의 QA 파일이 평가되었습니다.")
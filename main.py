@@ -1,33 +1,132 @@
 import os
-import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pipelines.ground_truth_gen_pipeline import GroundTruthGenPipeline
+from utils.stream_io import iter_raw_documents, JsonlShardWriter, ProgressCounter
+from utils.telemetry import get_telemetry, start_exporter
 from multiprocessing import Pool, cpu_count
 
+def init_process_worker():
+    """fork로 물려받은 부모의 telemetry 집계를 비워, 자식이 돌려주는 집계에 부모 값이 섞이지 않게 합니다."""
+    get_telemetry().aggregator.take()
+
 def process_doc(args):
     """
     멀티프로세싱에서 호출할 함수
+    이 문서를 처리하며 쌓인 telemetry 집계를 결과와 함께 돌려주어 부모의 실행 요약에 합칩니다.
     """
     id, department, document, base_dir = args
     pipeline = GroundTruthGenPipeline(base_dir)
     print(f"처리 중인 doc ID: {id}")
-    pipeline.run(id, department, document)
-    return id
+    result = pipeline.run(id, department, document)
+    return id, result, get_telemetry().aggregator.take()
+
+def bounded(iterable, semaphore):
+    """소비자가 결과를 하나 처리할 때마다 다음 입력을 내보내, 미리 읽어두는 입력 수를 제한합니다."""
+    for item in iterable:
+        semaphore.acquire()
+        yield item
+
+def run_with_processes(args_iter, num_processes, on_result):
+    """문서마다 프로세스 풀에서 파이프라인을 새로 만들어 실행하고, 끝나는 순서대로 on_result를 호출합니다."""
+    in_flight = threading.BoundedSemaphore(num_processes * 2)
+    aggregator = get_telemetry().aggregator
+    with Pool(processes=num_processes, initializer=init_process_worker) as pool:
+        for id, result, telemetry in pool.imap_unordered(process_doc, bounded(args_iter, in_flight)):
+            in_flight.release()
+            aggregator.merge(telemetry)
+            on_result(id, result)
+
+def run_with_threads(args_iter, base_dir, num_workers, on_result):
+    """
+    API 호출 위주의 I/O 작업이므로 한 프로세스의 스레드 풀에서 실행합니다.
+    파이프라인(에이전트)과 provider별 API 클라이언트/연결 풀은 모든 스레드가 공유하며,
+    동시에 제출되는 문서 수를 워커 수의 2배로 제한해 입력을 스트리밍으로 소비합니다.
+    """
+    pipeline = GroundTruthGenPipeline(base_dir)
+
+    def run_one(args):
+        id, department, document, _ = args
+        print(f"처리 중인 doc ID: {id}")
+        return id, pipeline.run(id, department, document)
+
+    max_in_flight = num_workers * 2
+    with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="doc") as executor:
+        pending = set()
+        for args in args_iter:
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_result(*future.result())
+            pending.add(executor.submit(run_one, args))
+        for future in wait(pending).done:
+            on_result(*future.result())
+
+def run_with_stage_graph(args_iter, base_dir, stage_workers, on_result, report_interval=30.0):
+    """
+    에이전트 단계마다 전용 큐와 워커를 두어, 여러 문서의 서로 다른 단계가 동시에 진행되도록 실행합니다.
+    """
+    pipeline = GroundTruthGenPipeline(base_dir)
+    # on_result는 여러 stage 워커 스레드에서 호출되므로 직렬화
+    result_lock = threading.Lock()
+
+    def on_complete(id, result):
+        with result_lock:
+            on_result(id, result)
+
+    graph = pipeline.build_stage_graph(on_complete, stage_workers=stage_workers)
+    graph.start()
+    graph.start_reporter(report_interval)
+    for id, department, document, _ in args_iter:
+        graph.submit((id, department, document))
+    graph.close_and_wait()
+    print(f"[stage 최종 상태]\n{graph.format_metrics()}")
+    return graph.metrics()
 
 if __name__ == "__main__":
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    RAW_PATH = os.path.join(BASE_DIR, "data", "raw", "raw.json")
-    
-    # id 가져오기
-    with open(RAW_PATH, "r", encoding="utf-8") as f:
-        raw = json.load(f)    
-    ids = list(raw.keys())
-    
-    # 멀티프로세싱용 인자 튜플 생성
-    args_list = [(id, raw[id]["department"], raw[id]["document"], BASE_DIR) for id in ids]
-    
-    # CPU 코어 수-1만큼 프로세스 풀 생성
-    num_processes = max(cpu_count() - 1, 1)
-    with Pool(processes=num_processes) as pool:
-        results = pool.map(process_doc, args_list)
-
-    print("모든 문서 처리 완료:", results)
+
+    parser = argparse.ArgumentParser(description="ground truth 생성 실행")
+    parser.add_argument("--mode", choices=["thread", "process", "pipeline"], default="thread",
+                        help="thread: 공유 클라이언트를 쓰는 I/O 워커, process: 문서별 프로세스 풀, "
+                             "pipeline: 에이전트 단계별 큐/워커를 두는 stage graph")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("GEN_MAX_CONCURRENCY", "32")),
+                        help="동시에 처리할 문서 수 (thread 모드, API rate limit에 맞춰 조정)")
+    parser.add_argument("--stage_workers", type=int, default=8,
+                        help="pipeline 모드에서 단계별 워커 수")
+    parser.add_argument("--input", default=os.path.join(BASE_DIR, "data", "raw", "raw.json"),
+                        help="원본 문서 파일 (.json 또는 .jsonl, 스트리밍으로 읽음)")
+    parser.add_argument("--output_dir", default=os.path.join(BASE_DIR, "data", "qa", "ground_truth_shards"),
+                        help="문서별 결과를 이어 쓰는 JSONL 샤드 디렉토리")
+    cli_args = parser.parse_args()
+    # /metrics는 이 프로세스에서만 제공 (process 모드의 자식들이 같은 포트를 잡지 않도록)
+    start_exporter()
+
+    # 입력은 문서 단위로 스트리밍 (멀티프로세싱용 인자 튜플 생성)
+    args_iter = ((id, department, document, BASE_DIR)
+                 for id, department, document in iter_raw_documents(cli_args.input))
+
+    progress = ProgressCounter(label="문서")
+    with JsonlShardWriter(cli_args.output_dir, prefix="ground_truth") as writer:
+        def on_result(id, result):
+            # 문서가 끝나는 즉시 샤드에 기록
+            writer.write({"id": id, "ok": result is not None, "result": result})
+            progress.update(ok=result is not None)
+
+        if cli_args.mode == "process":
+            # CPU 코어 수-1만큼 프로세스 풀 생성
+            num_processes = max(cpu_count() - 1, 1)
+            run_with_processes(args_iter, num_processes, on_result)
+        elif cli_args.mode == "pipeline":
+            run_with_stage_graph(args_iter, BASE_DIR, max(cli_args.stage_workers, 1), on_result)
+        else:
+            run_with_threads(args_iter, BASE_DIR, max(cli_args.workers, 1), on_result)
+
+    summary = progress.summary()
+    print(f"모든 문서 처리 완료: {summary['done']}건 (실패 {summary['failed']}건), "
+          f"{summary['per_sec']:.2f}건/초, 결과: {cli_args.output_dir}")
+
+    telemetry = get_telemetry()
+    telemetry.write_summary(os.path.join(cli_args.output_dir, "telemetry_summary.json"))
+    print(telemetry.format_summary())
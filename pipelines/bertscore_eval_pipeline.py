@@ -1,14 +1,53 @@
 import os
 import json
+import multiprocessing
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 from agents.student_agent import StudentAgent
-from bert_score import score as bert_score
+from utils.bertscore_engine import get_bertscore_engine, DEFAULT_MODEL_TYPE
+from utils.embedding_store import ReferenceEmbeddingStore, PendingEmbeddingStore
+from utils.llm_client import LLMCallError
+from utils.llm_cache import get_llm_cache
+from utils.gpt_api_utils import OPENAI_MODEL, TEMPERATURE
+from utils.batch_api import BatchRunner, make_batch_request
+from utils.korean_tokenizer import get_tokenizer
+from utils.structured_output import parse_numbered_answers, fill_missing
+from utils.telemetry import get_telemetry
+from utils.run_ledger import RunLedger, content_hash
 import warnings
 warnings.filterwarnings('ignore')
 
+# 채점 방식(평균 방법, 빈 답변 처리 등)을 바꾸면 올려서 이전 결과를 모두 다시 채점하게 함
+METRIC_VERSION = 1
+# 이 입력들만 바뀐 QA 파일은 기존 학생 답변을 그대로 두고 채점만 다시 함
+SCORING_INPUTS = ("ground_truth", "metric")
+
+# fork된 채점 프로세스가 부모에게서 물려받는 상태 (파이프라인과 채점할 배치는 pickle하지 않고 공유)
+_SHARD_STATE: Dict[str, Any] = {}
+
+
+def _init_shard_worker(num_threads: int):
+    import torch
+    torch.set_num_threads(num_threads)
+    # 부모에게서 물려받은 telemetry 집계를 비우고, 배치마다 자식의 집계만 돌려줌
+    get_telemetry().aggregator.take()
+    pipeline = _SHARD_STATE["pipeline"]
+    # 임베딩 캐시는 읽기만 하고, 새 임베딩은 결과와 함께 부모에게 돌려줌
+    if pipeline.reference_store is not None:
+        pipeline.reference_store = PendingEmbeddingStore(pipeline.reference_store)
+
+
+def _score_shard(batch_index: int):
+    pipeline = _SHARD_STATE["pipeline"]
+    results = pipeline.score_prepared_batch(_SHARD_STATE["batches"][batch_index])
+    new_embeddings = pipeline.reference_store.take_new() if pipeline.reference_store is not None else {}
+    return results, new_embeddings, get_telemetry().aggregator.take()
+
+
 class BERTScoreEvalPipeline:
-    def __init__(self):
+    def __init__(self, score_batch_size: int = 64, files_per_batch: int = 1, use_embedding_cache: bool = True,
+                 text_tokenizer: str = None, backend: str = "torch", num_threads: int = None, num_workers: int = 1,
+                 incremental: bool = False):
         self.qa_dir_path = "data/qa"
         self.ground_truth_1_dir_path = os.path.join(self.qa_dir_path, "ground_truth_1")
         self.student_agent = StudentAgent()
@@ -17,6 +56,36 @@ class BERTScoreEvalPipeline:
         self.eval_dir_path = os.path.join(self.qa_dir_path, "eval")
         os.makedirs(self.eval_dir_path, exist_ok=True)
         
+        # 모델은 프로세스당 한 번만 로드되고, files_per_batch개의 QA 파일을 묶어 한 번에 채점합니다.
+        # backend='int8'은 GPU 없는 장비용 quantized CPU 경로 (점수 차이는 benchmarks/bertscore_parity.py로 확인)
+        self.scorer = get_bertscore_engine(DEFAULT_MODEL_TYPE, batch_size=score_batch_size,
+                                           backend=backend, num_threads=num_threads)
+        self.files_per_batch = max(files_per_batch, 1)
+        # 2 이상이면 학생 답변을 모두 만든 뒤 files_per_batch 단위의 채점을 여러 프로세스로 나눠 실행
+        self.num_workers = max(num_workers, 1)
+        
+        # ground truth 임베딩은 실행 간에 재사용하므로 새로 생성된 학생 답변만 모델을 통과합니다.
+        self.reference_store = None
+        if use_embedding_cache:
+            self.reference_store = ReferenceEmbeddingStore(
+                os.path.join(self.eval_dir_path, "embedding_cache"), self.scorer.model_key
+            )
+        
+        # 지정하면 채점 전에 답변을 토큰화해 공백으로 다시 이어 붙임 (예: 'korean'은 조사 제거)
+        self.text_tokenizer = None
+        if text_tokenizer:
+            self.text_tokenizer = get_tokenizer(text_tokenizer, cache_dir=os.path.join(self.eval_dir_path, "token_cache"))
+        
+        # eval_qa_<id>.json마다 입력 해시를 기록하고, incremental이면 입력이 바뀐 QA 파일만 다시 평가
+        self.ledger = RunLedger(os.path.join(self.eval_dir_path, "run_ledger.json"))
+        self.incremental = incremental
+    
+    def normalize_text(self, text: str) -> str:
+        """text_tokenizer가 설정된 경우 BERTScore 입력 문장을 정규화합니다."""
+        if self.text_tokenizer is None:
+            return text
+        return " ".join(self.text_tokenizer.tokenize(text))
+        
     def load_qa_data(self, qa_id: str) -> Dict[str, Any]:
         """ground_truth_1에서 QA 데이터를 로드합니다."""
         qa_file_path = os.path.join(self.ground_truth_1_dir_path, f"qa_{qa_id}.json")
@@ -29,6 +98,33 @@ class BERTScoreEvalPipeline:
         
         return data
     
+    def ledger_inputs(self, qa_data: Dict[str, Any]) -> Dict[str, str]:
+        """QA 파일 하나의 평가 결과를 만든 입력들(질문/문서, ground truth, 답변 프롬프트, 답변 모델, 채점 방식)의 해시."""
+        department, document = qa_data.get("department", "사학과"), qa_data.get("document", "")
+        return {
+            "qa": content_hash([department, document, self.extract_questions(qa_data)]),
+            "ground_truth": content_hash(self.extract_ground_truth_answers(qa_data)),
+            # 프롬프트는 코드에 있으므로 자리표시자로 채운 결과를 해시
+            "prompt": content_hash(self.student_agent.build_prompts("{department}", "{document}", ["{question}"])),
+            "model": content_hash({"provider": "openai", "model": OPENAI_MODEL, "temperature": TEMPERATURE}),
+            "metric": content_hash({
+                "version": METRIC_VERSION,
+                "scorer": self.scorer.model_key,
+                "text_tokenizer": self.text_tokenizer.name if self.text_tokenizer else None,
+            }),
+        }
+    
+    def load_previous_result(self, qa_id: str) -> Dict[str, Any]:
+        """이전 실행의 eval_qa_<id>.json. 없거나 읽을 수 없으면 None."""
+        result_file_path = os.path.join(self.eval_dir_path, f"eval_qa_{qa_id}.json")
+        if not os.path.exists(result_file_path):
+            return None
+        try:
+            with open(result_file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            return None
+    
     def extract_questions(self, qa_data: Dict[str, Any]) -> List[str]:
         """QA 데이터에서 질문들을 추출합니다."""
         questions = []
@@ -67,86 +163,164 @@ class BERTScoreEvalPipeline:
         
         return ground_truth_answers
     
-    def generate_student_answers(self, department: str, document: str, questions: List[str]) -> List[str]:
-        """StudentAgent를 사용하여 학생 답변을 생성합니다."""
-        try:
-            student_answers_text = self.student_agent.generate_student_answer(
+    def generate_student_answers(self, department: str, document: str, questions: List[str],
+                                 refresh_cache: bool = False) -> List[str]:
+        """
+        StudentAgent를 사용하여 학생 답변을 생성합니다.
+        응답에서 빠진 답변은 그 질문들만 다시 요청하며, 다시 요청할 때는 LLM 응답 캐시를 읽지 않습니다.
+        refresh_cache면 첫 요청부터 캐시를 읽지 않습니다.
+        """
+        llm_cache = get_llm_cache()
+        def ask(indices: List[int]) -> Dict[int, str]:
+            answers_text = self.student_agent.generate_student_answer(
                 department=department,
                 document=document,
-                questions=questions
+                questions=[questions[i - 1] for i in indices]
             )
+            # 다시 요청한 질문은 1부터 새로 번호가 매겨지므로 원래 번호로 되돌림
+            answers = parse_numbered_answers(answers_text, len(indices))
+            return {index: answers[k] for k, index in enumerate(indices, start=1) if k in answers}
+
+        def reask(indices: List[int]) -> Dict[int, str]:
+            # 캐시에서 읽으면 이전 실행에서 같은 번호를 빠뜨린 같은 응답이 돌아옴
+            with llm_cache.refresh():
+                return ask(indices)
+
+        indices = list(range(1, len(questions) + 1))
+        try:
+            first = reask(indices) if refresh_cache else ask(indices)
+            answers = fill_missing(first, indices, reask)
+            return [answers.get(i, "") for i in indices]
             
-            # 답변 텍스트를 파싱하여 리스트로 변환
-            student_answers = self.parse_student_answers(student_answers_text, len(questions))
-            return student_answers
-            
+        except LLMCallError:
+            # API 실패는 빈 답변(0점)으로 바꾸지 않고 호출자에게 알림
+            raise
         except Exception as e:
             print(f"학생 답변 생성 중 오류 발생: {e}")
             return [""] * len(questions)
     
     def parse_student_answers(self, answers_text: str, num_questions: int) -> List[str]:
-        """학생 답변 텍스트를 파싱하여 리스트로 변환합니다."""
-        answers = []
-        lines = answers_text.strip().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if line and (line[0].isdigit() or line.startswith('(')):
-                # 숫자나 괄호로 시작하는 라인에서 답변 추출
-                if ':' in line:
-                    answer = line.split(':', 1)[1].strip()
-                    if answer.startswith('(') and answer.endswith(')'):
-                        answer = answer[1:-1].strip()
-                    answers.append(answer)
-                elif ')' in line:
-                    # (숫자): 답변 형태 처리
-                    if ':' in line:
-                        answer = line.split(':', 1)[1].strip()
-                        answers.append(answer)
-        
-        # 답변 개수가 맞지 않으면 빈 문자열로 채움
-        while len(answers) < num_questions:
-            answers.append("")
-        
-        return answers[:num_questions]
+        """
+        학생 답변 텍스트(JSON 또는 번호 매긴 텍스트)를 질문 순서의 리스트로 변환합니다.
+        답변은 위치가 아니라 질문 번호로 맞추며, 찾지 못한 답변은 빈 문자열입니다.
+        """
+        answers = parse_numbered_answers(answers_text, num_questions)
+        return [answers.get(i, "") for i in range(1, num_questions + 1)]
     
     def calculate_bertscore(self, student_answer: str, ground_truth_answers: List[str]) -> Dict[str, float]:
         """하나의 학생 답변과 여러 ground truth 답변 간의 BERTScore를 계산합니다."""
-        if not student_answer.strip():
-            return {"precision": 0.0, "recall": 0.0, "f1": 0.0}
+        return self.calculate_bertscores([student_answer], [ground_truth_answers])[0]
+    
+    def calculate_bertscores(self, student_answers: List[str], ground_truth_answers: List[List[str]]) -> List[Dict[str, float]]:
+        """
+        여러 질문의 (학생 답변, ground truth 답변들) 쌍을 한 번의 배치로 채점하고,
+        질문별로 ground truth에 대한 평균 점수를 반환합니다.
+        """
+        empty_score = {"precision": 0.0, "recall": 0.0, "f1": 0.0}
         
-        try:
-            # 각 ground truth와의 BERTScore 계산
-            scores = []
-            for gt_answer in ground_truth_answers:
+        # 채점할 모든 (후보, 정답) 쌍을 펼치고, 각 쌍이 어느 질문에 속하는지 기록
+        candidates, references, owners = [], [], []
+        for i, (student_answer, gt_answers) in enumerate(zip(student_answers, ground_truth_answers)):
+            student_answer = self.normalize_text(student_answer)
+            if not student_answer.strip():
+                continue
+            for gt_answer in gt_answers:
+                gt_answer = self.normalize_text(gt_answer)
                 if gt_answer.strip():
-                    P, R, F1 = bert_score([student_answer], [gt_answer], 
-                                        model_type='distilbert-base-multilingual-cased',
-                                        lang='ko', verbose=False)
-                    scores.append({
-                        "precision": P.item(),
-                        "recall": R.item(), 
-                        "f1": F1.item()
-                    })
-            
+                    candidates.append(student_answer)
+                    references.append(gt_answer)
+                    owners.append(i)
+        if self.text_tokenizer is not None:
+            # 배치마다 새 토큰화 결과를 디스크 캐시에 씀 (fork된 채점 프로세스는 종료 처리 없이 끝나므로)
+            self.text_tokenizer.flush()
+        
+        try:
+            with get_telemetry().span("scoring", name="bertscore", items=len(candidates)):
+                pair_scores = self.scorer.score_pairs(candidates, references, reference_store=self.reference_store)
+            if self.reference_store is not None:
+                self.reference_store.save()
+        except Exception as e:
+            print(f"BERTScore 계산 중 오류 발생: {e}")
+            return [dict(empty_score) for _ in student_answers]
+        
+        grouped = [[] for _ in student_answers]
+        for owner, pair_score in zip(owners, pair_scores):
+            grouped[owner].append(pair_score)
+        
+        results = []
+        for scores in grouped:
             if not scores:
-                return {"precision": 0.0, "recall": 0.0, "f1": 0.0}
-            
+                results.append(dict(empty_score))
+                continue
             # 평균 계산
-            avg_scores = {
+            results.append({
                 "precision": np.mean([s["precision"] for s in scores]),
                 "recall": np.mean([s["recall"] for s in scores]),
                 "f1": np.mean([s["f1"] for s in scores])
-            }
-            
-            return avg_scores
-            
-        except Exception as e:
-            print(f"BERTScore 계산 중 오류 발생: {e}")
-            return {"precision": 0.0, "recall": 0.0, "f1": 0.0}
+            })
+        return results
     
-    def evaluate_qa(self, qa_id: str) -> Dict[str, Any]:
-        """하나의 QA 데이터에 대해 평가를 수행합니다."""
+    def generate_student_answers_batch(self, qa_ids: List[str], batch_runner: BatchRunner) -> Dict[str, Dict[str, Any]]:
+        """
+        모든 QA 파일의 학생 답변 요청을 하나의 배치로 제출하고, qa_id별 {"answers": [...]} 또는 {"error": {...}}를 돌려줍니다.
+        """
+        def make_request(custom_id, department, document, questions):
+            system_prompt, user_prompt = self.student_agent.build_prompts(
+                department=department, document=document, questions=questions
+            )
+            return make_batch_request(custom_id, OPENAI_MODEL, system_prompt, user_prompt, TEMPERATURE,
+                                      json_schema=self.student_agent.json_schema)
+
+        requests = []
+        qa_inputs = {}
+        for qa_id in qa_ids:
+            try:
+                qa_data = self.load_qa_data(qa_id)
+            except Exception as e:
+                print(f"QA {qa_id} 로드 중 오류 발생: {e}")
+                continue
+            questions = self.extract_questions(qa_data)
+            if not questions:
+                continue
+            qa_inputs[qa_id] = (qa_data.get("department", "사학과"), qa_data.get("document", ""), questions)
+            requests.append(make_request(f"qa_{qa_id}", *qa_inputs[qa_id]))
+        
+        batch_results = batch_runner.run(requests, name="student_answers")
+        
+        generated, missing = {}, {}
+        for qa_id, (_, _, questions) in qa_inputs.items():
+            result = batch_results.get(f"qa_{qa_id}", {})
+            if result.get("text"):
+                answers = self.parse_student_answers(result["text"], len(questions))
+                generated[qa_id] = {"answers": answers}
+                missing_indices = [i for i, answer in enumerate(answers) if not answer]
+                if missing_indices:
+                    missing[qa_id] = missing_indices
+            else:
+                generated[qa_id] = {"error": result.get("error") or {"message": "배치 결과 없음"}}
+        
+        # 응답에서 빠진 답변은 그 질문들만 모아 두 번째 배치로 다시 요청
+        if missing:
+            print(f"{len(missing)}개 QA 파일의 빠진 답변을 다시 요청합니다.")
+            retry_requests = []
+            for qa_id, indices in missing.items():
+                department, document, questions = qa_inputs[qa_id]
+                retry_requests.append(make_request(f"qa_{qa_id}", department, document, [questions[i] for i in indices]))
+            retry_results = batch_runner.run(retry_requests, name="student_answers_retry")
+            for qa_id, indices in missing.items():
+                result = retry_results.get(f"qa_{qa_id}", {})
+                if result.get("text"):
+                    retried = self.parse_student_answers(result["text"], len(indices))
+                    for i, answer in zip(indices, retried):
+                        generated[qa_id]["answers"][i] = answer
+        return generated
+    
+    def prepare_qa(self, qa_id: str, student_answers: List[str] = None, refresh_cache: bool = False) -> Dict[str, Any]:
+        """
+        QA 데이터를 로드하고 학생 답변을 생성하여 채점 직전 상태를 만듭니다.
+        student_answers가 주어지면(배치 모드) 답변 생성을 건너뜁니다.
+        refresh_cache면 LLM 응답 캐시를 읽지 않고 답변을 새로 생성합니다.
+        """
         print(f"QA {qa_id} 평가 시작...")
         
         # QA 데이터 로드
@@ -160,18 +334,39 @@ class BERTScoreEvalPipeline:
             print(f"QA {qa_id}: 질문 또는 ground truth를 찾을 수 없습니다.")
             return {}
         
+        # ground truth 파일이 바뀌었으면 이전 버전의 임베딩을 캐시에서 제거
+        if self.reference_store is not None:
+            qa_file_path = os.path.join(self.ground_truth_1_dir_path, f"qa_{qa_id}.json")
+            self.reference_store.sync_source(
+                qa_file_path, [self.normalize_text(gt) for gts in ground_truth_answers for gt in gts]
+            )
+        
         # department와 document 정보 추출
         department = qa_data.get("department", "사학과")
         document = qa_data.get("document", "")
         
         # 학생 답변 생성
-        student_answers = self.generate_student_answers(department, document, questions)
+        if student_answers is None:
+            student_answers = self.generate_student_answers(department, document, questions, refresh_cache)
+        
+        # zip과 동일하게 가장 짧은 목록 길이에 맞춤
+        num_items = min(len(questions), len(student_answers), len(ground_truth_answers))
+        return {
+            "qa_id": qa_id,
+            "department": department,
+            "questions": questions,
+            "student_answers": student_answers[:num_items],
+            "ground_truth_answers": ground_truth_answers[:num_items],
+        }
+    
+    def build_evaluation_result(self, prepared: Dict[str, Any], scores_list: List[Dict[str, float]]) -> Dict[str, Any]:
+        """채점 결과를 질문별/전체 평균 형태의 평가 결과로 정리합니다."""
+        qa_id = prepared["qa_id"]
+        questions = prepared["questions"]
         
-        # 각 질문에 대한 BERTScore 계산
         question_scores = []
-        for i, (question, student_answer, gt_answers) in enumerate(zip(questions, student_answers, ground_truth_answers)):
-            scores = self.calculate_bertscore(student_answer, gt_answers)
-            
+        for i, (question, student_answer, gt_answers, scores) in enumerate(
+                zip(questions, prepared["student_answers"], prepared["ground_truth_answers"], scores_list)):
             question_scores.append({
                 "question_index": i + 1,
                 "question": question,
@@ -189,7 +384,7 @@ class BERTScoreEvalPipeline:
         
         evaluation_result = {
             "qa_id": qa_id,
-            "department": department,
+            "department": prepared["department"],
             "total_questions": len(questions),
             "question_scores": question_scores,
             "average_scores": {
@@ -203,35 +398,184 @@ class BERTScoreEvalPipeline:
         
         return evaluation_result
     
-    def run_evaluation(self, qa_ids: List[str] = None):
-        """전체 평가를 실행합니다."""
+    def score_prepared_batch(self, prepared_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """여러 QA 파일의 모든 질문을 한 번의 배치 호출로 채점합니다."""
+        all_student_answers, all_gt_answers = [], []
+        for prepared in prepared_list:
+            all_student_answers.extend(prepared["student_answers"])
+            all_gt_answers.extend(prepared["ground_truth_answers"])
+        
+        all_scores = self.calculate_bertscores(all_student_answers, all_gt_answers)
+        
+        results = []
+        offset = 0
+        for prepared in prepared_list:
+            num_items = len(prepared["student_answers"])
+            results.append(self.build_evaluation_result(prepared, all_scores[offset:offset + num_items]))
+            offset += num_items
+        return results
+    
+    def score_sharded(self, prepared_batches: List[List[Dict[str, Any]]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        배치들을 num_workers개의 fork된 프로세스에서 채점하고, 입력 순서대로 배치별 결과를 돌려줍니다.
+        모델은 fork 전에 한 번만 로드하므로 자식 프로세스들은 가중치를 copy-on-write로 공유합니다.
+        임베딩 캐시에는 자식이 쓰지 않고, 자식이 새로 계산한 정답 임베딩을 이 프로세스가 모아 저장합니다.
+        토큰 캐시(text_tokenizer)는 자식이 pid별로 연결을 새로 열어 WAL 모드로 함께 씁니다.
+        """
+        if not prepared_batches:
+            return
+        num_workers = min(self.num_workers, len(prepared_batches))
+        self.scorer.load()
+        if num_workers <= 1 or self.scorer.device != "cpu" or "fork" not in multiprocessing.get_all_start_methods():
+            if num_workers > 1:
+                print(f"BERTScore 분할 채점은 fork를 지원하는 CPU 환경에서만 사용합니다 (device={self.scorer.device}). "
+                      f"한 프로세스에서 채점합니다.")
+            for prepared_list in prepared_batches:
+                yield self.score_prepared_batch(prepared_list)
+            return
+        
+        if self.reference_store is not None:
+            # 부모가 prepare_qa에서 바꾼 캐시 인덱스를 자식이 fork 시점 그대로 물려받도록 먼저 저장
+            self.reference_store.save()
+        if self.text_tokenizer is not None:
+            self.text_tokenizer.flush()
+        # 프로세스마다 torch 스레드를 나눠 코어 수 이상으로 스레드가 돌지 않게 함
+        threads_per_worker = self.scorer.num_threads or max((os.cpu_count() or 1) // num_workers, 1)
+        print(f"BERTScore 분할 채점: {len(prepared_batches)}개 배치, 프로세스 {num_workers}개 (프로세스당 스레드 {threads_per_worker}개)")
+        
+        _SHARD_STATE.update(pipeline=self, batches=prepared_batches)
+        try:
+            with get_telemetry().span("scoring", name="bertscore_sharded", items=len(prepared_batches)):
+                with multiprocessing.get_context("fork").Pool(num_workers, initializer=_init_shard_worker,
+                                                              initargs=(threads_per_worker,)) as pool:
+                    # imap은 끝난 순서와 상관없이 입력 순서대로 돌려주므로 결과 순서가 실행마다 같음
+                    for results, new_embeddings, telemetry in pool.imap(_score_shard, range(len(prepared_batches))):
+                        if self.reference_store is not None and new_embeddings:
+                            self.reference_store.put_many(new_embeddings)
+                        get_telemetry().aggregator.merge(telemetry)
+                        yield results
+        finally:
+            _SHARD_STATE.clear()
+            if self.reference_store is not None:
+                self.reference_store.save()
+    
+    def evaluate_qa(self, qa_id: str) -> Dict[str, Any]:
+        """하나의 QA 데이터에 대해 평가를 수행합니다."""
+        prepared = self.prepare_qa(qa_id)
+        if not prepared:
+            return {}
+        return self.score_prepared_batch([prepared])[0]
+    
+    def run_evaluation(self, qa_ids: List[str] = None, batch_runner: BatchRunner = None):
+        """
+        전체 평가를 실행합니다.
+        batch_runner가 주어지면 학생 답변을 provider 배치 API로 한꺼번에 생성한 뒤 qa_id로 합쳐 채점합니다.
+        num_workers가 2 이상이어도 결과와 overall_evaluation.json은 qa_ids 순서 그대로 저장됩니다.
+        incremental이면 run_ledger.json의 입력 해시가 그대로인 QA 파일은 기존 결과를 쓰고,
+        ground truth나 채점 방식만 바뀐 파일은 기존 학생 답변으로 채점만 다시 한 뒤 전체 평균에 합칩니다.
+        """
         if qa_ids is None:
-            # ground_truth_1 디렉토리에서 모든 QA 파일 찾기
-            qa_files = [f for f in os.listdir(self.ground_truth_1_dir_path) if f.startswith("qa_") and f.endswith(".json")]
+            # ground_truth_1 디렉토리에서 모든 QA 파일 찾기 (실행마다 같은 순서가 되도록 정렬)
+            qa_files = sorted(f for f in os.listdir(self.ground_truth_1_dir_path) if f.startswith("qa_") and f.endswith(".json"))
             qa_ids = [f.replace("qa_", "").replace(".json", "") for f in qa_files]
         
-        all_results = []
+        results_by_id = {}
+        errors = []
         
+        inputs_by_id, previous_answers, refresh_ids = {}, {}, set()
         for qa_id in qa_ids:
             try:
-                result = self.evaluate_qa(qa_id)
-                if result:
-                    all_results.append(result)
-                    
-                    # 개별 결과 저장
-                    result_file_path = os.path.join(self.eval_dir_path, f"eval_qa_{qa_id}.json")
-                    with open(result_file_path, "w", encoding="utf-8") as f:
-                        json.dump(result, f, ensure_ascii=False, indent=4)
-                        
-            except Exception as e:
-                print(f"QA {qa_id} 평가 중 오류 발생: {e}")
+                inputs_by_id[qa_id] = self.ledger_inputs(self.load_qa_data(qa_id))
+            except Exception:
+                # 읽을 수 없는 파일은 아래 prepare_qa에서 오류로 처리
+                continue
+            previous = self.load_previous_result(qa_id)
+            if previous is None:
+                continue
+            if not all(qs["student_answer"] for qs in previous["question_scores"]):
+                # 빈 답변 때문에 ledger에서 지운 파일은 캐시된 같은 응답이 다시 나오지 않도록 캐시를 읽지 않고 새로 생성
+                refresh_ids.add(qa_id)
+                continue
+            if not self.incremental:
+                continue
+            plan = self.ledger.plan(f"eval_qa_{qa_id}", inputs_by_id[qa_id], SCORING_INPUTS)
+            if plan == "rescore":
+                previous_answers[qa_id] = [qs["student_answer"] for qs in previous["question_scores"]]
+            elif plan == "reuse":
+                results_by_id[qa_id] = previous
+        reused_ids = list(results_by_id)
+        pending_ids = [qa_id for qa_id in qa_ids if qa_id not in results_by_id]
+        if self.incremental:
+            print(f"증분 평가: {len(reused_ids)}개 QA 파일 재사용, {len(previous_answers)}개 재채점, "
+                  f"{len(pending_ids) - len(previous_answers)}개 새로 평가")
+        
+        pregenerated = None
+        if batch_runner is not None:
+            pregenerated = self.generate_student_answers_batch(
+                [qa_id for qa_id in pending_ids if qa_id not in previous_answers], batch_runner
+            )
+        
+        def prepare_batch(batch_qa_ids: List[str]) -> List[Dict[str, Any]]:
+            prepared_list = []
+            for qa_id in batch_qa_ids:
+                try:
+                    student_answers = previous_answers.get(qa_id)
+                    if student_answers is None and pregenerated is not None:
+                        generated = pregenerated.get(qa_id, {"error": {"message": "배치 요청에 포함되지 않음"}})
+                        if "error" in generated:
+                            print(f"QA {qa_id} 배치 답변 생성 실패: {generated['error']}")
+                            errors.append({"qa_id": qa_id, **generated["error"]})
+                            continue
+                        student_answers = generated["answers"]
+                    prepared = self.prepare_qa(qa_id, student_answers, refresh_cache=qa_id in refresh_ids)
+                    if prepared:
+                        prepared_list.append(prepared)
+                except LLMCallError as e:
+                    # 답변 생성에 실패한 QA는 0점으로 평균에 섞지 않고 오류로 기록
+                    print(f"QA {qa_id} 학생 답변 생성 실패: {e}")
+                    errors.append({"qa_id": qa_id, **e.to_dict()})
+                except Exception as e:
+                    print(f"QA {qa_id} 평가 중 오류 발생: {e}")
+            return prepared_list
+        
+        def save_results(results: List[Dict[str, Any]]):
+            for result in results:
+                qa_id = result["qa_id"]
+                results_by_id[qa_id] = result
+                
+                # 개별 결과 저장
+                result_file_path = os.path.join(self.eval_dir_path, f"eval_qa_{qa_id}.json")
+                with open(result_file_path, "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False, indent=4)
+                # 빈 답변(생성 실패, 복구하지 못한 번호)이 있는 결과는 기록하지 않아 다음 실행에서 다시 생성
+                if qa_id in inputs_by_id and all(qs["student_answer"] for qs in result["question_scores"]):
+                    self.ledger.record(f"eval_qa_{qa_id}", inputs_by_id[qa_id])
+                else:
+                    self.ledger.forget(f"eval_qa_{qa_id}")
+            # 중간에 중단되어도 이미 저장한 결과는 다음 실행에서 재사용
+            self.ledger.save()
+        
+        batch_qa_ids = [pending_ids[i:i + self.files_per_batch] for i in range(0, len(pending_ids), self.files_per_batch)]
+        if self.num_workers > 1:
+            # 답변 생성(API 호출)은 이 프로세스에서 끝내고, CPU를 쓰는 채점만 여러 프로세스로 나눔
+            prepared_batches = [prepared_list for prepared_list in map(prepare_batch, batch_qa_ids) if prepared_list]
+            for results in self.score_sharded(prepared_batches):
+                save_results(results)
+        else:
+            # files_per_batch개의 QA 파일씩 학생 답변을 만든 뒤 한 번에 채점
+            for prepared_list in map(prepare_batch, batch_qa_ids):
+                if prepared_list:
+                    save_results(self.score_prepared_batch(prepared_list))
         
-        # 전체 결과 저장
+        # 재사용한 결과와 새 결과를 qa_ids 순서로 합쳐 전체 결과 저장
+        all_results = [results_by_id[qa_id] for qa_id in qa_ids if qa_id in results_by_id]
         if all_results:
             overall_result = {
                 "evaluation_summary": {
                     "total_qa_evaluated": len(all_results),
-                    "qa_ids": qa_ids
+                    "qa_ids": qa_ids,
+                    "reused_qa": reused_ids,
+                    "failed_qa": errors
                 },
                 "detailed_results": all_results,
                 "overall_averages": {
@@ -249,6 +593,10 @@ class BERTScoreEvalPipeline:
             print(f"평가된 QA 수: {len(all_results)}")
             print(f"전체 평균 F1: {overall_result['overall_averages']['f1']:.4f}")
         
+        # 이번 실행의 LLM 호출 / 채점 시간 / 토큰 사용량 요약
+        telemetry = get_telemetry()
+        telemetry.write_summary(os.path.join(self.eval_dir_path, "telemetry_summary.json"))
+        print(telemetry.format_summary())
         return all_results
 
 
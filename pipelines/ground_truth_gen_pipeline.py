@@ -1,11 +1,19 @@
 import os
 import json
+import time
 import traceback
+from typing import Any, Callable, Dict, Optional, Union
 from agents.document_agent import DocumentAgent
 from agents.comment_agent import CommentAgent
 from agents.question_gen_agent import QuestionGenAgent
 from agents.priority_agent import PriorityAgent
 from agents.ground_truth_agent import GroundTruthAgent
+from utils.checkpoint_utils import atomic_write_json, compute_fingerprint
+from utils.stage_graph import Stage, StageGraph
+
+# processed_{id}.json에만 두는 stage 내부 값 (qa ground truth 파일의 형식은 그대로 유지)
+STAGE_INTERNAL_KEYS = ("checkpoints", "questions", "ground_truth")
+
 class GroundTruthGenPipeline:
     def __init__(self, base_path: str):
         self.document_agent = DocumentAgent()
@@ -13,7 +21,7 @@ class GroundTruthGenPipeline:
         self.question_gen_agent = QuestionGenAgent()
         self.priority_agent = PriorityAgent()
         self.ground_truth_agent = GroundTruthAgent()
-        
+
         self.processed_dir_path = os.path.join(base_path, "data", "processed")
         if not os.path.exists(self.processed_dir_path):
             os.makedirs(self.processed_dir_path)
@@ -23,90 +31,214 @@ class GroundTruthGenPipeline:
         self.eval_dir_path = os.path.join(base_path, "data", "eval")
         if not os.path.exists(self.eval_dir_path):
             os.makedirs(self.eval_dir_path)
-        
-    def run(self, id: str, department: str, document: str):
+
+    def load_context(self, id: str, department: str, document: str) -> Dict[str, Any]:
         """
-        department, document를 입력 받아 pipeline 실행
+        개별 processed.json을 생성/불러와서 단계 실행에 필요한 상태를 만듭니다.
         """
         processed_json_path = os.path.join(self.processed_dir_path, f"processed_{id}.json")
-        qa_ground_truth_json_path = os.path.join(self.qa_dir_path, "ground_truth", f"qa_{id}.json")
-        eval_json_path = os.path.join(self.eval_dir_path, f"eval_{id}.json")
-        try:
-            # 개별 processed.json 생성/불러오기
-            if not os.path.exists(processed_json_path):
-                processed_data={}
-                processed_data[id] = {
-                    "department":department,
-                    "document":document
-                    }
-            else:
-                with open(processed_json_path, "r", encoding="utf-8") as f:
-                    processed_data = json.load(f)
-                    
-            summary = self.document_agent.generate_document(
-                department=department,
-                document=document
-            )
-            processed_data[id]["summary"]=summary
-            
-            # comment가 없을 경우 gpt로 값 생성
-            if  not processed_data[id].get("comment"):
-                # comment 생성
-                comment = self.comment_agent.generate_comment(
-                    department=department,
-                    document=summary
-                )
-                processed_data[id]["comment"]=comment
-            else:
-                comment = processed_data[id]["comment"]
-            
-            with open(processed_json_path, "w", encoding="utf-8") as f:
-                json.dump(processed_data, f, ensure_ascii=False, indent=4)
-            
-            # 질문 생성
-            questions = self.question_gen_agent.generate_questions(
+        if not os.path.exists(processed_json_path):
+            processed_data={}
+            processed_data[id] = {
+                "department":department,
+                "document":document
+                }
+        else:
+            with open(processed_json_path, "r", encoding="utf-8") as f:
+                processed_data = json.load(f)
+
+        return {
+            "id": id,
+            "department": department,
+            "document": document,
+            "processed_data": processed_data,
+            "processed_json_path": processed_json_path,
+            "qa_ground_truth_json_path": os.path.join(self.qa_dir_path, "ground_truth", f"qa_{id}.json"),
+        }
+
+    def _run_stage(self, ctx: Dict[str, Any], stage: str, output_key: str, inputs: Dict[str, Any],
+                   prompt_path: str, compute: Callable[[], Any]):
+        """
+        입력값과 프롬프트 파일의 fingerprint가 저장된 체크포인트와 같으면 저장된 결과를 재사용하고,
+        아니면 compute()를 실행해 결과와 fingerprint를 processed.json에 원자적으로 저장합니다.
+        """
+        record = ctx["processed_data"][ctx["id"]]
+        checkpoints = record.setdefault("checkpoints", {})
+        fingerprint = compute_fingerprint(inputs, prompt_path)
+
+        checkpoint = checkpoints.get(stage)
+        if checkpoint and checkpoint.get("fingerprint") == fingerprint and record.get(output_key):
+            print(f"[{ctx['id']}] '{stage}' 단계 건너뜀 (체크포인트 일치)")
+            return record[output_key]
+
+        output = compute()
+        record[output_key] = output
+        # 빈 결과(API 오류 등)는 체크포인트로 남기지 않아 다음 실행에서 다시 시도
+        if output:
+            checkpoints[stage] = {"fingerprint": fingerprint, "completed_at": time.time()}
+        else:
+            checkpoints.pop(stage, None)
+        atomic_write_json(ctx["processed_json_path"], ctx["processed_data"])
+        return output
+
+    def run_summary_stage(self, ctx: Dict[str, Any]) -> str:
+        department, document = ctx["department"], ctx["document"]
+        return self._run_stage(
+            ctx, "summary", "summary",
+            {"department": department, "document": document},
+            self.document_agent.prompt_path,
+            lambda: self.document_agent.generate_document(department=department, document=document)
+        )
+
+    def run_comment_stage(self, ctx: Dict[str, Any]) -> str:
+        record = ctx["processed_data"][ctx["id"]]
+        # 체크포인트 없이 미리 들어있는 comment(전문가 코멘트)는 그대로 사용
+        if record.get("comment") and "comment" not in record.get("checkpoints", {}):
+            return record["comment"]
+
+        department, summary = ctx["department"], record.get("summary", "")
+        # comment가 없을 경우 gpt로 값 생성
+        return self._run_stage(
+            ctx, "comment", "comment",
+            {"department": department, "summary": summary},
+            self.comment_agent.prompt_path,
+            lambda: self.comment_agent.generate_comment(department=department, document=summary)
+        )
+
+    def run_question_stage(self, ctx: Dict[str, Any]):
+        record = ctx["processed_data"][ctx["id"]]
+        department, document, comment = ctx["department"], ctx["document"], record.get("comment", "")
+        # 질문 생성
+        return self._run_stage(
+            ctx, "questions", "questions",
+            {"department": department, "document": document, "comment": comment},
+            self.question_gen_agent.prompt_path,
+            lambda: self.question_gen_agent.generate_questions(
                 department=department,
                 document=document,
                 comment=comment
             )
-            # 질문 sort
-            ranked_questions = self.priority_agent.generate_priority(
-                department=department,
-                questions=questions,
-            )
-            processed_data[id]["qa"]=ranked_questions
-            
-            # ground_truth 생성
-            questions = []
-            for qa in processed_data[id]["qa"]:
-                ranking = qa.get("ranking")
-                category = qa.get("category")
-                question = qa.get("question")
-                questions.append(f"{ranking}. [{category}]{question}")
-            
-            if questions != []:
-                ground_truth = self.ground_truth_agent.generate_ground_truth(
+        )
+
+    def run_priority_stage(self, ctx: Dict[str, Any]):
+        record = ctx["processed_data"][ctx["id"]]
+        department, questions = ctx["department"], record.get("questions", [])
+        # 질문 sort
+        return self._run_stage(
+            ctx, "ranked_questions", "qa",
+            {"department": department, "questions": questions},
+            self.priority_agent.prompt_path,
+            lambda: self.priority_agent.generate_priority(department=department, questions=questions)
+        )
+
+    def run_ground_truth_stage(self, ctx: Dict[str, Any]):
+        record = ctx["processed_data"][ctx["id"]]
+        department, document = ctx["department"], ctx["document"]
+
+        # ground_truth 생성
+        questions = []
+        for qa in record.get("qa", []):
+            ranking = qa.get("ranking")
+            category = qa.get("category")
+            question = qa.get("question")
+            questions.append(f"{ranking}. [{category}]{question}")
+
+        ground_truth = {}
+        if questions != []:
+            ground_truth = self._run_stage(
+                ctx, "ground_truth", "ground_truth",
+                {"department": department, "document": document, "questions": questions},
+                self.ground_truth_agent.prompt_path,
+                lambda: self.ground_truth_agent.generate_ground_truth(
                     department=department,
                     document=document,
                     questions=questions,
                 )
-            
-            for item in processed_data[id]["qa"]:
-                rank = item["ranking"]
-                if rank in ground_truth:
-                    item["ground_truth"] = ground_truth[rank]
-            
-            with open(qa_ground_truth_json_path, "w", encoding="utf-8") as f:
-                json.dump(processed_data, f, ensure_ascii=False, indent=4)
-                
+            )
+
+        for item in record.get("qa", []):
+            rank = item["ranking"]
+            if rank in ground_truth:
+                item["ground_truth"] = ground_truth[rank]
+        return ground_truth
+
+    def save_result(self, ctx: Dict[str, Any]):
+        """체크포인트와 stage 중간 결과를 제외한 결과를 qa ground truth 파일로 저장합니다."""
+        result = {
+            key: {k: v for k, v in value.items() if k not in STAGE_INTERNAL_KEYS}
+            for key, value in ctx["processed_data"].items()
+        }
+        atomic_write_json(ctx["qa_ground_truth_json_path"], result)
+        return result
+
+    def build_stage_graph(self, on_complete: Callable[[str, Optional[Dict[str, Any]]], None],
+                          stage_workers: Union[int, Dict[str, int]] = 4, queue_size: Optional[int] = None) -> StageGraph:
+        """
+        각 에이전트 호출을 별도 stage(전용 bounded 큐 + 워커)로 두는 문서 간 파이프라인을 만듭니다.
+        submit((id, department, document))로 넣으면 완료/실패 시 on_complete(id, result)가 호출됩니다.
+        실패한 문서의 result는 None입니다.
+        """
+        def workers_for(name):
+            if isinstance(stage_workers, dict):
+                return stage_workers.get(name, 1)
+            return stage_workers
+
+        def with_ctx(stage_fn):
+            def run_stage(ctx):
+                stage_fn(ctx)
+                return ctx
+            return run_stage
+
+        def summary_stage(args):
+            ctx = self.load_context(*args)
+            self.run_summary_stage(ctx)
+            return ctx
+
+        def ground_truth_stage(ctx):
+            self.run_ground_truth_stage(ctx)
+            return ctx["id"], self.save_result(ctx)
+
+        def on_error(item, stage_name, error):
+            id = item["id"] if isinstance(item, dict) else item[0]
+            print(f"Error during pipeline execution (doc {id}, stage {stage_name}): {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            on_complete(id, None)
+
+        stage_fns = [
+            ("summary", summary_stage),
+            ("comment", with_ctx(self.run_comment_stage)),
+            ("questions", with_ctx(self.run_question_stage)),
+            ("priority", with_ctx(self.run_priority_stage)),
+            ("ground_truth", ground_truth_stage),
+        ]
+        stages = []
+        for name, fn in stage_fns:
+            workers = workers_for(name)
+            stages.append(Stage(name, fn, workers=workers, queue_size=queue_size or workers * 2))
+        return StageGraph(stages, on_complete=lambda output: on_complete(*output), on_error=on_error)
+
+    def run(self, id: str, department: str, document: str):
+        """
+        department, document를 입력 받아 pipeline 실행하고, 성공하면 저장한 결과를 반환
+        """
+        result = None
+        try:
+            ctx = self.load_context(id, department, document)
+            self.run_summary_stage(ctx)
+            self.run_comment_stage(ctx)
+            self.run_question_stage(ctx)
+            self.run_priority_stage(ctx)
+            self.run_ground_truth_stage(ctx)
+            result = self.save_result(ctx)
+
         except FileNotFoundError as fnf_error:
             print(f"File not found error: {fnf_error}")
-            traceback.print_exc()  
+            traceback.print_exc()
         except json.JSONDecodeError as json_error:
             print(f"JSON decode error: {json_error}")
-            traceback.print_exc()  
+            traceback.print_exc()
         except Exception as e:
             print(f"Error during pipeline execution: {e}")
-            traceback.print_exc()  
-        
-        return None
\ No newline at end of file
+            traceback.print_exc()
+
+        return result
@@ -1,13 +1,16 @@
 # 파일명: prepare_dataset.py
 
 import os
+import sys
 import json
 from typing import List, Dict, Any
+from utils.qa_store import QAStore
 
-def unify_all_qa_sets(base_dir: str, output_dir: str) -> None:
+def unify_all_qa_sets(base_dir: str, output_dir: str, write_legacy_json: bool = False) -> None:
     """
     여러 ground_truth 디렉토리에서 총 300개의 QA 세트를 개별 항목으로 통합하여
-    하나의 JSON 파일로 저장합니다.
+    문서 테이블 + 질문 테이블로 정규화된 QA 저장소(unified_300_qa_store)에 저장합니다.
+    write_legacy_json이면 항목마다 문서를 복사한 기존 JSON 파일도 함께 씁니다.
     """
     print("총 300개 QA 세트 통합을 시작합니다...")
     os.makedirs(output_dir, exist_ok=True)
@@ -52,15 +55,19 @@ def unify_all_qa_sets(base_dir: str, output_dir: str) -> None:
                     unified_qa_list.append(unified_item)
                     unified_id_counter += 1
     
-    # 통합된 데이터 파일로 저장
-    unified_file_path = os.path.join(output_dir, "unified_300_qa_sets.json")
-    with open(unified_file_path, "w", encoding="utf-8") as f:
-        json.dump(unified_qa_list, f, ensure_ascii=False, indent=2)
+    # 문서는 고유한 것만 한 번 저장하고 질문은 doc_id로 문서를 가리킴
+    store_path = os.path.join(output_dir, "unified_300_qa_store")
+    store = QAStore.write(store_path, unified_qa_list)
+    print(f"통합 완료! 총 {len(store)}개의 QA 세트(고유 문서 {store.num_documents}개)를 '{store_path}'에 저장했습니다.")
 
-    print(f"통합 완료! 총 {len(unified_qa_list)}개의 QA 세트를 '{unified_file_path}' 파일에 저장했습니다.")
+    if write_legacy_json:
+        unified_file_path = os.path.join(output_dir, "unified_300_qa_sets.json")
+        with open(unified_file_path, "w", encoding="utf-8") as f:
+            json.dump(unified_qa_list, f, ensure_ascii=False)
+        print(f"기존 형식 JSON도 '{unified_file_path}' 파일에 저장했습니다.")
 
 
 if __name__ == "__main__":
     BASE_DIRECTORY = "data/qa"
     OUTPUT_DIRECTORY = os.path.join(BASE_DIRECTORY, "unified_eval_results_300")
-    unify_all_qa_sets(BASE_DIRECTORY, OUTPUT_DIRECTORY)
\ No newline at end of file
+    unify_all_qa_sets(BASE_DIRECTORY, OUTPUT_DIRECTORY, write_legacy_json="--legacy_json" in sys.argv)
\ No newline at end of file
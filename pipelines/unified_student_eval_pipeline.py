@@ -3,7 +3,7 @@
 import os
 import json
 import numpy as np
-import time
+import asyncio
 from typing import List, Dict, Any
 
 # --- 사전 준비 ---
@@ -13,46 +13,80 @@ from utils.gpt_api_utils import (
     call_claude_with_model, 
     call_gemini_with_model
 )
-from rouge_score import rouge_scorer
+from utils.gpt_api_utils import append_reasoning_instruction, TEMPERATURE
+from utils.llm_client import LLMCallError
+from utils.batch_api import BatchRunner, make_batch_request, create_batch_runner
+from utils.async_dispatcher import AsyncLLMDispatcher, estimate_tokens
+from utils.rate_limiter import get_rate_limiter
+from utils.rouge_engine import RougeEngine, verify_against_rouge_score
+from utils.korean_tokenizer import get_tokenizer
+from utils.prompt_registry import get_prompt_registry
+from utils.telemetry import get_telemetry, start_exporter
+from utils.structured_output import parse_numbered_answers
+from utils.qa_store import QAStore, document_hash
+from utils.run_ledger import RunLedger, content_hash
+
+# 채점 방식(평균 방법, 오류 항목 처리 등)을 바꾸면 올려서 이전 결과를 모두 다시 채점하게 함
+METRIC_VERSION = 1
+# 이 입력들만 바뀐 항목은 기존 답변을 그대로 두고 채점만 다시 함
+SCORING_INPUTS = ("ground_truth", "metric")
 
 class MultiModelEvaluator:
     """
     미리 통합된 300개의 QA 세트 파일을 사용하여,
-    student_agent.txt 프롬프트 템플릿으로 여러 LLM 모델을 순차적으로 평가하는 파이프라인.
+    student_agent.txt 프롬프트 템플릿으로 여러 LLM 모델을 동시에 평가하는 파이프라인.
     """
-    def __init__(self):
+    def __init__(self, provider_limits: Dict[str, Dict[str, int]] = None, verify_rouge: bool = False,
+                 tokenizer: str = "korean", group_questions: bool = False, max_questions_per_call: int = 10,
+                 incremental: bool = False):
         self.eval_dir = "data/qa/unified_eval_results_300"
         self.unified_data_path = os.path.join(self.eval_dir, "unified_300_qa_sets.json")
+        # prepare_dataset.py가 만드는 정규화 저장소 (있으면 위 JSON 대신 사용)
+        self.unified_store_path = os.path.join(self.eval_dir, "unified_300_qa_store")
         os.makedirs(self.eval_dir, exist_ok=True)
 
-        self.rouge_scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=False)
+        # 정답 세트를 한 번만 토큰화해 두고 모델별 답변 전체를 배치로 채점하는 ROUGE 엔진
+        # 기본은 조사를 떼어내는 한국어 토크나이저, 'rouge'는 기존 rouge_score와 같은 결과 (토큰화 결과는 디스크에 캐시)
+        self.tokenizer = get_tokenizer(tokenizer, cache_dir=os.path.join(self.eval_dir, "token_cache"))
+        self.rouge_engine = RougeEngine(tokenizer=self.tokenizer)
+        # True면 채점 결과를 rouge_score와 대조 (rouge 토크나이저일 때만 의미가 있음)
+        if verify_rouge and tokenizer != "rouge":
+            print(f"'{tokenizer}' 토크나이저는 rouge_score와 결과가 다르므로 --verify_rouge를 건너뜁니다.")
+            verify_rouge = False
+        self.verify_rouge = verify_rouge
 
-        # ✅ 1. student_agent.txt를 로드하고 system/user 템플릿으로 분리하여 저장합니다.
-        self.system_template, self.user_template = self._load_and_split_prompt_template()
+        # ✅ 1. student_agent.txt는 레지스트리에서 한 번 로드/분리하고, 파일이 바뀐 경우에만 다시 읽습니다.
+        self.prompt_path = os.path.join("config", "prompts", "student_agent.txt")
+        self.prompts = get_prompt_registry()
+        self.prompts.get(self.prompt_path)
 
         # --- ✅ 평가할 모델과 설정 정의 ---
         self.models_to_evaluate = {
-            "GPT4o_on": { "func": call_gpt4_with_model, "model_name": "gpt-4o", "reasoning": True },
-            "GPT4o_off": { "func": call_gpt4_with_model, "model_name": "gpt-4o-mini", "reasoning": False },
+            "GPT4o_on": { "func": call_gpt4_with_model, "provider": "openai", "model_name": "gpt-4o", "reasoning": True },
+            "GPT4o_off": { "func": call_gpt4_with_model, "provider": "openai", "model_name": "gpt-4o-mini", "reasoning": False },
         }
 
-    # ✅ 2. student_agent.txt를 로드하고 분리하는 헬퍼 함수
-    def _load_and_split_prompt_template(self) -> (str, str):
-        prompt_path = os.path.join("config", "prompts", "student_agent.txt")
-        if not os.path.exists(prompt_path):
-            raise FileNotFoundError(f"프롬프트 파일이 없습니다: {prompt_path}")
-        
-        with open(prompt_path, "r", encoding="utf-8") as f:
-            full_template = f.read()
+        # provider별 동시 요청 수 / RPM / TPM 제한 (None이면 기본값 + 환경변수)
+        # 공유 rate limiter가 켜져 있으면 RPM/TPM은 그 limiter에 적용되고 디스패처는 동시 요청 수만 제한
+        self.provider_limits = provider_limits
 
-        if '---' not in full_template:
-            raise ValueError("프롬프트 파일에 system과 user 프롬프트를 구분하는 '---' 마커가 없습니다.")
-        
-        system_part, user_part = full_template.split('---', 1)
-        return system_part.strip(), user_part.strip()
+        # True면 같은 문서의 질문들을 한 번의 호출(최대 max_questions_per_call개)로 묻고 번호별로 답변을 나눔
+        self.group_questions = group_questions
+        self.max_questions_per_call = max(max_questions_per_call, 1)
+
+        # (모델, 질문)마다 입력 해시를 기록하고, incremental이면 입력이 바뀐 항목만 다시 호출/채점
+        self.ledger = RunLedger(os.path.join(self.eval_dir, "run_ledger.json"))
+        self.incremental = incremental
 
     def load_unified_data(self) -> List[Dict[str, Any]]:
-        """통합된 QA 세트 JSON 파일을 로드합니다."""
+        """
+        통합된 QA 세트를 로드합니다.
+        QA 저장소가 있으면 문서 본문은 필요할 때 mmap으로 읽고, 없으면 기존 JSON 파일을 읽습니다.
+        """
+        if QAStore.exists(self.unified_store_path):
+            print(f"통합 QA 저장소 로드 중: '{self.unified_store_path}'")
+            return QAStore(self.unified_store_path).items()
+
         print(f"통합 데이터 파일 로드 중: '{self.unified_data_path}'")
         if not os.path.exists(self.unified_data_path):
             raise FileNotFoundError(f"오류: 통합 데이터 파일이 없습니다. 먼저 prepare_dataset.py를 실행하세요.")
@@ -60,28 +94,99 @@ class MultiModelEvaluator:
         with open(self.unified_data_path, "r", encoding="utf-8") as f:
             return json.load(f)
 
+    def item_hashes(self, qa_item: Dict[str, Any]) -> Dict[str, str]:
+        """모델과 무관한 항목 입력(질문/문서, 정답 세트)의 해시. QA 저장소 항목은 문서 본문을 읽지 않음."""
+        doc_hash = getattr(qa_item, "document_hash", None) or document_hash(qa_item.get("document", ""))
+        return {
+            "qa": content_hash([qa_item.get("department"), doc_hash, qa_item["question"]]),
+            "ground_truth": content_hash(qa_item["ground_truths"]),
+        }
+
+    def run_hashes(self, model_info: Dict[str, Any]) -> Dict[str, str]:
+        """모델 하나의 모든 항목이 공유하는 입력(프롬프트, 모델 설정, 채점 방식)의 해시."""
+        return {
+            # 묶음 호출은 여러 질문을 한 프롬프트에 넣으므로 묶음 설정도 프롬프트의 일부로 봄
+            "prompt": content_hash({
+                "template": self.prompts.content_hash(self.prompt_path),
+                "group_questions": self.max_questions_per_call if self.group_questions else None,
+            }),
+            "model": content_hash({
+                "provider": model_info.get("provider", "openai"),
+                "model_name": model_info["model_name"],
+                "reasoning": model_info["reasoning"],
+                "temperature": model_info.get("temperature", TEMPERATURE),
+            }),
+            "metric": content_hash({"version": METRIC_VERSION, "tokenizer": self.tokenizer.name}),
+        }
+
+    def load_previous_results(self, run_key: str) -> Dict[Any, Dict[str, Any]]:
+        """이전 실행의 detailed_results_<run_key>.json에서 답변이 있는 항목을 unified_id별로 읽습니다."""
+        detailed_filename = os.path.join(self.eval_dir, f"detailed_results_{run_key}.json")
+        if not os.path.exists(detailed_filename):
+            return {}
+        try:
+            with open(detailed_filename, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except ValueError:
+            return {}
+        return {r["unified_id"]: r for r in previous if "error" not in r and r.get("generated_answer") is not None}
+
+    def build_prompts(self, qa_item: Dict[str, Any]) -> (str, str):
+        """qa_item으로 system/user 프롬프트를 채웁니다."""
+        return self.build_group_prompts([qa_item])
+
+    def build_group_prompts(self, qa_items: List[Dict[str, Any]]) -> (str, str):
+        """같은 문서에 속한 qa_item들의 질문을 번호를 매겨 하나의 system/user 프롬프트로 채웁니다."""
+        # 문서/학과 정보는 묶음의 첫 항목에서 추출 (묶음 안에서는 모두 같음)
+        department = qa_items[0].get("department", "해당 학과")
+        document = qa_items[0].get("document", "제공된 문서 없음")
+        
+        template = self.prompts.get(self.prompt_path)
+
+        # 시스템 프롬프트 템플릿 채우기
+        system_prompt = template.system_template.strip().format(department=department)
+
+        # 유저 프롬프트 템플릿 채우기
+        # 질문들을 {questions} 플레이스홀더 형식("1. 질문")에 맞게 변환
+        questions_text = "\n".join(f"{i}. {item['question']}" for i, item in enumerate(qa_items, start=1))
+        user_prompt = template.user_template.strip().format(questions=questions_text, document=document)
+        return system_prompt, user_prompt
+
+    def group_items_by_document(self, all_qa_sets: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """qa_item을 (원본 파일, 학과, 문서)별로 묶고, 묶음당 질문 수를 max_questions_per_call로 제한합니다."""
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for qa_item in all_qa_sets:
+            # QA 저장소 항목은 doc_id가 같은 문서를 가리키므로 본문을 읽지 않고 묶음
+            if "doc_id" in qa_item:
+                key = qa_item["doc_id"]
+            else:
+                key = (qa_item.get("source_file"), qa_item.get("department"), qa_item.get("document"))
+            groups.setdefault(key, []).append(qa_item)
+        return [
+            items[start:start + self.max_questions_per_call]
+            for items in groups.values()
+            for start in range(0, len(items), self.max_questions_per_call)
+        ]
+
     # ✅ 3. dispatch_api_call 함수가 분리된 템플릿을 사용하도록 수정
     def dispatch_api_call(self, model_info: Dict[str, Any], qa_item: Dict[str, Any]) -> str:
         """설정에 맞는 모델의 API를 호출하고 응답을 출력합니다."""
+        return self.dispatch_group_call(model_info, [qa_item])
+
+    def dispatch_group_call(self, model_info: Dict[str, Any], qa_items: List[Dict[str, Any]]) -> str:
+        """qa_item 묶음의 질문들을 한 번의 API 호출로 묻고 응답 전체를 반환합니다."""
         api_func = model_info["func"]
         model_name = model_info["model_name"]
         reasoning = model_info["reasoning"]
+        question = qa_items[0]["question"]
         
-        # qa_item에서 필요한 모든 정보 추출
-        question = qa_item["question"]
-        department = qa_item.get("department", "해당 학과")
-        document = qa_item.get("document", "제공된 문서 없음")
-        
-        # 시스템 프롬프트 템플릿 채우기
-        system_prompt = self.system_template.format(department=department)
-
-        # 유저 프롬프트 템플릿 채우기
-        # 단일 질문을 {questions} 플레이스홀더 형식에 맞게 변환
-        questions_text = f"1. {question}"
-        user_prompt = self.user_template.format(questions=questions_text, document=document)
+        system_prompt, user_prompt = self.build_group_prompts(qa_items)
         
         print(f"    모델 호출: {model_name} (reasoning={'on' if reasoning else 'off'})")
-        print(f"    질문: {question[:100]}...")
+        if len(qa_items) > 1:
+            print(f"    질문 {len(qa_items)}개 묶음: {question[:100]}...")
+        else:
+            print(f"    질문: {question[:100]}...")
         
         try:
             answer = api_func(system_prompt, user_prompt, model_name, reasoning=reasoning)
@@ -93,66 +198,323 @@ class MultiModelEvaluator:
                 print(f"    --> 모델 응답: {answer[:200]}...")
             
             return answer
+        except LLMCallError:
+            # 재시도 후에도 실패한 호출은 구조화된 오류로 호출자에게 전달
+            raise
         except Exception as e:
             print(f"API 호출 중 오류 발생 ({model_name}, reasoning={'on' if reasoning else 'off'}): {e}")
             return "[API ERROR]"
 
     def calculate_max_rouge_score(self, generated_answer: str, ground_truths: List[str]) -> Dict[str, float]:
         """하나의 생성된 답변과 여러 정답 후보 간의 ROUGE 점수 중 가장 높은 F1 점수를 반환합니다."""
-        if not generated_answer or not ground_truths:
-            return {"rouge1_f1": 0.0, "rougeL_f1": 0.0}
+        return self.rouge_engine.score_max(generated_answer, self.rouge_engine.prepare_references(ground_truths))
+
+    def score_run_results(self, run_results: List[Dict[str, Any]], prepared_references: Dict[Any, List]):
+        """
+        한 모델의 답변 전체를 한 번의 배치 호출로 채점해 scores를 채웁니다.
+        오류 항목과 이미 점수가 있는 항목(증분 평가에서 재사용한 결과)은 건너뜁니다.
+        """
+        targets = [r for r in run_results if "error" not in r and r.get("scores") is None]
+        with get_telemetry().span("scoring", name="rouge", items=len(targets)):
+            scores_list = self.rouge_engine.score_batch(
+                [r["generated_answer"] for r in targets],
+                [prepared_references[r["unified_id"]] for r in targets]
+            )
+        for result, scores in zip(targets, scores_list):
+            result["scores"] = scores
+
+    @staticmethod
+    def _answer_result(qa_item: Dict[str, Any], generated_answer: str) -> Dict[str, Any]:
+        # 채점은 모델별로 모든 답변이 모인 뒤 score_run_results에서 한 번에 수행
+        return {
+            "unified_id": qa_item["unified_id"],
+            "question": qa_item["question"],
+            "generated_answer": generated_answer,
+            "scores": None
+        }
+
+    @staticmethod
+    def _error_result(qa_item: Dict[str, Any], error: Dict[str, Any]) -> Dict[str, Any]:
+        # 실패한 항목은 0점으로 평균에 넣지 않고 오류로 남김
+        return {
+            "unified_id": qa_item["unified_id"],
+            "question": qa_item["question"],
+            "generated_answer": None,
+            "scores": None,
+            "error": error
+        }
+
+    async def _evaluate_item(self, dispatcher: AsyncLLMDispatcher, run_key: str, model_info: Dict[str, Any],
+                             qa_item: Dict[str, Any], index: int, total_sets: int) -> Dict[str, Any]:
+        """질문 하나를 rate limit 안에서 호출하고 채점합니다."""
+        system_prompt, user_prompt = self.build_prompts(qa_item)
+        print(f"  -> {run_key}: 질문 {index+1}/{total_sets} 처리 중...")
+        
+        try:
+            generated_answer = await dispatcher.submit(
+                model_info.get("provider", "openai"), self.dispatch_api_call, model_info, qa_item,
+                estimated_tokens=estimate_tokens(system_prompt, user_prompt)
+            )
+        except LLMCallError as e:
+            return self._error_result(qa_item, e.to_dict())
+        return self._answer_result(qa_item, generated_answer)
+
+    async def _evaluate_group(self, dispatcher: AsyncLLMDispatcher, run_key: str, model_info: Dict[str, Any],
+                              qa_items: List[Dict[str, Any]], index: int, total_groups: int) -> List[Dict[str, Any]]:
+        """
+        같은 문서의 질문 묶음을 한 번에 호출하고 번호별로 답변을 나눕니다.
+        응답에서 찾지 못한 질문만 개별 호출로 다시 요청합니다.
+        """
+        if len(qa_items) == 1:
+            return [await self._evaluate_item(dispatcher, run_key, model_info, qa_items[0], index, total_groups)]
+
+        system_prompt, user_prompt = self.build_group_prompts(qa_items)
+        print(f"  -> {run_key}: 문서 묶음 {index+1}/{total_groups} ({len(qa_items)}개 질문) 처리 중...")
+        
+        try:
+            answers_text = await dispatcher.submit(
+                model_info.get("provider", "openai"), self.dispatch_group_call, model_info, qa_items,
+                estimated_tokens=estimate_tokens(system_prompt, user_prompt)
+            )
+        except LLMCallError as e:
+            return [self._error_result(qa_item, e.to_dict()) for qa_item in qa_items]
+
+        answers = parse_numbered_answers(answers_text, len(qa_items))
+        results = [self._answer_result(qa_item, answers[i])
+                   for i, qa_item in enumerate(qa_items, start=1) if i in answers]
+        missing = [qa_item for i, qa_item in enumerate(qa_items, start=1) if i not in answers]
+        if missing:
+            print(f"  -> {run_key}: 묶음 응답에서 {len(missing)}개 답변을 찾지 못해 개별 호출로 다시 요청합니다.")
+            results.extend(await asyncio.gather(*[
+                self._evaluate_item(dispatcher, run_key, model_info, qa_item, index, total_groups)
+                for qa_item in missing
+            ]))
+        return results
+
+    async def _evaluate_all_models(self, qa_sets_by_run: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """모든 모델 x 모델별 질문을 한 번에 디스패치하고, 모델별 결과를 unified_id 순으로 돌려줍니다."""
+        limiter = get_rate_limiter()
+        if limiter is not None and self.provider_limits:
+            limiter.override_provider_limits(self.provider_limits)
+        dispatcher = AsyncLLMDispatcher(self.provider_limits, enforce_rate_limits=limiter is None)
+        try:
+            tasks = {}
+            for run_key, model_info in self.models_to_evaluate.items():
+                if run_key not in qa_sets_by_run:
+                    continue
+                all_qa_sets = qa_sets_by_run[run_key]
+                total_sets = len(all_qa_sets)
+                groups = self.group_items_by_document(all_qa_sets) if self.group_questions else None
+                print(f"\n{'='*20}\n🚀 '{run_key}' 평가를 시작합니다... ({total_sets}개 질문)\n{'='*20}")
+                if groups is not None:
+                    tasks[run_key] = [
+                        self._evaluate_group(dispatcher, run_key, model_info, group, i, len(groups))
+                        for i, group in enumerate(groups)
+                    ]
+                else:
+                    tasks[run_key] = [
+                        self._evaluate_item(dispatcher, run_key, model_info, qa_item, i, total_sets)
+                        for i, qa_item in enumerate(all_qa_sets)
+                    ]
+            
+            run_keys = list(tasks.keys())
+            gathered = await asyncio.gather(*[asyncio.gather(*tasks[k]) for k in run_keys])
+        finally:
+            dispatcher.close()
+        
+        if self.group_questions:
+            # 묶음별 결과 리스트를 질문 단위로 펼침
+            gathered = [[result for group_results in results for result in group_results] for results in gathered]
+        return {
+            run_key: sorted(results, key=lambda r: r["unified_id"])
+            for run_key, results in zip(run_keys, gathered)
+        }
 
-        scores = [self.rouge_scorer.score(gt, generated_answer) for gt in ground_truths]
-        max_rouge1_f1 = max([s['rouge1'].fmeasure for s in scores]) if scores else 0.0
-        max_rougeL_f1 = max([s['rougeL'].fmeasure for s in scores]) if scores else 0.0
+    def _evaluate_all_models_batch(self, qa_sets_by_run: Dict[str, List[Dict[str, Any]]],
+                                   batch_runner: BatchRunner) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        모든 모델 x 모델별 질문(또는 문서 묶음)을 하나의 배치로 제출하고, custom_id로 결과를 합칩니다.
+        custom_id는 질문 하나면 run_key::unified_id, 묶음이면 run_key::g<묶음 번호>입니다.
+        묶음 응답에서 찾지 못한 질문은 질문 하나짜리 요청으로 두 번째 배치를 만들어 다시 요청합니다.
+        요청은 OpenAI Batch API 형식이므로 qa_sets_by_run에는 provider가 openai인 모델만 넣어야 합니다.
+        """
+        other_providers = {run_key: self.models_to_evaluate[run_key].get("provider", "openai")
+                           for run_key in qa_sets_by_run
+                           if self.models_to_evaluate[run_key].get("provider", "openai") != "openai"}
+        if other_providers:
+            raise ValueError(f"배치 API는 OpenAI 모델만 지원합니다: {other_providers}")
+
+        def make_request(custom_id, model_info, qa_items):
+            system_prompt, user_prompt = self.build_group_prompts(qa_items)
+            user_prompt = append_reasoning_instruction(user_prompt, model_info["reasoning"])
+            return make_batch_request(custom_id, model_info["model_name"], system_prompt, user_prompt,
+                                      model_info.get("temperature", TEMPERATURE))
+
+        requests, request_groups = [], {}
+        for run_key, all_qa_sets in qa_sets_by_run.items():
+            model_info = self.models_to_evaluate[run_key]
+            groups = self.group_items_by_document(all_qa_sets) if self.group_questions else [[item] for item in all_qa_sets]
+            for n, group in enumerate(groups):
+                custom_id = f"{run_key}::{group[0]['unified_id']}" if len(group) == 1 else f"{run_key}::g{n}"
+                request_groups[custom_id] = (run_key, group)
+                requests.append(make_request(custom_id, model_info, group))
         
-        return {"rouge1_f1": max_rouge1_f1, "rougeL_f1": max_rougeL_f1}
+        batch_results = batch_runner.run(requests, name="unified_eval")
+        
+        # (run_key, unified_id) -> {"text": 답변} 또는 {"error": 오류}
+        outcomes, missing = {}, []
+        for custom_id, (run_key, group) in request_groups.items():
+            result = batch_results.get(custom_id, {})
+            if not result.get("text"):
+                for qa_item in group:
+                    outcomes[(run_key, qa_item["unified_id"])] = {"error": result.get("error") or {"message": "배치 결과 없음"}}
+                continue
+            if len(group) == 1:
+                outcomes[(run_key, group[0]["unified_id"])] = {"text": result["text"]}
+                continue
+            answers = parse_numbered_answers(result["text"], len(group))
+            for i, qa_item in enumerate(group, start=1):
+                if i in answers:
+                    outcomes[(run_key, qa_item["unified_id"])] = {"text": answers[i]}
+                else:
+                    missing.append((run_key, qa_item))
+
+        if missing:
+            print(f"묶음 응답에서 찾지 못한 {len(missing)}개 질문을 개별 요청 배치로 다시 제출합니다.")
+            retry_requests = [make_request(f"{run_key}::{qa_item['unified_id']}", self.models_to_evaluate[run_key], [qa_item])
+                              for run_key, qa_item in missing]
+            retry_results = batch_runner.run(retry_requests, name="unified_eval_retry")
+            for run_key, qa_item in missing:
+                result = retry_results.get(f"{run_key}::{qa_item['unified_id']}", {})
+                if result.get("text"):
+                    outcomes[(run_key, qa_item["unified_id"])] = {"text": result["text"]}
+                else:
+                    outcomes[(run_key, qa_item["unified_id"])] = {"error": result.get("error") or {"message": "배치 결과 없음"}}
+        
+        all_run_results = {}
+        for run_key, all_qa_sets in qa_sets_by_run.items():
+            run_results = []
+            for qa_item in sorted(all_qa_sets, key=lambda item: item["unified_id"]):
+                outcome = outcomes.get((run_key, qa_item["unified_id"]), {"error": {"message": "배치 결과 없음"}})
+                if "text" in outcome:
+                    run_results.append(self._answer_result(qa_item, outcome["text"]))
+                else:
+                    run_results.append(self._error_result(qa_item, outcome["error"]))
+            all_run_results[run_key] = run_results
+        return all_run_results
 
     # ✅ 4. run_full_evaluation 함수는 qa_item 전체를 넘겨주므로 수정할 필요 없음
-    def run_full_evaluation(self):
-        """정의된 모든 모델과 설정에 대해 전체 평가를 실행합니다."""
+    def run_full_evaluation(self, batch_runner: BatchRunner = None):
+        """
+        정의된 모든 모델과 설정에 대해 전체 평가를 동시에 실행합니다.
+        batch_runner가 주어지면 온라인 호출 대신 provider 배치 API로 한꺼번에 제출합니다.
+        incremental이면 run_ledger.json의 입력 해시가 그대로인 항목은 이전 결과를 쓰고,
+        정답 세트나 채점 방식만 바뀐 항목은 이전 답변을 다시 채점한 뒤 모델별 평균에 합칩니다.
+        """
         all_qa_sets = self.load_unified_data()
-        total_sets = len(all_qa_sets)
         overall_summary = {}
 
-        for run_key, model_info in self.models_to_evaluate.items():
-            print(f"\n{'='*20}\n🚀 '{run_key}' 평가를 시작합니다... ({total_sets}개 질문)\n{'='*20}")
+        item_hashes = {qa_item["unified_id"]: self.item_hashes(qa_item) for qa_item in all_qa_sets}
+        run_hashes = {run_key: self.run_hashes(model_info) for run_key, model_info in self.models_to_evaluate.items()}
 
-            run_results = []
-            all_rouge1_f1 = []
-            all_rougeL_f1 = []
-
-            for i, qa_item in enumerate(all_qa_sets):
-                print(f"  -> {run_key}: 질문 {i+1}/{total_sets} 처리 중...")
-                
-                generated_answer = self.dispatch_api_call(model_info, qa_item)
-                scores = self.calculate_max_rouge_score(generated_answer, qa_item["ground_truths"])
-                
-                run_results.append({
-                    "unified_id": qa_item["unified_id"],
-                    "question": qa_item["question"],
-                    "generated_answer": generated_answer,
-                    "scores": scores
-                })
-                all_rouge1_f1.append(scores["rouge1_f1"])
-                all_rougeL_f1.append(scores["rougeL_f1"])
-                
-                time.sleep(1)
-
-            avg_rouge1_f1 = np.mean(all_rouge1_f1)
-            avg_rougeL_f1 = np.mean(all_rougeL_f1)
+        def ledger_key(run_key, unified_id):
+            return f"{run_key}::{unified_id}"
+
+        # 모델별로 이전 결과를 쓸 항목과 다시 호출할 항목을 나눔
+        kept_results = {run_key: [] for run_key in self.models_to_evaluate}
+        qa_sets_by_run = {run_key: [] for run_key in self.models_to_evaluate}
+        for run_key in self.models_to_evaluate:
+            previous = self.load_previous_results(run_key) if self.incremental else {}
+            for qa_item in all_qa_sets:
+                unified_id = qa_item["unified_id"]
+                result = previous.get(unified_id)
+                if result is not None:
+                    plan = self.ledger.plan(ledger_key(run_key, unified_id),
+                                            {**item_hashes[unified_id], **run_hashes[run_key]}, SCORING_INPUTS)
+                    if plan == "regenerate":
+                        result = None
+                    elif plan == "rescore":
+                        result["scores"] = None
+                if result is not None:
+                    kept_results[run_key].append(result)
+                else:
+                    qa_sets_by_run[run_key].append(qa_item)
+            if self.incremental:
+                num_rescored = sum(1 for r in kept_results[run_key] if r["scores"] is None)
+                print(f"'{run_key}' 증분 평가: {len(kept_results[run_key]) - num_rescored}개 재사용, "
+                      f"{num_rescored}개 재채점, {len(qa_sets_by_run[run_key])}개 새로 호출")
+        num_reused = {run_key: sum(1 for r in results if r["scores"] is not None)
+                      for run_key, results in kept_results.items()}
+
+        if batch_runner is not None:
+            # 배치 요청은 OpenAI 형식이므로 다른 provider 모델은 온라인 디스패처로 호출
+            batch_runs = {run_key: qa_sets for run_key, qa_sets in qa_sets_by_run.items()
+                          if self.models_to_evaluate[run_key].get("provider", "openai") == "openai"}
+            online_runs = {run_key: qa_sets for run_key, qa_sets in qa_sets_by_run.items() if run_key not in batch_runs}
+            all_run_results = self._evaluate_all_models_batch(batch_runs, batch_runner) if batch_runs else {}
+            if online_runs:
+                print(f"배치 API를 지원하지 않는 모델은 온라인으로 호출합니다: {list(online_runs)}")
+                all_run_results.update(asyncio.run(self._evaluate_all_models(online_runs)))
+        else:
+            all_run_results = asyncio.run(self._evaluate_all_models(qa_sets_by_run))
+        all_run_results = {
+            run_key: sorted(kept_results[run_key] + all_run_results[run_key], key=lambda r: r["unified_id"])
+            for run_key in self.models_to_evaluate
+        }
+
+        # 정답 세트는 모든 모델이 공유하므로 한 번만 토큰화/정수화
+        prepared_references = {
+            qa_item["unified_id"]: self.rouge_engine.prepare_references(qa_item["ground_truths"])
+            for qa_item in all_qa_sets
+        }
+        ground_truths_by_id = {qa_item["unified_id"]: qa_item["ground_truths"] for qa_item in all_qa_sets}
+
+        for run_key, run_results in all_run_results.items():
+            self.score_run_results(run_results, prepared_references)
+            if self.verify_rouge:
+                targets = [r for r in run_results if "error" not in r]
+                max_diff = verify_against_rouge_score(
+                    self.rouge_engine,
+                    [r["generated_answer"] for r in targets],
+                    [ground_truths_by_id[r["unified_id"]] for r in targets]
+                )
+                print(f"'{run_key}' ROUGE 엔진 검증 완료 (rouge_score 대비 최대 오차: {max_diff:.2e})")
+
+            scored_results = [r for r in run_results if r.get("scores") is not None]
+            all_rouge1_f1 = [r["scores"]["rouge1_f1"] for r in scored_results]
+            all_rougeL_f1 = [r["scores"]["rougeL_f1"] for r in scored_results]
+
+            avg_rouge1_f1 = np.mean(all_rouge1_f1) if all_rouge1_f1 else 0.0
+            avg_rougeL_f1 = np.mean(all_rougeL_f1) if all_rougeL_f1 else 0.0
 
             overall_summary[run_key] = {
                 "ROUGE-1_F1_avg": avg_rouge1_f1,
                 "ROUGE-L_F1_avg": avg_rougeL_f1,
+                "num_scored": len(scored_results),
+                "num_errors": len(run_results) - len(scored_results),
+                "num_reused": num_reused[run_key],
+                "tokenizer": self.tokenizer.name,
             }
 
+            # 실패한 항목은 기록하지 않아 다음 증분 실행에서 다시 호출
+            for result in run_results:
+                key = ledger_key(run_key, result["unified_id"])
+                if result.get("scores") is not None:
+                    self.ledger.record(key, {**item_hashes[result["unified_id"]], **run_hashes[run_key]})
+                else:
+                    self.ledger.forget(key)
+
             detailed_filename = os.path.join(self.eval_dir, f"detailed_results_{run_key}.json")
             with open(detailed_filename, "w", encoding="utf-8") as f:
                 json.dump(run_results, f, ensure_ascii=False, indent=2)
             
             print(f"'{run_key}' 평가 완료! 평균 ROUGE-1 F1: {avg_rouge1_f1:.4f}, ROUGE-L F1: {avg_rougeL_f1:.4f}")
 
+        # 데이터셋에서 빠진 질문이나 평가 대상에서 빠진 모델의 기록은 정리
+        self.ledger.prune(ledger_key(run_key, unified_id) for run_key in self.models_to_evaluate for unified_id in item_hashes)
+        self.ledger.save()
+        self.tokenizer.flush()
+
         summary_filename = os.path.join(self.eval_dir, "evaluation_summary_all_models.json")
         with open(summary_filename, "w", encoding="utf-8") as f:
             json.dump(overall_summary, f, ensure_ascii=False, indent=2)
@@ -162,8 +524,32 @@ class MultiModelEvaluator:
             print(f"  - {run_name}:")
             print(f"    - ROUGE-1 F1 평균: {scores['ROUGE-1_F1_avg']:.4f}")
             print(f"    - ROUGE-L F1 평균: {scores['ROUGE-L_F1_avg']:.4f}")
+        telemetry = get_telemetry()
+        telemetry.write_summary(os.path.join(self.eval_dir, "telemetry_summary.json"))
+        print(telemetry.format_summary())
         print(f"\n모든 평가가 완료되었습니다. 상세 결과는 '{self.eval_dir}' 폴더에 저장되었습니다.")
 
 if __name__ == "__main__":
-    evaluator = MultiModelEvaluator()
-    evaluator.run_full_evaluation()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="통합 300개 QA 세트 다중 모델 평가")
+    parser.add_argument("--batch", choices=["openai", "fake"], help="배치 API로 답변 생성 (fake: 로컬 가짜 배치 서버)")
+    parser.add_argument("--verify_rouge", action="store_true", help="ROUGE 엔진 결과를 rouge_score와 대조")
+    parser.add_argument("--tokenizer", default="korean",
+                        help="ROUGE 토크나이저 (korean, korean_syllable, korean_jamo, rouge)")
+    parser.add_argument("--group_questions", action="store_true",
+                        help="같은 문서의 질문들을 한 번의 호출로 묻고 번호별로 답변을 나눔")
+    parser.add_argument("--max_questions_per_call", type=int, default=10, help="--group_questions의 호출당 최대 질문 수")
+    parser.add_argument("--incremental", action="store_true",
+                        help="입력(질문/문서, 정답 세트, 프롬프트, 모델 설정, 채점 방식)이 바뀐 항목만 다시 평가")
+    args = parser.parse_args()
+    start_exporter()
+
+    evaluator = MultiModelEvaluator(verify_rouge=args.verify_rouge, tokenizer=args.tokenizer,
+                                    group_questions=args.group_questions,
+                                    max_questions_per_call=args.max_questions_per_call,
+                                    incremental=args.incremental)
+    batch_runner = None
+    if args.batch:
+        batch_runner = create_batch_runner(args.batch, os.path.join(evaluator.eval_dir, "batches"))
+    evaluator.run_full_evaluation(batch_runner=batch_runner)
@@ -0,0 +1,259 @@
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from utils.async_dispatcher import load_provider_limits
+from utils.rate_limiter import SharedRateLimiter, get_rate_limiter
+from utils.telemetry import get_telemetry
+
+# 다른 프로세스가 자리를 비웠는지 다시 확인하기까지 기다리는 시간 (초, jitter 별도)
+SHARED_POLL_INTERVAL = 0.01
+# 이 시간 넘게 갱신되지 않은 공유 AIMD 상태는 이전 실행의 것으로 보고 처음부터 다시 시작 (초)
+SHARED_STATE_TTL = 600.0
+
+
+def classify_outcome(exc: Optional[BaseException]) -> str:
+    """
+    호출 결과를 ok / throttled(429, 과부하) / timeout / error로 나눕니다.
+    throttled와 timeout만 한도를 줄이는 신호로 쓰고, 그 밖의 오류는 오류율에만 반영합니다.
+    """
+    if exc is None:
+        return "ok"
+    status_code = getattr(exc, "status_code", None)
+    name = type(exc).__name__
+    if status_code in (429, 529) or any(k in name for k in ("RateLimit", "ResourceExhausted", "Overloaded")):
+        return "throttled"
+    if status_code in (408, 504) or isinstance(exc, TimeoutError) or any(k in name for k in ("Timeout", "DeadlineExceeded")):
+        return "timeout"
+    return "error"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class AIMDController:
+    """
+    provider/모델 하나의 동시 요청 한도를 AIMD(additive increase, multiplicative decrease)로 조절합니다.
+    상태는 이 프로세스 안에만 있습니다 (여러 프로세스가 나눠 쓰려면 SharedAIMDController).
+
+    - 첫 감소 전까지는 성공마다 한도를 1씩 늘리고(slow start), 이후에는 한도만큼 성공해야 1이 늘어남
+    - 지연이 기준(성공 지연의 느린 EWMA)의 latency_tolerance배를 넘거나 오류율이 max_error_rate를 넘으면 늘리지 않음
+    - throttled / timeout이면 decrease_factor배로 줄임. 감소 이전에 시작된 요청의 실패로는 다시 줄이지 않음
+    """
+    def __init__(self, provider: str, model: str, max_limit: int, min_limit: int = 1,
+                 initial_limit: int = 4, decrease_factor: float = 0.5,
+                 latency_tolerance: float = 2.0, max_error_rate: float = 0.1):
+        self.provider = provider
+        self.model = model
+        self.max_limit = max(max_limit, min_limit)
+        self.min_limit = min_limit
+        self.initial_limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.max_error_rate = max_error_rate
+
+        self.in_flight = 0
+        self.state = self.initial_state()
+        self._cond = threading.Condition()
+        self._publish(self.state["limit"], self.in_flight)
+
+    @property
+    def limit(self) -> float:
+        return self.state["limit"]
+
+    def initial_state(self) -> Dict[str, Any]:
+        return {"limit": self.initial_limit, "slow_start": True, "latency_baseline": None,
+                "error_rate": 0.0, "last_decrease_at": 0.0}
+
+    def _publish(self, limit: float, in_flight: int):
+        telemetry = get_telemetry()
+        telemetry.set_gauge("llm_concurrency_limit", int(limit), provider=self.provider, model=self.model)
+        telemetry.set_gauge("llm_in_flight", in_flight, provider=self.provider, model=self.model)
+
+    def _update(self, state: Dict[str, Any], started: float, latency: float, outcome: str) -> Optional[str]:
+        """호출 하나의 결과로 state를 갱신합니다. 한도를 줄였으면 그 이유(outcome)를 반환합니다."""
+        state["error_rate"] = 0.9 * state["error_rate"] + 0.1 * (outcome != "ok")
+        if outcome in ("throttled", "timeout"):
+            # 같은 혼잡 때문에 함께 실패한 요청들로 연달아 줄이지 않도록, 마지막 감소 이후 시작된 요청만 반영
+            if started > state["last_decrease_at"]:
+                state["limit"] = max(self.min_limit, state["limit"] * self.decrease_factor)
+                state["slow_start"] = False
+                state["last_decrease_at"] = time.time()
+                return outcome
+        elif outcome == "ok":
+            baseline = state["latency_baseline"]
+            healthy = baseline is None or latency <= self.latency_tolerance * baseline
+            if healthy and state["error_rate"] <= self.max_error_rate and state["limit"] < self.max_limit:
+                state["limit"] = min(self.max_limit,
+                                     state["limit"] + (1.0 if state["slow_start"] else 1.0 / state["limit"]))
+            state["latency_baseline"] = latency if baseline is None else 0.95 * baseline + 0.05 * latency
+        return None
+
+    def acquire(self) -> float:
+        """한도 안에 자리가 날 때까지 기다린 뒤 시작 시각을 반환합니다."""
+        with self._cond:
+            while self.in_flight >= int(self.state["limit"]):
+                self._cond.wait()
+            self.in_flight += 1
+            self._publish(self.state["limit"], self.in_flight)
+        return time.time()
+
+    def release(self, started: float, outcome: str):
+        latency = time.time() - started
+        with self._cond:
+            self.in_flight -= 1
+            reason = self._update(self.state, started, latency, outcome)
+            self._publish(self.state["limit"], self.in_flight)
+            self._cond.notify_all()
+        if reason:
+            get_telemetry().incr("llm_concurrency_decrease", provider=self.provider, model=self.model, reason=reason)
+
+
+class SharedAIMDController(AIMDController):
+    """
+    AIMD 상태(한도, slow start, 지연 기준, 오류율)와 진행 중 요청 수를 SharedRateLimiter의 SQLite 파일에 두어,
+    같은 장비의 모든 프로세스(main.py의 process 모드 등)가 provider/모델별 한도 하나를 함께 씁니다.
+
+    진행 중 요청은 pid별로 세고, 자리가 없을 때 이미 종료된 프로세스의 몫을 회수합니다.
+    다른 프로세스가 자리를 비우는 것은 알 수 없으므로 SHARED_POLL_INTERVAL마다 다시 확인합니다.
+    """
+    def __init__(self, limiter: SharedRateLimiter, provider: str, model: str, max_limit: int, **kwargs):
+        self.limiter = limiter
+        self.key = f"{provider}/{model}"
+        super().__init__(provider, model, max_limit, **kwargs)
+
+    def _load_state(self, conn) -> Dict[str, Any]:
+        row = conn.execute("SELECT limit_value, slow_start, latency_baseline, error_rate, last_decrease_at, updated_at"
+                           " FROM concurrency WHERE key = ?", (self.key,)).fetchone()
+        if row is None or time.time() - row[5] > SHARED_STATE_TTL:
+            return self.initial_state()
+        limit, slow_start, latency_baseline, error_rate, last_decrease_at, _ = row
+        # max_limit(OPENAI_MAX_CONCURRENCY 등)을 낮춰 다시 실행한 경우
+        return {"limit": min(limit, self.max_limit), "slow_start": bool(slow_start),
+                "latency_baseline": latency_baseline, "error_rate": error_rate, "last_decrease_at": last_decrease_at}
+
+    def _save_state(self, conn, state: Dict[str, Any]):
+        conn.execute("INSERT OR REPLACE INTO concurrency VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     (self.key, state["limit"], int(state["slow_start"]), state["latency_baseline"],
+                      state["error_rate"], state["last_decrease_at"], time.time()))
+
+    def _total_in_flight(self, conn) -> int:
+        return conn.execute("SELECT COALESCE(SUM(count), 0) FROM in_flight WHERE key = ?", (self.key,)).fetchone()[0]
+
+    def _reap_dead(self, conn):
+        """비정상 종료로 자리를 돌려주지 못한 프로세스의 진행 중 요청 수를 지웁니다."""
+        pids = [pid for (pid,) in conn.execute("SELECT pid FROM in_flight WHERE key = ?", (self.key,))]
+        for pid in pids:
+            if not _pid_alive(pid):
+                conn.execute("DELETE FROM in_flight WHERE key = ? AND pid = ?", (self.key, pid))
+
+    def _try_acquire(self) -> bool:
+        with self.limiter.transaction() as conn:
+            state = self._load_state(conn)
+            in_flight = self._total_in_flight(conn)
+            if in_flight >= int(state["limit"]):
+                self._reap_dead(conn)
+                in_flight = self._total_in_flight(conn)
+                if in_flight >= int(state["limit"]):
+                    return False
+            conn.execute("INSERT INTO in_flight VALUES (?, ?, 1) "
+                         "ON CONFLICT(key, pid) DO UPDATE SET count = count + 1", (self.key, os.getpid()))
+            self._save_state(conn, state)
+        self.state = state
+        self._publish(state["limit"], in_flight + 1)
+        return True
+
+    def acquire(self) -> float:
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait(SHARED_POLL_INTERVAL + random.uniform(0, SHARED_POLL_INTERVAL))
+        return time.time()
+
+    def release(self, started: float, outcome: str):
+        latency = time.time() - started
+        with self.limiter.transaction() as conn:
+            conn.execute("UPDATE in_flight SET count = count - 1 WHERE key = ? AND pid = ?", (self.key, os.getpid()))
+            conn.execute("DELETE FROM in_flight WHERE key = ? AND count <= 0", (self.key,))
+            state = self._load_state(conn)
+            reason = self._update(state, started, latency, outcome)
+            self._save_state(conn, state)
+            in_flight = self._total_in_flight(conn)
+        self.state = state
+        self._publish(state["limit"], in_flight)
+        # 같은 프로세스에서 기다리는 스레드 하나를 바로 깨움 (나머지는 polling으로 확인)
+        with self._cond:
+            self._cond.notify()
+        if reason:
+            get_telemetry().incr("llm_concurrency_decrease", provider=self.provider, model=self.model, reason=reason)
+
+
+class AdaptiveConcurrency:
+    """
+    provider/모델별 AIMD 컨트롤러 모음. 최대 한도는 provider 동시 요청 수(load_provider_limits)입니다.
+    limiter가 주어지면 한도와 진행 중 요청 수를 그 SQLite 파일로 모든 프로세스가 공유하고(SharedAIMDController),
+    없으면 프로세스마다 따로 조절하므로 프로세스 N개의 합계는 최대 한도의 N배까지 갈 수 있습니다.
+    """
+    def __init__(self, provider_limits: Optional[Dict[str, Dict[str, int]]] = None, initial_limit: int = 4,
+                 limiter: Optional[SharedRateLimiter] = None):
+        self.provider_limits = load_provider_limits(provider_limits)
+        self.initial_limit = initial_limit
+        self.limiter = limiter
+        self._controllers: Dict[Tuple[str, str], AIMDController] = {}
+        self._lock = threading.Lock()
+
+    def controller(self, provider: str, model: str) -> AIMDController:
+        with self._lock:
+            key = (provider, model)
+            if key not in self._controllers:
+                max_limit = self.provider_limits.get(provider, {}).get("concurrency", 4)
+                if self.limiter is not None:
+                    self._controllers[key] = SharedAIMDController(self.limiter, provider, model, max_limit,
+                                                                  initial_limit=self.initial_limit)
+                else:
+                    self._controllers[key] = AIMDController(provider, model, max_limit,
+                                                            initial_limit=self.initial_limit)
+            return self._controllers[key]
+
+    @contextmanager
+    def slot(self, provider: str, model: str):
+        """블록 하나를 API 호출 하나로 보고, 자리를 잡은 뒤 결과(예외 종류)와 지연으로 한도를 조절합니다."""
+        controller = self.controller(provider, model)
+        started = controller.acquire()
+        try:
+            yield
+        except BaseException as e:
+            controller.release(started, classify_outcome(e))
+            raise
+        controller.release(started, "ok")
+
+
+_concurrency: Optional[AdaptiveConcurrency] = None
+_concurrency_lock = threading.Lock()
+
+
+def get_adaptive_concurrency() -> Optional[AdaptiveConcurrency]:
+    """
+    환경변수로 설정되는 프로세스 전역 동시성 제어기를 반환합니다.
+    LLM_ADAPTIVE_CONCURRENCY: shared (기본, 공유 rate limiter 파일로 프로세스 간 공유. LLM_RATE_LIMIT=off이면 local),
+    local (프로세스별), off (사용 안 함)
+    LLM_AIMD_INITIAL (시작 한도, 기본 4). 최대 한도는 OPENAI_MAX_CONCURRENCY 등 provider 동시 요청 수
+    """
+    global _concurrency
+    mode = os.getenv("LLM_ADAPTIVE_CONCURRENCY", "shared")
+    if mode == "off":
+        return None
+    with _concurrency_lock:
+        if _concurrency is None:
+            _concurrency = AdaptiveConcurrency(initial_limit=int(os.getenv("LLM_AIMD_INITIAL", "4")),
+                                               limiter=get_rate_limiter() if mode != "local" else None)
+        return _concurrency
@@ -0,0 +1,104 @@
+import os
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# provider별 기본 동시 요청 수 / 분당 요청 수(RPM) / 분당 토큰 수(TPM)
+DEFAULT_PROVIDER_LIMITS = {
+    "openai": {"concurrency": 16, "rpm": 500, "tpm": 200000},
+    "claude": {"concurrency": 8, "rpm": 50, "tpm": 40000},
+    "gemini": {"concurrency": 8, "rpm": 60, "tpm": 120000},
+}
+
+
+def load_provider_limits(overrides: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    기본 제한값에 환경변수(예: OPENAI_MAX_CONCURRENCY, OPENAI_RPM, OPENAI_TPM)와 overrides를 덮어씌웁니다.
+    """
+    limits = {provider: dict(values) for provider, values in DEFAULT_PROVIDER_LIMITS.items()}
+    for provider, values in limits.items():
+        prefix = provider.upper()
+        for key, env_name in (("concurrency", f"{prefix}_MAX_CONCURRENCY"),
+                              ("rpm", f"{prefix}_RPM"),
+                              ("tpm", f"{prefix}_TPM")):
+            if os.getenv(env_name):
+                values[key] = int(os.getenv(env_name))
+    for provider, values in (overrides or {}).items():
+        limits.setdefault(provider, {}).update(values)
+    return limits
+
+
+def estimate_tokens(*texts: str) -> int:
+    """프롬프트 토큰 수를 대략 추정합니다. 한국어는 글자당 토큰이 많으므로 2글자당 1토큰으로 잡습니다."""
+    return sum(len(t) for t in texts if t) // 2 + 1
+
+
+class AsyncTokenBucket:
+    """분당 한도(rate_per_minute)를 초당 균등하게 채워주는 비동기 토큰 버킷."""
+    def __init__(self, rate_per_minute: Optional[int]):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute or 0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60.0)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        if not self.rate_per_minute:
+            return
+        # 한 번에 용량보다 큰 요청은 용량만큼만 기다린 뒤 통과시킴
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) * 60.0 / self.capacity
+                await asyncio.sleep(wait)
+
+
+class AsyncLLMDispatcher:
+    """
+    동기 API 호출 함수를 스레드에서 실행하면서 provider별 동시 요청 수와 RPM/TPM을 제한하는 asyncio 디스패처.
+    이벤트 루프 안에서 생성하고 사용해야 합니다.
+    enforce_rate_limits=False면 동시 요청 수만 제한합니다. RPM/TPM을 다른 곳(utils.rate_limiter의 공유 limiter)이
+    이미 지키는 경우 토큰을 두 번 예약하지 않도록 끕니다.
+    """
+    def __init__(self, provider_limits: Optional[Dict[str, Dict[str, int]]] = None, enforce_rate_limits: bool = True):
+        self.provider_limits = load_provider_limits(provider_limits)
+        self.enforce_rate_limits = enforce_rate_limits
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._request_buckets: Dict[str, AsyncTokenBucket] = {}
+        self._token_buckets: Dict[str, AsyncTokenBucket] = {}
+        # 기본 executor는 코어 수 기준으로 작으므로 provider 동시성 합계만큼 스레드를 둠
+        max_workers = sum(limits.get("concurrency", 4) for limits in self.provider_limits.values())
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="llm")
+
+    def _get_limits(self, provider: str):
+        if provider not in self._semaphores:
+            limits = self.provider_limits.get(provider, {})
+            self._semaphores[provider] = asyncio.Semaphore(limits.get("concurrency", 4))
+            rate_limits = limits if self.enforce_rate_limits else {}
+            self._request_buckets[provider] = AsyncTokenBucket(rate_limits.get("rpm"))
+            self._token_buckets[provider] = AsyncTokenBucket(rate_limits.get("tpm"))
+        return self._semaphores[provider], self._request_buckets[provider], self._token_buckets[provider]
+
+    async def submit(self, provider: str, func: Callable[..., Any], *args,
+                     estimated_tokens: int = 0, **kwargs) -> Any:
+        """rate limit을 지키며 func(*args, **kwargs)를 워커 스레드에서 실행합니다."""
+        semaphore, request_bucket, token_bucket = self._get_limits(provider)
+        async with semaphore:
+            await request_bucket.acquire(1)
+            await token_bucket.acquire(estimated_tokens)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
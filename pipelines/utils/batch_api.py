@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import uuid
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+def make_batch_request(custom_id: str, model: str, system_prompt: str, user_prompt: str,
+                       temperature: float, max_tokens: int = 4096,
+                       json_schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """OpenAI Batch API 입력 JSONL 한 줄 형식의 요청을 만듭니다. json_schema가 있으면 structured output으로 요청합니다."""
+    request = {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+    }
+    if json_schema:
+        request["body"]["response_format"] = {"type": "json_schema", "json_schema": dict(json_schema, strict=True)}
+    return request
+
+
+def write_batch_file(requests: List[Dict[str, Any]], file_path: str):
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+def parse_batch_output(lines: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    배치 출력 JSONL을 {custom_id: {"text": 응답 또는 None, "error": 오류 또는 None}}로 변환합니다.
+    """
+    results = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        error = record.get("error")
+        text = None
+        if not error and response.get("status_code") == 200:
+            try:
+                text = body["choices"][0]["message"]["content"]
+            except (KeyError, IndexError, TypeError):
+                error = {"message": "응답 형식을 해석할 수 없습니다."}
+        elif not error:
+            error = {"status_code": response.get("status_code"), "message": json.dumps(body, ensure_ascii=False)}
+        results[record["custom_id"]] = {"text": text, "error": error}
+    return results
+
+
+class BatchBackend(ABC):
+    """배치 파일 제출 / 상태 조회 / 결과 수집 인터페이스."""
+    @abstractmethod
+    def submit(self, input_path: str) -> str:
+        ...
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        ...
+
+    @abstractmethod
+    def fetch_results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        ...
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API (24시간 completion window, 온라인 호출보다 높은 한도와 낮은 비용)."""
+    def __init__(self, completion_window: str = "24h"):
+        from utils.llm_client import get_llm_client
+        self.client = get_llm_client().get_provider("openai").client
+        self.completion_window = completion_window
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def fetch_results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(self.client.files.content(file_id).text.splitlines())
+        return parse_batch_output(lines)
+
+
+class LocalFakeBatchServer(BatchBackend):
+    """
+    오프라인 테스트용 로컬 배치 서버. 제출된 배치를 백그라운드 스레드에서 responder로 처리해
+    OpenAI Batch API와 같은 형식의 출력 파일을 만듭니다.
+    """
+    def __init__(self, work_dir: str, responder: Optional[Callable[[Dict[str, Any]], str]] = None,
+                 processing_delay: float = 0.5, failure_ids: Optional[List[str]] = None):
+        os.makedirs(work_dir, exist_ok=True)
+        self.work_dir = work_dir
+        if responder is None:
+            # 온라인 mock 백엔드와 같은 결정적 응답 (에이전트 파서가 기대하는 형식)
+            from utils.mock_llm import default_mock_batch_responder
+            responder = default_mock_batch_responder
+        self.responder = responder
+        self.processing_delay = processing_delay
+        self.failure_ids = set(failure_ids or [])
+        self._status: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _process(self, batch_id: str, input_path: str):
+        with self._lock:
+            self._status[batch_id] = "in_progress"
+        time.sleep(self.processing_delay)
+        output_path = os.path.join(self.work_dir, f"{batch_id}_output.jsonl")
+        with open(input_path, "r", encoding="utf-8") as f_in, open(output_path, "w", encoding="utf-8") as f_out:
+            for line in f_in:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                custom_id = request["custom_id"]
+                if custom_id in self.failure_ids:
+                    record = {"custom_id": custom_id, "response": None,
+                              "error": {"code": "server_error", "message": "fake failure"}}
+                else:
+                    content = self.responder(request["body"])
+                    record = {
+                        "custom_id": custom_id,
+                        "response": {"status_code": 200, "body": {
+                            "model": request["body"].get("model"),
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                        }},
+                        "error": None,
+                    }
+                f_out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        with self._lock:
+            self._status[batch_id] = "completed"
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"batch_fake_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self._status[batch_id] = "validating"
+        threading.Thread(target=self._process, args=(batch_id, input_path), daemon=True).start()
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        with self._lock:
+            return self._status.get(batch_id, "failed")
+
+    def fetch_results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        output_path = os.path.join(self.work_dir, f"{batch_id}_output.jsonl")
+        with open(output_path, "r", encoding="utf-8") as f:
+            return parse_batch_output(f.readlines())
+
+
+class BatchRunner:
+    """요청 목록을 배치 파일로 쓰고 제출한 뒤, 완료될 때까지 폴링하여 custom_id별 결과를 돌려줍니다."""
+    TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+    def __init__(self, backend: BatchBackend, work_dir: str, poll_interval: float = 30.0,
+                 timeout: float = 24 * 3600):
+        self.backend = backend
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    def run(self, requests: List[Dict[str, Any]], name: str = "batch") -> Dict[str, Dict[str, Any]]:
+        if not requests:
+            return {}
+        input_path = os.path.join(self.work_dir, f"{name}_{time.strftime('%Y%m%d-%H%M%S')}_input.jsonl")
+        write_batch_file(requests, input_path)
+        batch_id = self.backend.submit(input_path)
+        print(f"배치 제출 완료: {batch_id} ({len(requests)}개 요청, 입력 파일: {input_path})")
+
+        started = time.monotonic()
+        while True:
+            status = self.backend.status(batch_id)
+            if status in self.TERMINAL_STATUSES:
+                break
+            if time.monotonic() - started > self.timeout:
+                raise TimeoutError(f"배치 {batch_id}가 {self.timeout}초 안에 끝나지 않았습니다 (상태: {status}).")
+            print(f"  배치 {batch_id} 상태: {status}, {self.poll_interval}초 후 다시 확인")
+            time.sleep(self.poll_interval)
+
+        if status != "completed":
+            raise RuntimeError(f"배치 {batch_id}가 실패했습니다 (상태: {status}).")
+
+        results = self.backend.fetch_results(batch_id)
+        missing = [r["custom_id"] for r in requests if r["custom_id"] not in results]
+        for custom_id in missing:
+            results[custom_id] = {"text": None, "error": {"message": "배치 출력에 결과가 없습니다."}}
+        num_failed = sum(1 for r in results.values() if r["error"])
+        print(f"배치 {batch_id} 완료: 성공 {len(results) - num_failed}개, 실패 {num_failed}개")
+        return results
+
+
+def create_batch_runner(name: str, work_dir: str) -> BatchRunner:
+    """'openai' 또는 'fake'(로컬 가짜 서버) 백엔드를 쓰는 BatchRunner를 만듭니다."""
+    if name == "openai":
+        return BatchRunner(OpenAIBatchBackend(), work_dir, poll_interval=30.0)
+    if name == "fake":
+        return BatchRunner(LocalFakeBatchServer(os.path.join(work_dir, "fake_server")), work_dir, poll_interval=0.5)
+    raise ValueError(f"지원하지 않는 배치 백엔드입니다: {name}")
@@ -0,0 +1,280 @@
+import os
+import time
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_MODEL_TYPE = "distilbert-base-multilingual-cased"
+
+# torch: bert_score와 같은 fp32 eager 경로 (GPU가 있으면 GPU)
+# int8: CPU 전용. Linear 층을 int8 dynamic quantization하고, 토큰 길이별 버킷으로 배치를 나눔
+BACKENDS = ("torch", "int8")
+# int8 백엔드의 임베딩 배치당 토큰 수 상한 (배치 크기 x 배치 안의 최대 토큰 길이)
+DEFAULT_TOKEN_BUDGET = 8192
+
+
+class BERTScoreEngine:
+    """
+    프로세스당 한 번만 모델을 로드하고, 여러 (후보, 정답) 쌍을 큰 패딩 배치로 한꺼번에 채점하는 BERTScore 엔진.
+    bert_score.score와 동일한 임베딩/greedy matching 과정을 사용하므로 쌍 단위 호출과 같은 점수가 나옵니다.
+    """
+    def __init__(self, model_type: str = DEFAULT_MODEL_TYPE, num_layers: Optional[int] = None,
+                 batch_size: int = 64, device: Optional[str] = None, backend: str = "torch",
+                 num_threads: Optional[int] = None, token_budget: Optional[int] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"지원하지 않는 BERTScore 백엔드입니다: {backend} (가능한 값: {BACKENDS})")
+        self.model_type = model_type
+        self.num_layers = num_layers
+        self.batch_size = batch_size
+        # quantized 모델은 CPU에서만 실행됨
+        self.device = "cpu" if backend == "int8" else device
+        self.backend = backend
+        self.num_threads = num_threads
+        self.token_budget = token_budget or (DEFAULT_TOKEN_BUDGET if backend == "int8" else None)
+
+        self._model = None
+        self._tokenizer = None
+        self._idf_dict = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_key(self) -> str:
+        """임베딩 캐시 등에서 사용하는 모델 식별자 (백엔드마다 임베딩 값이 조금씩 다르므로 백엔드를 포함)."""
+        if self.num_layers is None:
+            from bert_score.utils import model2layers
+            self.num_layers = model2layers[self.model_type]
+        suffix = "" if self.backend == "torch" else f"-{self.backend}"
+        return f"{self.model_type}-L{self.num_layers}{suffix}"
+
+    def _configure_threads(self):
+        """CPU 추론용 스레드 설정. 배치를 순서대로 실행하므로 inter-op 스레드는 하나만 씁니다."""
+        import torch
+
+        num_threads = self.num_threads or int(os.getenv("BERTSCORE_NUM_THREADS", "0"))
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # 이미 병렬 작업이 시작된 뒤에는 바꿀 수 없음
+            pass
+        # denormal 연산은 CPU에서 매우 느림
+        torch.set_flush_denormal(True)
+
+    def _ensure_model(self):
+        """모델과 토크나이저를 처음 사용할 때 한 번만 로드합니다."""
+        if self._model is not None:
+            return
+        with self._lock:
+            if self._model is not None:
+                return
+            import torch
+            from bert_score.utils import get_model, get_tokenizer, model2layers
+
+            if self.num_layers is None:
+                self.num_layers = model2layers[self.model_type]
+            if self.device is None:
+                self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+            print(f"BERTScore 모델 로드 중: {self.model_type} (layers={self.num_layers}, device={self.device}, "
+                  f"backend={self.backend})")
+            tokenizer = get_tokenizer(self.model_type, use_fast=False)
+            model = get_model(self.model_type, self.num_layers, all_layers=False)
+            model.to(self.device)
+            if self.backend == "int8" or self.num_threads:
+                self._configure_threads()
+            if self.backend == "int8":
+                model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                model.eval()
+                print(f"BERTScore 모델을 int8 dynamic quantization으로 변환했습니다 (threads={torch.get_num_threads()})")
+
+            # idf=False일 때 bert_score가 사용하는 가중치와 동일
+            idf_dict = defaultdict(lambda: 1.0)
+            idf_dict[tokenizer.sep_token_id] = 0
+            idf_dict[tokenizer.cls_token_id] = 0
+
+            self._tokenizer = tokenizer
+            self._idf_dict = idf_dict
+            self._model = model
+
+    def load(self) -> "BERTScoreEngine":
+        """모델을 미리 로드합니다 (fork 전에 로드하면 자식 프로세스들이 가중치를 copy-on-write로 공유)."""
+        self._ensure_model()
+        return self
+
+    def embed(self, sentences: Sequence[str]) -> Dict[str, Tuple["torch.Tensor", "torch.Tensor"]]:
+        """문장별 (토큰 임베딩, idf 가중치)를 계산합니다. 중복 문장은 한 번만 계산합니다."""
+        self._ensure_model()
+        if self.token_budget:
+            return self._embed_bucketed(set(sentences))
+        from bert_score.utils import get_bert_embedding
+
+        # bert_score와 동일하게 길이 역순으로 정렬하여 패딩 낭비를 줄임
+        unique_sentences = sorted(set(sentences), key=lambda x: len(x.split(" ")), reverse=True)
+        stats = {}
+        for start in range(0, len(unique_sentences), self.batch_size):
+            sen_batch = unique_sentences[start:start + self.batch_size]
+            embs, masks, padded_idf = get_bert_embedding(
+                sen_batch, self._model, self._tokenizer, self._idf_dict,
+                device=self.device, all_layers=False
+            )
+            embs = embs.cpu()
+            masks = masks.cpu()
+            padded_idf = padded_idf.cpu()
+            for i, sen in enumerate(sen_batch):
+                sequence_len = masks[i].sum().item()
+                stats[sen] = (embs[i, :sequence_len], padded_idf[i, :sequence_len])
+        return stats
+
+    def _embed_bucketed(self, unique_sentences) -> Dict[str, Tuple["torch.Tensor", "torch.Tensor"]]:
+        """
+        문장을 한 번만 토큰화해 토큰 길이 역순으로 정렬하고, (배치 크기 x 최대 길이)가 token_budget을 넘지 않게 나눠
+        임베딩합니다. 짧은 문장은 큰 배치로, 긴 문장은 작은 배치로 묶여 패딩과 메모리 낭비가 줄어듭니다.
+        문장별 결과는 get_bert_embedding 경로와 같은 (토큰 임베딩, idf 가중치)입니다.
+        """
+        import torch
+        from bert_score.utils import sent_encode, padding, bert_encode
+
+        encoded = {sen: sent_encode(self._tokenizer, sen) for sen in unique_sentences}
+        ordered = sorted(encoded, key=lambda sen: len(encoded[sen]), reverse=True)
+
+        stats = {}
+        start = 0
+        while start < len(ordered):
+            # 정렬되어 있으므로 배치의 첫 문장이 가장 김
+            max_len = len(encoded[ordered[start]])
+            sen_batch = ordered[start:start + max(self.token_budget // max(max_len, 1), 1)]
+            start += len(sen_batch)
+
+            ids = [encoded[sen] for sen in sen_batch]
+            padded, lens, mask = padding(ids, self._tokenizer.pad_token_id, dtype=torch.long)
+            padded_idf, _, _ = padding([[self._idf_dict[i] for i in a] for a in ids], 0, dtype=torch.float)
+            embs = bert_encode(self._model, padded.to(self.device), attention_mask=mask.to(self.device)).cpu()
+            for i, sen in enumerate(sen_batch):
+                sequence_len = int(lens[i])
+                stats[sen] = (embs[i, :sequence_len], padded_idf[i, :sequence_len])
+        return stats
+
+    def _pad_batch_stats(self, sen_batch: Sequence[str], stats: Dict[str, Tuple]):
+        import torch
+        from torch.nn.utils.rnn import pad_sequence
+
+        emb, idf = zip(*[stats[s] for s in sen_batch])
+        emb = [e.to(self.device) for e in emb]
+        idf = [i.to(self.device) for i in idf]
+        lens = torch.tensor([e.size(0) for e in emb], dtype=torch.long)
+        emb_pad = pad_sequence(emb, batch_first=True, padding_value=2.0)
+        idf_pad = pad_sequence(idf, batch_first=True)
+        base = torch.arange(int(lens.max()), dtype=torch.long).expand(len(lens), int(lens.max()))
+        pad_mask = (base < lens.unsqueeze(1)).to(self.device)
+        return emb_pad, pad_mask, idf_pad
+
+    def score_from_stats(self, candidates: Sequence[str], references: Sequence[str],
+                         stats: Dict[str, Tuple]) -> List[Dict[str, float]]:
+        """미리 계산된 문장 임베딩으로 (후보, 정답) 쌍들의 precision/recall/f1을 계산합니다."""
+        import torch
+        from bert_score.utils import greedy_cos_idf
+
+        results = []
+        with torch.no_grad():
+            for start in range(0, len(references), self.batch_size):
+                batch_refs = references[start:start + self.batch_size]
+                batch_cands = candidates[start:start + self.batch_size]
+                ref_stats = self._pad_batch_stats(batch_refs, stats)
+                cand_stats = self._pad_batch_stats(batch_cands, stats)
+                P, R, F1 = greedy_cos_idf(*ref_stats, *cand_stats, False)
+                for p, r, f in zip(P.cpu().tolist(), R.cpu().tolist(), F1.cpu().tolist()):
+                    results.append({"precision": p, "recall": r, "f1": f})
+        return results
+
+    def score_pairs(self, candidates: Sequence[str], references: Sequence[str],
+                    reference_store=None) -> List[Dict[str, float]]:
+        """
+        (후보, 정답) 쌍 목록 전체를 배치로 채점합니다.
+        reference_store가 주어지면 정답 임베딩을 먼저 캐시에서 찾고, 없는 것만 계산해 저장합니다.
+        """
+        if len(candidates) != len(references):
+            raise ValueError("candidates와 references의 길이가 다릅니다.")
+        if not candidates:
+            return []
+        candidates = list(candidates)
+        references = list(references)
+        if reference_store is None:
+            stats = self.embed(candidates + references)
+            return self.score_from_stats(candidates, references, stats)
+
+        import torch
+
+        stats = {}
+        for ref in set(references):
+            cached = reference_store.get(ref)
+            if cached is not None:
+                emb, idf = cached
+                stats[ref] = (torch.from_numpy(np.array(emb)), torch.from_numpy(np.array(idf)))
+        missing_refs = [r for r in set(references) if r not in stats]
+        computed = self.embed(candidates + missing_refs)
+        if missing_refs:
+            reference_store.put_many({r: (computed[r][0].numpy(), computed[r][1].float().numpy())
+                                      for r in missing_refs})
+        computed.update(stats)
+        return self.score_from_stats(candidates, references, computed)
+
+
+_ENGINES: Dict[Tuple, BERTScoreEngine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_bertscore_engine(model_type: str = DEFAULT_MODEL_TYPE, batch_size: int = 64,
+                         device: Optional[str] = None, backend: str = "torch",
+                         num_threads: Optional[int] = None, token_budget: Optional[int] = None) -> BERTScoreEngine:
+    """프로세스 전역에서 공유되는 BERTScore 엔진을 반환합니다."""
+    key = (model_type, batch_size, device, backend, num_threads, token_budget)
+    with _ENGINES_LOCK:
+        if key not in _ENGINES:
+            _ENGINES[key] = BERTScoreEngine(model_type=model_type, batch_size=batch_size, device=device,
+                                            backend=backend, num_threads=num_threads, token_budget=token_budget)
+        return _ENGINES[key]
+
+
+def parity_report(baseline: BERTScoreEngine, engine: BERTScoreEngine,
+                  candidates: Sequence[str], references: Sequence[str], warmup_pairs: int = 8) -> Dict[str, Any]:
+    """
+    같은 (후보, 정답) 쌍을 두 엔진으로 채점해 점수 차이와 속도를 비교합니다.
+    모델 로드 시간은 빼고 채점 시간만 잽니다. 스레드 수와 denormal flush는 프로세스 전역 설정이므로,
+    두 엔진을 모두 로드한 뒤 비교 대상 엔진의 설정을 적용하고 나서 같은 조건으로 잽니다.
+    """
+    import torch
+
+    baseline._ensure_model()
+    engine._ensure_model()
+    engine._configure_threads()
+    settings = {
+        "torch_threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "flush_denormal": True,
+    }
+
+    results = {}
+    for name, scorer in (("baseline", baseline), ("engine", engine)):
+        # 첫 호출의 메모리 할당 등이 먼저 재는 쪽에만 들어가지 않도록 몇 쌍을 미리 채점
+        scorer.score_pairs(candidates[:warmup_pairs], references[:warmup_pairs])
+        started = time.perf_counter()
+        results[name] = scorer.score_pairs(candidates, references)
+        results[f"{name}_s"] = time.perf_counter() - started
+
+    report: Dict[str, Any] = {
+        "pairs": len(candidates),
+        "baseline": baseline.model_key,
+        "engine": engine.model_key,
+        "baseline_s": results["baseline_s"],
+        "engine_s": results["engine_s"],
+        "speedup": results["baseline_s"] / results["engine_s"] if results["engine_s"] else None,
+        **settings,
+    }
+    for metric in ("precision", "recall", "f1"):
+        drift = np.array([abs(a[metric] - b[metric]) for a, b in zip(results["baseline"], results["engine"])])
+        report[f"max_{metric}_drift"] = float(drift.max()) if drift.size else 0.0
+        report[f"mean_{metric}_drift"] = float(drift.mean()) if drift.size else 0.0
+    return report
@@ -0,0 +1,36 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, Optional
+from utils.prompt_registry import get_prompt_registry
+from utils.telemetry import get_telemetry
+
+
+def atomic_write_json(file_path: str, data: Any, indent: Optional[int] = 4):
+    """임시 파일에 쓴 뒤 os.replace로 교체하여, 중간에 중단되어도 파일이 깨지지 않게 저장합니다."""
+    dir_path = os.path.dirname(file_path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        get_telemetry().incr("bytes_written", f.tell(), target="json")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def file_content_hash(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compute_fingerprint(inputs: Dict[str, Any], prompt_path: Optional[str] = None) -> str:
+    """단계 입력값과 프롬프트 파일 내용으로 fingerprint를 만듭니다."""
+    payload = {
+        "inputs": inputs,
+        # 레지스트리가 들고 있는 해시를 쓰므로 단계마다 프롬프트 파일을 다시 읽지 않음
+        "prompt": get_prompt_registry().content_hash(prompt_path) if prompt_path else None,
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,212 @@
+import os
+import json
+import hashlib
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class ReferenceEmbeddingStore:
+    """
+    ground truth 답변의 토큰 임베딩을 디스크에 저장하는 캐시.
+    모델 이름별 디렉토리에 (임베딩, idf) 행렬을 append-only float32 파일로 쌓고 memmap으로 읽으며,
+    각 항목은 답변 텍스트의 content hash로 찾습니다.
+    """
+    def __init__(self, cache_dir: str, model_key: str, dim: Optional[int] = None):
+        self.model_key = model_key
+        self.dir_path = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9._-]+", "_", model_key))
+        os.makedirs(self.dir_path, exist_ok=True)
+
+        self.index_path = os.path.join(self.dir_path, "index.json")
+
+        self.index = {"model_key": model_key, "dim": dim, "rows": 0, "generation": 0, "entries": {}, "sources": {}}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        self._emb_map = None
+        self._idf_map = None
+        self._dirty = False
+        self._truncate_to_index()
+
+    def _data_paths(self, generation: int) -> Tuple[str, str]:
+        """generation별 (임베딩, idf) 파일 경로. 0세대는 compaction 도입 전과 같은 이름을 씁니다."""
+        suffix = f".{generation}" if generation else ""
+        return (os.path.join(self.dir_path, f"embeddings{suffix}.f32"),
+                os.path.join(self.dir_path, f"idf{suffix}.f32"))
+
+    @property
+    def emb_path(self) -> str:
+        return self._data_paths(self.index.get("generation", 0))[0]
+
+    @property
+    def idf_path(self) -> str:
+        return self._data_paths(self.index.get("generation", 0))[1]
+
+    def _truncate_to_index(self):
+        """인덱스 저장 전에 중단되어 파일 끝에 남은 행을 잘라 offset이 어긋나지 않게 합니다."""
+        dim = self.index["dim"] or 0
+        for path, row_bytes in ((self.emb_path, dim * 4), (self.idf_path, 4)):
+            expected = self.index["rows"] * row_bytes
+            if os.path.exists(path) and os.path.getsize(path) > expected:
+                with open(path, "r+b") as f:
+                    f.truncate(expected)
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def __contains__(self, text: str) -> bool:
+        return self.text_hash(text) in self.index["entries"]
+
+    def _open_maps(self):
+        if self._emb_map is None and self.index["rows"] > 0:
+            rows, dim = self.index["rows"], self.index["dim"]
+            self._emb_map = np.memmap(self.emb_path, dtype=np.float32, mode="r", shape=(rows, dim))
+            self._idf_map = np.memmap(self.idf_path, dtype=np.float32, mode="r", shape=(rows,))
+
+    def _close_maps(self):
+        self._emb_map = None
+        self._idf_map = None
+
+    def get(self, text: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """저장된 (임베딩[L, D], idf[L])를 반환합니다. 없으면 None."""
+        entry = self.index["entries"].get(self.text_hash(text))
+        if entry is None:
+            return None
+        self._open_maps()
+        start, length = entry["offset"], entry["length"]
+        return self._emb_map[start:start + length], self._idf_map[start:start + length]
+
+    def put_many(self, items: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """새로 계산한 임베딩들을 파일 끝에 이어 붙입니다."""
+        new_items = [(self.text_hash(t), e, i) for t, (e, i) in items.items()
+                     if self.text_hash(t) not in self.index["entries"]]
+        if not new_items:
+            return
+        if self.index["dim"] is None:
+            self.index["dim"] = int(new_items[0][1].shape[1])
+
+        self._close_maps()
+        with open(self.emb_path, "ab") as emb_f, open(self.idf_path, "ab") as idf_f:
+            for key, emb, idf in new_items:
+                emb_f.write(np.ascontiguousarray(emb, dtype=np.float32).tobytes())
+                idf_f.write(np.ascontiguousarray(idf, dtype=np.float32).tobytes())
+                self.index["entries"][key] = {"offset": self.index["rows"], "length": int(emb.shape[0])}
+                self.index["rows"] += int(emb.shape[0])
+        self._dirty = True
+
+    def sync_source(self, source_path: str, texts: Iterable[str]) -> bool:
+        """
+        ground truth 파일 하나가 참조하는 답변 목록을 갱신합니다.
+        파일 내용이 바뀌었으면 더 이상 어떤 파일도 참조하지 않는 이전 항목을 제거하고 True를 반환합니다.
+        """
+        current_hash = self.file_hash(source_path)
+        source = self.index["sources"].get(source_path)
+        if source and source["file_hash"] == current_hash:
+            return False
+
+        new_keys = sorted({self.text_hash(t) for t in texts})
+        self.index["sources"][source_path] = {"file_hash": current_hash, "keys": new_keys}
+        self._dirty = True
+        if not source:
+            return False
+
+        referenced = set()
+        for other in self.index["sources"].values():
+            referenced.update(other["keys"])
+        stale = [k for k in source["keys"] if k not in referenced]
+        for key in stale:
+            self.index["entries"].pop(key, None)
+        if stale:
+            print(f"임베딩 캐시: '{source_path}' 변경으로 {len(stale)}개 항목 제거")
+            self._maybe_compact()
+        return True
+
+    def _maybe_compact(self):
+        """
+        제거된 행이 절반을 넘으면 살아있는 항목만 다음 generation 파일에 다시 씁니다.
+        새 offset을 담은 인덱스를 원자적으로 교체한 뒤에 이전 파일을 지우므로,
+        중간에 중단되어도 index.json은 항상 자신과 맞는 파일을 가리킵니다.
+        """
+        live_rows = sum(e["length"] for e in self.index["entries"].values())
+        if self.index["rows"] == 0 or live_rows * 2 > self.index["rows"]:
+            return
+
+        generation = self.index.get("generation", 0) + 1
+        new_emb_path, new_idf_path = self._data_paths(generation)
+        self._open_maps()
+        entries = {}
+        offset = 0
+        with open(new_emb_path, "wb") as emb_f, open(new_idf_path, "wb") as idf_f:
+            for key, entry in self.index["entries"].items():
+                start, length = entry["offset"], entry["length"]
+                emb_f.write(np.asarray(self._emb_map[start:start + length]).tobytes())
+                idf_f.write(np.asarray(self._idf_map[start:start + length]).tobytes())
+                entries[key] = {"offset": offset, "length": length}
+                offset += length
+            for f in (emb_f, idf_f):
+                f.flush()
+                os.fsync(f.fileno())
+        self._close_maps()
+
+        self.index = {**self.index, "entries": entries, "rows": offset, "generation": generation}
+        self._dirty = True
+        self.save()
+
+        keep = {os.path.basename(new_emb_path), os.path.basename(new_idf_path), "index.json"}
+        for name in os.listdir(self.dir_path):
+            if name.endswith(".f32") and name not in keep:
+                os.remove(os.path.join(self.dir_path, name))
+
+    def save(self):
+        """인덱스를 원자적으로 저장합니다."""
+        if not self._dirty:
+            return
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+        self._close_maps()
+        self._dirty = False
+
+
+class PendingEmbeddingStore:
+    """
+    ReferenceEmbeddingStore를 읽기 전용으로 감싸고, 새로 계산한 임베딩은 파일 대신 메모리(pending)에 모읍니다.
+    fork된 채점 프로세스들이 같은 캐시 파일에 동시에 쓰지 않도록, 새 항목은 부모 프로세스가 모아 한 번에 저장합니다.
+    """
+    def __init__(self, base: ReferenceEmbeddingStore):
+        self.base = base
+        self.model_key = base.model_key
+        self.pending: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._new: List[str] = []
+
+    def __contains__(self, text: str) -> bool:
+        return text in self.pending or text in self.base
+
+    def get(self, text: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        if text in self.pending:
+            return self.pending[text]
+        return self.base.get(text)
+
+    def put_many(self, items: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        for text, (emb, idf) in items.items():
+            if text not in self:
+                self.pending[text] = (np.ascontiguousarray(emb, dtype=np.float32),
+                                      np.ascontiguousarray(idf, dtype=np.float32))
+                self._new.append(text)
+
+    def take_new(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """마지막 호출 이후 새로 계산된 항목들 (이 프로세스 안에서는 계속 pending으로 재사용)."""
+        new, self._new = self._new, []
+        return {text: self.pending[text] for text in new}
+
+    def save(self):
+        # 저장은 부모 프로세스가 pending을 받아 base.put_many() 후 수행
+        pass
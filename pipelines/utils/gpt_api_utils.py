@@ -1,9 +1,8 @@
 import os
 import json
 from dotenv import load_dotenv
-from openai import OpenAI
-import anthropic
-import google.generativeai as genai
+from utils.llm_client import get_llm_client
+from utils.prompt_registry import get_prompt_registry, PROMPT_SEPARATOR
 
 
 load_dotenv()
@@ -12,6 +11,8 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
+# 1이면 ground truth / 우선순위 / 학생 답변을 provider의 구조화 출력(JSON)으로 받음
+STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "0") == "1"
 
 # Claude 설정
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
@@ -21,15 +22,14 @@ CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-5-sonnet-20241022")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro")
 
-# 클라이언트 초기화
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-claude_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-genai.configure(api_key=GOOGLE_API_KEY)
+# provider 공통 클라이언트 (연결 풀 재사용, 재시도/백오프, 응답 캐시)
+# 재시도 후에도 실패하면 빈 문자열 대신 LLMCallError를 던집니다.
+llm_client = get_llm_client()
 
 def load_prompt(file_path, **kwargs):
-    with open(file_path, "r", encoding="utf-8") as f:
-        template = f.read()
-    return template.format(**kwargs)
+    """(호환용) 치환된 전체 프롬프트 문자열. 새 코드는 get_prompt_registry().render()로 system/user를 바로 받으세요."""
+    system_prompt, user_prompt = get_prompt_registry().render(file_path, **kwargs)
+    return system_prompt + PROMPT_SEPARATOR + user_prompt
 
 def append_reasoning_instruction(user_prompt, reasoning):
     """reasoning이 True면 단계별 사고 지시문을 붙여줌"""
@@ -38,120 +38,36 @@ def append_reasoning_instruction(user_prompt, reasoning):
         return user_prompt + reasoning_instruction
     return user_prompt
 
-def call_gpt(system_prompt, user_prompt, temperature=TEMPERATURE, reasoning=False):
-    """OpenAI GPT API 호출"""
-    try:
-        user_prompt = append_reasoning_instruction(user_prompt, reasoning)
-        response = openai_client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=temperature,
-            max_tokens=4096
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        print(f"GPT API 호출 오류: {e}")
-        return ""
+def call_gpt(system_prompt, user_prompt, temperature=TEMPERATURE, reasoning=False, json_schema=None):
+    """OpenAI GPT API 호출 (json_schema가 있으면 structured output으로 JSON 문자열을 받음)"""
+    user_prompt = append_reasoning_instruction(user_prompt, reasoning)
+    return llm_client.complete("openai", OPENAI_MODEL, system_prompt, user_prompt, temperature, 4096,
+                               json_schema=json_schema)
 
 def call_gpt4_with_model(system_prompt, user_prompt, model_name, temperature=TEMPERATURE, reasoning=False):
-    try:
-        user_prompt = append_reasoning_instruction(user_prompt, reasoning)
-        response = openai_client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=temperature,
-            max_tokens=4096
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        print(f"GPT API 호출 오류 (모델: {model_name}): {e}")
-        return ""
+    user_prompt = append_reasoning_instruction(user_prompt, reasoning)
+    return llm_client.complete("openai", model_name, system_prompt, user_prompt, temperature, 4096)
 
 def call_gpt5_with_model(system_prompt, user_prompt, model_name, temperature=TEMPERATURE, reasoning=False):
-    try:
-        print(f"    GPT5 API 호출 시작 - 모델: {model_name}, reasoning: {reasoning}")
-        user_prompt = append_reasoning_instruction(user_prompt, reasoning)
-        response = openai_client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=4096
-        )
-        result = response.choices[0].message.content
-        
-        print(f"    GPT5 API 호출 성공 - 응답 길이: {len(result)}")
-        return result
-    except Exception as e:
-        print(f"GPT5 API 호출 오류 (모델: {model_name}): {e}")
-        return ""
+    print(f"    GPT5 API 호출 시작 - 모델: {model_name}, reasoning: {reasoning}")
+    user_prompt = append_reasoning_instruction(user_prompt, reasoning)
+    result = llm_client.complete("openai", model_name, system_prompt, user_prompt, 0.7, 4096)
+
+    print(f"    GPT5 API 호출 성공 - 응답 길이: {len(result)}")
+    return result
 
 def call_claude(system_prompt, user_prompt, temperature=TEMPERATURE, reasoning=False):
-    try:
-        user_prompt = append_reasoning_instruction(user_prompt, reasoning)
-        response = claude_client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=4096,
-            temperature=temperature,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
-        )
-        return response.content[0].text
-    except Exception as e:
-        print(f"Claude API 호출 오류: {e}")
-        return ""
+    user_prompt = append_reasoning_instruction(user_prompt, reasoning)
+    return llm_client.complete("claude", CLAUDE_MODEL, system_prompt, user_prompt, temperature, 4096)
 
 def call_claude_with_model(system_prompt, user_prompt, model_name, temperature=TEMPERATURE, reasoning=False):
-    try:
-        user_prompt = append_reasoning_instruction(user_prompt, reasoning)
-        response = claude_client.messages.create(
-            model=model_name,
-            max_tokens=4096,
-            temperature=temperature,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
-        )
-        return response.content[0].text
-    except Exception as e:
-        print(f"Claude API 호출 오류 (모델: {model_name}): {e}")
-        return ""
+    user_prompt = append_reasoning_instruction(user_prompt, reasoning)
+    return llm_client.complete("claude", model_name, system_prompt, user_prompt, temperature, 4096)
 
 def call_gemini(system_prompt, user_prompt, temperature=TEMPERATURE, reasoning=False):
-    try:
-        user_prompt = append_reasoning_instruction(user_prompt, reasoning)
-        model = genai.GenerativeModel(GEMINI_MODEL)
-        response = model.generate_content(
-            f"{system_prompt}\n\n{user_prompt}",
-            generation_config=genai.types.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=4096
-            )
-        )
-        return response.text
-    except Exception as e:
-        print(f"Gemini API 호출 오류: {e}")
-        return ""
+    user_prompt = append_reasoning_instruction(user_prompt, reasoning)
+    return llm_client.complete("gemini", GEMINI_MODEL, system_prompt, user_prompt, temperature, 4096)
 
 def call_gemini_with_model(system_prompt, user_prompt, model_name, temperature=TEMPERATURE, reasoning=False):
-    try:
-        user_prompt = append_reasoning_instruction(user_prompt, reasoning)
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(
-            f"{system_prompt}\n\n{user_prompt}",
-            generation_config=genai.types.GenerationConfig(
-                temperature=1.0,
-                max_output_tokens=8192
-            )
-        )
-        return response.text
-    except Exception as e:
-        print(f"Gemini API 호출 오류 (모델: {model_name}): {e}")
-        return ""
+    user_prompt = append_reasoning_instruction(user_prompt, reasoning)
+    return llm_client.complete("gemini", model_name, system_prompt, user_prompt, 1.0, 8192)
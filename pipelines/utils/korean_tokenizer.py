@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import sqlite3
+import atexit
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from utils.rouge_engine import rouge_score_tokenize
+
+# 한글 음절 / 호환 자모 / 영문 소문자·숫자만 남김 (어절 = 이 문자들의 연속, 'AI를'처럼 섞인 어절 포함)
+_EOJEOL_RE = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣa-z0-9]+")
+_TOKEN_RE = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]+|[a-z0-9]+")
+_HANGUL_BASE, _HANGUL_END = 0xAC00, 0xD7A3
+_CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNGSEONG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONGSEONG = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+              "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+
+# 어절 끝에서 떼어낼 조사 (긴 것부터 검사)
+_PARTICLES = sorted([
+    "으로부터", "에서부터", "에게서", "한테서", "으로써", "으로서", "이라고", "이라는", "이라면",
+    "에서", "에게", "한테", "께서", "으로", "부터", "까지", "처럼", "보다", "마다", "조차", "밖에",
+    "이나", "이며", "이랑", "라고", "라는", "로써", "로서", "만큼", "에는", "에도", "과는", "와는",
+    "은", "는", "이", "가", "을", "를", "에", "의", "도", "만", "로", "과", "와", "랑", "나",
+], key=len, reverse=True)
+
+
+def decompose_jamo(text: str) -> str:
+    """한글 음절을 초성/중성/종성 자모로 분해합니다."""
+    chars = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_END:
+            offset = code - _HANGUL_BASE
+            chars.append(_CHOSEONG[offset // 588])
+            chars.append(_JUNGSEONG[(offset % 588) // 28])
+            chars.append(_JONGSEONG[offset % 28])
+        else:
+            chars.append(ch)
+    return "".join(chars)
+
+
+def strip_particle(eojeol: str) -> str:
+    """어절 끝의 조사를 떼어냅니다. 한 글자 조사는 어간이 두 글자 이상 남을 때만 제거합니다."""
+    for particle in _PARTICLES:
+        if eojeol.endswith(particle):
+            stem = eojeol[:-len(particle)]
+            min_stem = 2 if len(particle) == 1 else 1
+            if len(stem) >= min_stem:
+                return stem
+            break
+    return eojeol
+
+
+class BaseTokenizer(ABC):
+    """평가용 토크나이저 인터페이스. name은 캐시 키에 사용되므로 규칙이 바뀌면 함께 바꿉니다."""
+    name = "base"
+
+    @abstractmethod
+    def tokenize(self, text: str) -> List[str]:
+        ...
+
+    def __call__(self, text: str) -> List[str]:
+        return self.tokenize(text)
+
+
+class RougeDefaultTokenizer(BaseTokenizer):
+    """rouge_score 기본 토크나이저 (영문/숫자만 남기므로 한국어는 모두 사라짐, 호환성 확인용)."""
+    name = "rouge"
+
+    def tokenize(self, text: str) -> List[str]:
+        return rouge_score_tokenize(text)
+
+
+class KoreanTokenizer(BaseTokenizer):
+    """
+    외부 형태소 분석기 없이 동작하는 한국어 토크나이저.
+    - morpheme: 어절 단위로 나누고 끝의 조사를 제거
+    - syllable: 조사 제거 후 음절 단위
+    - jamo: 조사 제거 후 자모 단위
+    """
+    MODES = ("morpheme", "syllable", "jamo")
+
+    def __init__(self, mode: str = "morpheme"):
+        if mode not in self.MODES:
+            raise ValueError(f"지원하지 않는 모드입니다: {mode} (가능한 값: {self.MODES})")
+        self.mode = mode
+        self.name = f"korean_{mode}_v1"
+
+    def tokenize(self, text: str) -> List[str]:
+        stems = [token
+                 for eojeol in _EOJEOL_RE.findall(text.lower())
+                 for token in _TOKEN_RE.findall(strip_particle(eojeol))]
+        if self.mode == "morpheme":
+            return stems
+        if self.mode == "syllable":
+            return [ch for stem in stems for ch in stem]
+        return [ch for stem in stems for ch in decompose_jamo(stem)]
+
+
+class CachedTokenizer(BaseTokenizer):
+    """
+    토큰화 결과를 메모리 LRU와 디스크(SQLite)에 캐시하여, 같은 텍스트는 모델/실행이 달라도 한 번만 토큰화합니다.
+    새 결과는 commit_every개씩 모아 한 트랜잭션으로 디스크에 쓰며, 남은 결과는 flush()(또는 프로세스 종료 시)에 씁니다.
+    쓰기 잠금은 flush하는 동안에만 잡으므로 같은 파일을 쓰는 다른 프로세스를 오래 막지 않습니다.
+    """
+    def __init__(self, base: BaseTokenizer, cache_dir: Optional[str] = None, lru_size: int = 50000,
+                 commit_every: int = 1000):
+        self.base = base
+        self.name = base.name
+        self.lru_size = lru_size
+        self.commit_every = max(commit_every, 1)
+        self._lru: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.db_path = None
+        self._conn = None
+        self._conn_pid = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.db_path = os.path.join(cache_dir, "token_cache.sqlite3")
+            self._connect()
+            atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork된 자식 프로세스는 부모의 연결을 물려받지 않고 새로 엽니다.
+        if self._conn is None or self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS tokens (key TEXT PRIMARY KEY, tokens TEXT)")
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def tokenize(self, text: str) -> List[str]:
+        key = self._key(text)
+        with self._lock:
+            tokens = self._lru.get(key)
+            if tokens is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return tokens
+            if self.db_path is not None:
+                encoded = self._pending.get(key)
+                if encoded is None:
+                    row = self._connect().execute("SELECT tokens FROM tokens WHERE key = ?", (key,)).fetchone()
+                    encoded = row[0] if row is not None else None
+                if encoded is not None:
+                    tokens = json.loads(encoded)
+                    self.disk_hits += 1
+
+        if tokens is None:
+            tokens = self.base.tokenize(text)
+            with self._lock:
+                self.misses += 1
+                if self.db_path is not None:
+                    self._pending[key] = json.dumps(tokens, ensure_ascii=False)
+                    if len(self._pending) >= self.commit_every:
+                        self._flush_pending()
+
+        with self._lock:
+            self._lru[key] = tokens
+            if len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+        return tokens
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        conn = self._connect()
+        conn.executemany("INSERT OR REPLACE INTO tokens (key, tokens) VALUES (?, ?)", self._pending.items())
+        conn.commit()
+        self._pending.clear()
+
+    def flush(self):
+        """아직 디스크에 쓰지 않은 토큰화 결과를 한 트랜잭션으로 씁니다."""
+        if self.db_path is None:
+            return
+        with self._lock:
+            self._flush_pending()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "lru_size": len(self._lru)}
+
+
+_TOKENIZER_FACTORIES: Dict[str, Callable[[], BaseTokenizer]] = {
+    "rouge": RougeDefaultTokenizer,
+    "korean": lambda: KoreanTokenizer("morpheme"),
+    "korean_syllable": lambda: KoreanTokenizer("syllable"),
+    "korean_jamo": lambda: KoreanTokenizer("jamo"),
+}
+
+
+def register_tokenizer(name: str, factory: Callable[[], BaseTokenizer]):
+    """외부 형태소 분석기(kiwipiepy, konlpy 등) 기반 토크나이저를 이름으로 등록합니다."""
+    _TOKENIZER_FACTORIES[name] = factory
+
+
+def get_tokenizer(name: str = "korean", cache_dir: Optional[str] = None) -> BaseTokenizer:
+    """등록된 토크나이저를 LRU + 디스크 캐시로 감싸서 반환합니다."""
+    if name not in _TOKENIZER_FACTORIES:
+        raise ValueError(f"등록되지 않은 토크나이저입니다: {name} (가능한 값: {sorted(_TOKENIZER_FACTORIES)})")
+    return CachedTokenizer(_TOKENIZER_FACTORIES[name](), cache_dir=cache_dir)
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# readwrite: 캐시를 먼저 읽고, 없으면 호출 후 저장 (read-through)
+# write: 항상 호출하고 결과로 캐시를 갱신 (write-through)
+# read: 캐시만 읽고 저장하지 않음
+# off: 캐시 사용 안 함
+CACHE_MODES = ("readwrite", "write", "read", "off")
+
+
+class LLMResponseCache:
+    """
+    (provider, model, system prompt, user prompt, temperature, max_tokens)의 해시를 키로
+    LLM 응답을 SQLite에 저장하는 영속 캐시.
+    """
+    def __init__(self, db_path: str, mode: str = "readwrite", max_bytes: int = 512 * 1024 * 1024):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"지원하지 않는 캐시 모드입니다: {mode} (가능한 값: {CACHE_MODES})")
+        self.db_path = db_path
+        self.mode = mode
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = None
+        self._conn_pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork된 자식 프로세스는 부모의 연결을 물려받지 않고 새로 엽니다.
+        if self._conn is None or self._conn_pid != os.getpid():
+            dir_path = os.path.dirname(self.db_path)
+            if dir_path:
+                os.makedirs(dir_path, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, provider TEXT, model TEXT, response TEXT,"
+                " size INTEGER, created_at REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def make_key(provider: str, model: str, system_prompt: str, user_prompt: str,
+                 temperature: float, max_tokens: int) -> str:
+        payload = json.dumps([provider, model, system_prompt, user_prompt, float(temperature), int(max_tokens)],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def bypassed(self) -> bool:
+        return getattr(self._local, "bypass", False) or os.getenv("LLM_CACHE_BYPASS", "") == "1"
+
+    @contextmanager
+    def bypass(self):
+        """이 블록 안의 호출은 (현재 스레드에서) 캐시를 건너뜁니다."""
+        previous = getattr(self._local, "bypass", False)
+        self._local.bypass = True
+        try:
+            yield
+        finally:
+            self._local.bypass = previous
+
+    @property
+    def refreshing(self) -> bool:
+        return getattr(self._local, "refresh", False)
+
+    @contextmanager
+    def refresh(self):
+        """
+        이 블록 안의 호출은 (현재 스레드에서) 캐시를 읽지 않고 새로 호출한 뒤, 저장하는 모드면 결과로 캐시를 덮어씁니다.
+        파싱하지 못한 응답을 다시 요청할 때, 같은 프롬프트에 캐시된 같은 응답이 돌아오지 않도록 씁니다.
+        """
+        previous = getattr(self._local, "refresh", False)
+        self._local.refresh = True
+        try:
+            yield
+        finally:
+            self._local.refresh = previous
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, provider: str, model: str, response: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, provider, model, response, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, len(response.encode("utf-8")), now, now)
+            )
+            conn.commit()
+            self.writes += 1
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 90%까지 지웁니다."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+            if total <= target:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+        conn.commit()
+        self.evictions += removed
+
+    def cached_call(self, provider: str, model: str, system_prompt: str, user_prompt: str,
+                    temperature: float, max_tokens: int, request: Callable[[], str]) -> str:
+        """모드에 따라 캐시를 조회/갱신하면서 request()를 호출합니다. 빈 응답은 저장하지 않습니다."""
+        if self.mode == "off" or self.bypassed:
+            return request()
+
+        key = self.make_key(provider, model, system_prompt, user_prompt, temperature, max_tokens)
+        if self.mode in ("readwrite", "read") and not self.refreshing:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+
+        response = request()
+        if response and self.mode in ("readwrite", "write"):
+            self.put(key, provider, model, response)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._connect()
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+        }
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """
+    환경변수로 설정되는 프로세스 전역 캐시를 반환합니다.
+    LLM_CACHE_PATH, LLM_CACHE_MODE(readwrite|write|read|off), LLM_CACHE_MAX_MB, LLM_CACHE_BYPASS=1
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                db_path=os.getenv("LLM_CACHE_PATH", os.path.join("data", "cache", "llm_cache.sqlite3")),
+                mode=os.getenv("LLM_CACHE_MODE", "readwrite"),
+                max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            )
+        return _cache
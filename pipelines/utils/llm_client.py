@@ -0,0 +1,406 @@
+import os
+import json
+import time
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# provider SDK(openai / anthropic / google.generativeai, httpx)는 import 비용이 크므로
+# 해당 provider 클라이언트를 처음 만들 때 import합니다. (워커 프로세스 / CLI 시작 시간 단축)
+from utils.llm_cache import get_llm_cache
+from utils.async_dispatcher import estimate_tokens
+from utils.rate_limiter import SharedRateLimiter, get_rate_limiter
+from utils.adaptive_concurrency import AdaptiveConcurrency, get_adaptive_concurrency
+from utils.telemetry import get_telemetry
+
+# 재시도할 HTTP 상태 코드 (529: Anthropic overloaded)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class LLMCallError(Exception):
+    """재시도 후에도 실패한 LLM 호출. 빈 문자열 대신 이 구조화된 오류를 던집니다."""
+    def __init__(self, provider: str, model: str, message: str, status_code: Optional[int] = None,
+                 error_type: Optional[str] = None, attempts: int = 0, retryable: bool = False):
+        super().__init__(f"[{provider}/{model}] {message}")
+        self.provider = provider
+        self.model = model
+        self.message = message
+        self.status_code = status_code
+        self.error_type = error_type
+        self.attempts = attempts
+        self.retryable = retryable
+        self.timestamp = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "message": self.message,
+            "status_code": self.status_code,
+            "error_type": self.error_type,
+            "attempts": self.attempts,
+            "retryable": self.retryable,
+            "timestamp": self.timestamp,
+        }
+
+
+def classify_error(exc: Exception):
+    """
+    SDK 예외에서 (status_code, 재시도 가능 여부, Retry-After 초)를 추출합니다.
+    openai / anthropic / google.api_core 예외가 공통으로 가진 속성만 사용합니다.
+    """
+    status_code = getattr(exc, "status_code", None)
+    if status_code is None and isinstance(getattr(exc, "code", None), int):
+        status_code = exc.code
+
+    retry_after = None
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            retry_after = float(headers["retry-after-ms"]) / 1000.0
+        elif headers.get("retry-after"):
+            retry_after = float(headers["retry-after"])
+    except (TypeError, ValueError):
+        retry_after = None
+
+    name = type(exc).__name__
+    if status_code is not None:
+        retryable = status_code in RETRYABLE_STATUS_CODES
+    else:
+        # 타임아웃 / 연결 오류 / 서버 과부하 계열은 상태 코드가 없어도 재시도
+        retryable = (isinstance(exc, (TimeoutError, ConnectionError))
+                     or any(k in name for k in ("Timeout", "Connection", "DeadlineExceeded",
+                                                "ResourceExhausted", "ServiceUnavailable", "InternalServerError")))
+    return status_code, retryable, retry_after
+
+
+class ProviderClient(ABC):
+    """provider SDK 하나를 감싸는 클라이언트. 연결 풀/모델 객체를 재사용하며 재시도 없이 한 번만 호출합니다."""
+    provider = ""
+
+    def __init__(self, timeout: float, max_connections: int):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._local = threading.local()
+
+    @abstractmethod
+    def complete(self, model: str, system_prompt: str, user_prompt: str,
+                 temperature: float, max_tokens: int, json_schema: Optional[Dict[str, Any]] = None) -> str:
+        """json_schema({"name", "schema"})가 주어지면 provider의 구조화 출력 기능으로 JSON 문자열을 받습니다."""
+        ...
+
+    def _set_usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        self._local.usage = (prompt_tokens, completion_tokens)
+
+    def pop_usage(self) -> Optional[tuple]:
+        """현재 스레드의 마지막 호출에서 provider가 보고한 (입력 토큰, 출력 토큰). 없으면 None."""
+        usage = getattr(self._local, "usage", None)
+        self._local.usage = None
+        return usage
+
+
+class OpenAIProviderClient(ProviderClient):
+    provider = "openai"
+
+    def __init__(self, timeout: float, max_connections: int):
+        super().__init__(timeout, max_connections)
+        import httpx
+        import openai
+        self.client = openai.OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=timeout,
+            max_retries=0,  # 재시도는 LLMClient에서 일괄 처리
+            http_client=openai.DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            )
+        )
+
+    def complete(self, model, system_prompt, user_prompt, temperature, max_tokens, json_schema=None):
+        extra = {}
+        if json_schema:
+            extra["response_format"] = {"type": "json_schema", "json_schema": dict(json_schema, strict=True)}
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **extra
+        )
+        if response.usage:
+            self._set_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+
+class ClaudeProviderClient(ProviderClient):
+    provider = "claude"
+
+    def __init__(self, timeout: float, max_connections: int):
+        super().__init__(timeout, max_connections)
+        import httpx
+        import anthropic
+        self.client = anthropic.Anthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            timeout=timeout,
+            max_retries=0,
+            http_client=anthropic.DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            )
+        )
+
+    def complete(self, model, system_prompt, user_prompt, temperature, max_tokens, json_schema=None):
+        extra = {}
+        if json_schema:
+            # 스키마를 입력으로 받는 도구 하나를 강제로 호출하게 해서 JSON을 받음
+            extra["tools"] = [{"name": json_schema["name"], "input_schema": json_schema["schema"]}]
+            extra["tool_choice"] = {"type": "tool", "name": json_schema["name"]}
+        response = self.client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            system=system_prompt,
+            messages=[{"role": "user", "content": user_prompt}],
+            **extra
+        )
+        if response.usage:
+            self._set_usage(response.usage.input_tokens, response.usage.output_tokens)
+        if json_schema:
+            for block in response.content:
+                if block.type == "tool_use":
+                    return json.dumps(block.input, ensure_ascii=False)
+        return response.content[0].text
+
+
+class GeminiProviderClient(ProviderClient):
+    provider = "gemini"
+
+    def __init__(self, timeout: float, max_connections: int):
+        super().__init__(timeout, max_connections)
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.genai = genai
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self, model: str):
+        # GenerativeModel은 요청마다 만들지 않고 모델 이름별로 재사용
+        with self._lock:
+            if model not in self._models:
+                self._models[model] = self.genai.GenerativeModel(model)
+            return self._models[model]
+
+    def complete(self, model, system_prompt, user_prompt, temperature, max_tokens, json_schema=None):
+        # 스키마 자체는 프롬프트 지시문으로 전달하고, 응답 형식만 JSON으로 고정
+        extra = {"response_mime_type": "application/json"} if json_schema else {}
+        response = self._get_model(model).generate_content(
+            f"{system_prompt}\n\n{user_prompt}",
+            generation_config=self.genai.types.GenerationConfig(
+                temperature=temperature,
+                max_output_tokens=max_tokens,
+                **extra
+            ),
+            request_options={"timeout": self.timeout}
+        )
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            self._set_usage(usage.prompt_token_count, usage.candidates_token_count)
+        return response.text
+
+
+PROVIDER_CLIENTS = {
+    "openai": OpenAIProviderClient,
+    "claude": ClaudeProviderClient,
+    "gemini": GeminiProviderClient,
+}
+
+
+class LLMClient:
+    """
+    provider에 상관없이 같은 방식으로 LLM을 호출하는 클라이언트.
+    provider 클라이언트(연결 풀)를 프로세스당 하나씩 재사용하고, 응답 캐시를 거친 뒤
+    재시도 가능한 오류는 Retry-After를 따르거나 jitter가 있는 지수 백오프로 재시도합니다.
+    rate_limiter가 있으면 매 시도 전에 같은 장비의 모든 프로세스가 공유하는 모델별 RPM/TPM 한도 안에서 예약하고,
+    concurrency가 있으면 모델별 동시 요청 수를 지연/429/타임아웃에 따라 AIMD로 조절합니다.
+    최종 실패는 LLMCallError로 던지고 errors에 기록합니다.
+    backend='mock'이면 실제 API 대신 utils.mock_llm의 모의 provider를 사용합니다 (부하/회귀 벤치마크용).
+    """
+    BACKENDS = ("live", "mock")
+
+    def __init__(self, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 timeout: float = 120.0, max_connections: int = 100, error_log_path: Optional[str] = None,
+                 backend: str = "live", rate_limiter: Optional[SharedRateLimiter] = None,
+                 concurrency: Optional[AdaptiveConcurrency] = None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"지원하지 않는 LLM 백엔드입니다: {backend} (가능한 값: {self.BACKENDS})")
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.error_log_path = error_log_path
+        self.backend = backend
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+
+        self.cache = get_llm_cache()
+        self.errors = deque(maxlen=1000)
+        self._providers: Dict[str, ProviderClient] = {}
+        self._lock = threading.Lock()
+
+    def get_provider(self, provider: str) -> ProviderClient:
+        with self._lock:
+            if provider not in self._providers:
+                if provider not in PROVIDER_CLIENTS:
+                    raise ValueError(f"지원하지 않는 provider입니다: {provider}")
+                if self.backend == "mock":
+                    from utils.mock_llm import mock_client_factory
+                    self._providers[provider] = mock_client_factory(provider, self.timeout)
+                else:
+                    self._providers[provider] = PROVIDER_CLIENTS[provider](self.timeout, self.max_connections)
+            return self._providers[provider]
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Retry-After가 있으면 따르고, 없으면 full jitter 지수 백오프."""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _record_error(self, error: LLMCallError):
+        self.errors.append(error.to_dict())
+        print(f"LLM API 호출 오류 ({error.provider}/{error.model}, 시도 {error.attempts}회): {error.message}")
+        if self.error_log_path:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.error_log_path) or ".", exist_ok=True)
+                with open(self.error_log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(error.to_dict(), ensure_ascii=False) + "\n")
+
+    @contextmanager
+    def _call_slot(self, provider: str, model: str):
+        if self.concurrency is None:
+            yield
+        else:
+            with self.concurrency.slot(provider, model):
+                yield
+
+    def _complete_with_retry(self, provider: str, model: str, system_prompt: str, user_prompt: str,
+                             temperature: float, max_tokens: int, call_info: Dict[str, Any],
+                             json_schema: Optional[Dict[str, Any]] = None) -> str:
+        """call_info에 시도 횟수와 provider가 보고한 토큰 사용량을 채웁니다 (telemetry용)."""
+        client = self.get_provider(provider)
+        limiter = self.rate_limiter
+        estimated_tokens = estimate_tokens(system_prompt, user_prompt)
+        attempt = 0
+        while True:
+            attempt += 1
+            call_info["attempts"] = attempt
+            try:
+                if limiter is not None:
+                    # 재시도도 provider 한도를 쓰므로 시도마다 예약
+                    limiter.acquire(provider, model, estimated_tokens)
+                # rate limit 대기가 호출 지연에 섞이지 않도록 예약 뒤에 동시 요청 자리를 잡음
+                with self._call_slot(provider, model):
+                    if json_schema:
+                        result = client.complete(model, system_prompt, user_prompt, temperature, max_tokens,
+                                                 json_schema=json_schema)
+                    else:
+                        result = client.complete(model, system_prompt, user_prompt, temperature, max_tokens)
+                call_info["usage"] = client.pop_usage()
+                if limiter is not None:
+                    # 예약은 프롬프트 추정치로 했으므로 실제 입력+출력 토큰과의 차이를 반영
+                    prompt_tokens, completion_tokens = call_info["usage"] or (None, None)
+                    used = (prompt_tokens or estimated_tokens) + (completion_tokens or estimate_tokens(result))
+                    limiter.settle(provider, model, used - estimated_tokens)
+                if not result:
+                    raise LLMCallError(provider, model, "빈 응답", error_type="EmptyResponse",
+                                       attempts=attempt, retryable=False)
+                return result
+            except Exception as e:
+                if isinstance(e, LLMCallError):
+                    status_code, retryable, retry_after = e.status_code, e.retryable, None
+                    message, error_type = e.message, e.error_type
+                else:
+                    status_code, retryable, retry_after = classify_error(e)
+                    message, error_type = str(e), type(e).__name__
+                if not retryable or attempt > self.max_retries:
+                    error = LLMCallError(provider, model, message, status_code=status_code,
+                                         error_type=error_type, attempts=attempt, retryable=retryable)
+                    self._record_error(error)
+                    raise error from e
+                delay = self.backoff_delay(attempt - 1, retry_after)
+                if limiter is not None and status_code == 429:
+                    # 한 프로세스가 429를 받으면 다른 프로세스도 같은 시간 동안 새 호출을 멈춤
+                    limiter.block(provider, model, delay)
+                print(f"    LLM 재시도 대기 {delay:.1f}초 ({provider}/{model}, status={status_code}, 시도 {attempt}회)")
+                time.sleep(delay)
+
+    def complete(self, provider: str, model: str, system_prompt: str, user_prompt: str,
+                 temperature: float, max_tokens: int = 4096, json_schema: Optional[Dict[str, Any]] = None) -> str:
+        """
+        캐시 → (재시도 포함) API 호출 순으로 응답 텍스트를 반환하고, 호출 하나를 telemetry 이벤트로 남깁니다.
+        json_schema가 주어지면 provider의 구조화 출력(JSON schema / tool 호출)으로 JSON 문자열을 받습니다.
+        """
+        # 모의 응답이 실제 응답 캐시 항목과 섞이지 않도록 캐시 키의 provider를 구분
+        cache_provider = provider if self.backend == "live" else f"{self.backend}:{provider}"
+        if json_schema:
+            cache_provider = f"{cache_provider}+json:{json_schema['name']}"
+        call_info: Dict[str, Any] = {"attempts": 0}
+        cache_off = self.cache.mode == "off" or self.cache.bypassed
+
+        with get_telemetry().span("llm_call", provider=provider, model=model,
+                                  structured=bool(json_schema)) as record:
+            try:
+                result = self.cache.cached_call(
+                    cache_provider, model, system_prompt, user_prompt, temperature, max_tokens,
+                    lambda: self._complete_with_retry(provider, model, system_prompt, user_prompt,
+                                                      temperature, max_tokens, call_info, json_schema)
+                )
+            finally:
+                called = call_info["attempts"] > 0
+                record["cache"] = "off" if cache_off else ("miss" if called else "hit")
+                record["retries"] = max(call_info["attempts"] - 1, 0)
+            if called:
+                # provider가 사용량을 알려주지 않으면 글자 수로 추정
+                prompt_tokens, completion_tokens = call_info.get("usage") or (None, None)
+                record["prompt_tokens"] = prompt_tokens or estimate_tokens(system_prompt, user_prompt)
+                record["completion_tokens"] = completion_tokens or estimate_tokens(result)
+            return result
+
+    def recent_errors(self) -> List[Dict[str, Any]]:
+        return list(self.errors)
+
+    def mock_usage(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """mock 백엔드의 provider/모델별 요청 수, 주입된 오류 수, 토큰 사용량."""
+        with self._lock:
+            return {name: client.stats() for name, client in self._providers.items() if hasattr(client, "stats")}
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """
+    환경변수로 설정되는 프로세스 전역 LLMClient를 반환합니다.
+    LLM_MAX_RETRIES, LLM_TIMEOUT, LLM_MAX_CONNECTIONS, LLM_ERROR_LOG, LLM_BACKEND (live | mock)
+    공유 rate limit 설정은 utils.rate_limiter.get_rate_limiter (LLM_RATE_LIMIT=off로 끔),
+    동시 요청 수 조절은 utils.adaptive_concurrency.get_adaptive_concurrency (LLM_ADAPTIVE_CONCURRENCY=off로 끔) 참고
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient(
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+                timeout=float(os.getenv("LLM_TIMEOUT", "120")),
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+                error_log_path=os.getenv("LLM_ERROR_LOG", os.path.join("data", "logs", "llm_errors.jsonl")),
+                backend=os.getenv("LLM_BACKEND", "live"),
+                rate_limiter=get_rate_limiter(),
+                concurrency=get_adaptive_concurrency(),
+            )
+        return _client
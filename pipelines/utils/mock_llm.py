@@ -0,0 +1,265 @@
+import os
+import re
+import ast
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from utils.async_dispatcher import estimate_tokens
+from utils.llm_client import ProviderClient
+
+# 생성 파이프라인 질문 카테고리 (question_gen_agent.txt와 동일)
+CATEGORIES = ["전공적합성", "인성탐색", "진로탐색", "문제해결력", "소통과협력"]
+
+
+class MockAPIError(Exception):
+    """SDK의 APIStatusError처럼 status_code / response.headers를 갖는 모의 오류 (classify_error가 그대로 해석)."""
+    class _Response:
+        def __init__(self, headers: Dict[str, str]):
+            self.headers = headers
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = self._Response({"retry-after": str(retry_after)} if retry_after is not None else {})
+
+
+class MockTimeoutError(TimeoutError):
+    pass
+
+
+def _extract_questions(user_prompt: str) -> List[str]:
+    """'Following questions:' 아래의 질문 목록(파이썬 리스트 repr 또는 번호 매긴 줄)을 꺼냅니다."""
+    match = re.search(r'Following questions:\s*\n(.*?)(?:\n\s*\n|$)', user_prompt, re.DOTALL)
+    if match:
+        block = match.group(1).strip()
+        if block.startswith("["):
+            try:
+                value = ast.literal_eval(block)
+                if isinstance(value, list):
+                    return [str(q) for q in value]
+            except (ValueError, SyntaxError):
+                pass
+        numbered = re.findall(r'^\s*\(?\d+[\).]\s*(.+)$', block, re.MULTILINE)
+        if numbered:
+            return numbered
+    return [f"질문 {i + 1}" for i in range(10)]
+
+
+TOPICS = ["동아리 활동", "탐구 보고서", "봉사 활동", "독서 경험", "팀 프로젝트", "진로 탐색", "수업 발표", "실험 설계"]
+QUESTION_TEMPLATES = [
+    "{topic}에서 맡은 역할과 배운 점을 설명해 주세요.",
+    "{topic} 과정에서 겪은 어려움을 어떻게 해결했나요?",
+    "{topic} 경험이 지원 전공과 어떻게 연결되나요?",
+]
+ANSWER_ENDINGS = ["중요하다고 생각합니다", "탐구해 보았습니다", "배울 수 있었습니다", "더 알아보고 싶습니다"]
+
+
+def _topic_of(text: str) -> str:
+    # 번호, level, [카테고리]와 에이전트 정규식을 깨뜨리는 괄호/콜론/따옴표를 제거한 짧은 주제
+    text = re.sub(r'^\(?\d+\)?\.?\s*|level:\d+|\[.*?\]', " ", text)
+    text = re.sub(r'[\[\]\(\):"\']', " ", text)
+    return " ".join(text.split())[:20] or "이 주제"
+
+
+def _index_of(question: str, position: int) -> int:
+    # ground truth 입력 질문은 "순위. [카테고리]질문" 형식이라 응답 번호로 순위를 씀
+    match = re.match(r'^\s*\(?(\d+)\)?[.)]', question)
+    return int(match.group(1)) if match else position
+
+
+def _sentence(rng: random.Random, subject: str) -> str:
+    return f"{_topic_of(subject)}에 대해 {rng.choice(ANSWER_ENDINGS)}"
+
+
+def render_mock_response(system_prompt: str, user_prompt: str, model: str = "mock",
+                         json_schema: Optional[Dict[str, Any]] = None, drop_rate: float = 0.0) -> str:
+    """
+    프롬프트 종류를 알아보고, 에이전트 파서가 기대하는 형식 그대로의 결정적(deterministic) 응답을 만듭니다.
+    같은 (model, system, user) 입력에는 항상 같은 응답을 돌려줍니다.
+    json_schema가 주어지면 utils.structured_output의 스키마 형식 JSON으로 답하고,
+    drop_rate는 목록 응답에서 항목을 빠뜨리는 비율입니다 (누락 항목 재요청 테스트용).
+    """
+    seed = hashlib.sha256(f"{model}\x00{system_prompt}\x00{user_prompt}".encode("utf-8")).hexdigest()
+    rng = random.Random(int(seed[:16], 16))
+
+    def keep(items):
+        # 빈 응답은 LLMClient에서 오류가 되므로 항목은 최소 하나 남김
+        kept = [item for item in items if rng.random() >= drop_rate]
+        return kept or items[:1]
+
+    # QuestionGenAgent: "(index). level:(difficulty level)\t[category](Question)"
+    if "level:(difficulty level)\\t[category]" in user_prompt or "level:(difficulty level)\t[category]" in user_prompt:
+        lines = []
+        for i in range(10):
+            category = CATEGORIES[i // 2]
+            question = rng.choice(QUESTION_TEMPLATES).format(topic=rng.choice(TOPICS))
+            lines.append(f"{i + 1}. level:{rng.randint(1, 5)}\t[{category}]{question}")
+        return "\n".join(lines)
+
+    questions = _extract_questions(user_prompt)
+
+    # PriorityAgent: "(ranking). level:(difficulty level)\t(Question)", 입력 질문을 재정렬
+    if "Priority rules" in user_prompt:
+        order = list(range(len(questions)))
+        rng.shuffle(order)
+        ranked = []
+        for index in keep(order):
+            question = re.sub(r'^\(?\d+\)?\.?\s*', '', questions[index]).strip()
+            level = re.search(r'level:(\d+)', question)
+            category = re.search(r'\[(.*?)\]', question)
+            text = re.split(r'\[.*?\]', question, maxsplit=1)[-1] if category else re.sub(r'level:\d+\s*', '', question)
+            ranked.append((index + 1, int(level.group(1)) if level else rng.randint(1, 5),
+                           category.group(1) if category else rng.choice(CATEGORIES), text.strip()))
+        if json_schema:
+            return json.dumps({"ranked": [
+                {"ranking": rank, "index": index, "level": level, "category": category, "question": text}
+                for rank, (index, level, category, text) in enumerate(ranked, start=1)
+            ]}, ensure_ascii=False)
+        return "\n".join(f"{rank}. level:{level}\t[{category}]{text}"
+                         for rank, (_, level, category, text) in enumerate(ranked, start=1))
+
+    # GroundTruthAgent: "(question index): [(answer),]" 질문당 답변 3개
+    if "(question index): [(answer),]" in user_prompt:
+        items = keep([(_index_of(q, i), [f"{_sentence(rng, q)}." for _ in range(3)])
+                      for i, q in enumerate(questions, start=1)])
+        if json_schema:
+            return json.dumps({"answers": [{"index": i, "answers": answers} for i, answers in items]},
+                              ensure_ascii=False)
+        return "\n".join(f"{i}: [{', '.join(f'({a})' for a in answers)}]" for i, answers in items)
+
+    # StudentAgent / MultiModelEvaluator: "(question index): (answer)"
+    if "(question index): (answer)" in user_prompt:
+        items = keep([(i, f"{_sentence(rng, q)}. {_sentence(rng, q)}.") for i, q in enumerate(questions, start=1)])
+        if json_schema:
+            return json.dumps({"answers": [{"index": i, "answer": answer} for i, answer in items]},
+                              ensure_ascii=False)
+        return "\n".join(f"{i}: {answer}" for i, answer in items)
+
+    # DocumentAgent / CommentAgent 등 자유 형식
+    return " ".join(_sentence(rng, rng.choice(TOPICS)) + "." for _ in range(rng.randint(3, 6)))
+
+
+class LatencyModel:
+    """
+    모의 응답 지연 분포. 문자열 설정 형식:
+      fixed:<ms>, uniform:<min_ms>:<max_ms>, lognormal:<median_ms>:<sigma>
+    """
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"지원하지 않는 지연 분포입니다: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        """지연 시간(초)을 뽑습니다."""
+        if self.kind == "fixed":
+            ms = self.params[0] if self.params else 0.0
+        elif self.kind == "uniform":
+            ms = rng.uniform(self.params[0], self.params[1])
+        else:
+            ms = rng.lognormvariate(0.0, self.params[1]) * self.params[0]
+        return ms / 1000.0
+
+
+class MockProviderClient(ProviderClient):
+    """
+    실제 API 대신 render_mock_response로 응답하는 provider 클라이언트.
+    지연 분포, 429/500/타임아웃 오류 주입, 모델별 토큰 사용량 집계를 지원합니다.
+    max_concurrency를 주면 모델별로 그보다 많은 요청이 동시에 들어올 때 429로 거절합니다 (동시성 제어 테스트용).
+    """
+    def __init__(self, provider: str, timeout: float, latency: str = "fixed:0", rate_429: float = 0.0,
+                 rate_500: float = 0.0, rate_timeout: float = 0.0, seed: int = 0, drop_rate: float = 0.0,
+                 max_concurrency: int = 0):
+        super().__init__(timeout, max_connections=0)
+        self.provider = provider
+        self.latency = LatencyModel(latency)
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rate_timeout = rate_timeout
+        self.drop_rate = drop_rate
+        self.max_concurrency = max_concurrency
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.usage: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def _count(self, model: str, key: str, value: int = 1):
+        with self._lock:
+            self.usage[model][key] += value
+
+    def complete(self, model, system_prompt, user_prompt, temperature, max_tokens, json_schema=None):
+        with self._lock:
+            delay = self.latency.sample(self._rng)
+            roll = self._rng.random()
+            overloaded = self.max_concurrency and self._in_flight[model] >= self.max_concurrency
+            if not overloaded:
+                self._in_flight[model] += 1
+        self._count(model, "requests")
+        if overloaded:
+            self._count(model, "rate_limited")
+            raise MockAPIError(429, "mock concurrency limit exceeded", retry_after=0.05)
+        try:
+            return self._complete(model, system_prompt, user_prompt, max_tokens, json_schema, delay, roll)
+        finally:
+            with self._lock:
+                self._in_flight[model] -= 1
+
+    def _complete(self, model, system_prompt, user_prompt, max_tokens, json_schema, delay, roll):
+        if roll < self.rate_timeout:
+            time.sleep(min(self.timeout, max(delay, 0.0)))
+            self._count(model, "timeouts")
+            raise MockTimeoutError(f"mock {self.provider} request timed out")
+        time.sleep(delay)
+        roll -= self.rate_timeout
+        if roll < self.rate_429:
+            self._count(model, "rate_limited")
+            raise MockAPIError(429, "mock rate limit exceeded", retry_after=0.05)
+        roll -= self.rate_429
+        if roll < self.rate_500:
+            self._count(model, "server_errors")
+            raise MockAPIError(500, "mock internal server error")
+
+        text = render_mock_response(system_prompt, user_prompt, model, json_schema, self.drop_rate)
+        prompt_tokens = estimate_tokens(system_prompt, user_prompt)
+        completion_tokens = min(estimate_tokens(text), max_tokens)
+        self._count(model, "prompt_tokens", prompt_tokens)
+        self._count(model, "completion_tokens", completion_tokens)
+        self._set_usage(prompt_tokens, completion_tokens)
+        return text
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {model: dict(counts) for model, counts in self.usage.items()}
+
+
+def mock_client_factory(provider: str, timeout: float) -> MockProviderClient:
+    """
+    환경변수로 설정되는 MockProviderClient를 만듭니다.
+    MOCK_LLM_LATENCY (예: lognormal:800:0.5), MOCK_LLM_429_RATE, MOCK_LLM_500_RATE, MOCK_LLM_TIMEOUT_RATE, MOCK_LLM_SEED,
+    MOCK_LLM_DROP_RATE (목록 응답에서 항목을 빠뜨리는 비율), MOCK_LLM_MAX_CONCURRENCY (모델별 동시 요청 한도, 넘으면 429)
+    """
+    return MockProviderClient(
+        provider,
+        timeout=timeout,
+        latency=os.getenv("MOCK_LLM_LATENCY", "fixed:0"),
+        rate_429=float(os.getenv("MOCK_LLM_429_RATE", "0")),
+        rate_500=float(os.getenv("MOCK_LLM_500_RATE", "0")),
+        rate_timeout=float(os.getenv("MOCK_LLM_TIMEOUT_RATE", "0")),
+        seed=int(os.getenv("MOCK_LLM_SEED", "0")),
+        drop_rate=float(os.getenv("MOCK_LLM_DROP_RATE", "0")),
+        max_concurrency=int(os.getenv("MOCK_LLM_MAX_CONCURRENCY", "0")),
+    )
+
+
+def default_mock_batch_responder(body: Dict[str, Any]) -> str:
+    """배치 요청 body(chat.completions 형식)에 대한 모의 응답."""
+    messages = body["messages"]
+    system_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+    json_schema = (body.get("response_format") or {}).get("json_schema")
+    return render_mock_response(system_prompt, messages[-1]["content"], body.get("model", "mock"), json_schema)
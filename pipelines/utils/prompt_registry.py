@@ -0,0 +1,94 @@
+import os
+import hashlib
+import threading
+from string import Formatter
+from typing import Dict, FrozenSet, Optional, Tuple
+
+PROMPT_SEPARATOR = "---"
+
+
+def find_placeholders(template: str) -> FrozenSet[str]:
+    """str.format 템플릿에서 치환 변수 이름을 찾습니다 ('{{', '}}' 이스케이프는 제외)."""
+    names = set()
+    for _, field_name, _, _ in Formatter().parse(template):
+        if field_name:
+            names.add(field_name.split(".", 1)[0].split("[", 1)[0])
+    return frozenset(names)
+
+
+class PromptTemplate:
+    """'---'로 system/user를 미리 나눠 둔 프롬프트 템플릿."""
+    __slots__ = ("path", "mtime", "content_hash", "system_template", "user_template", "placeholders")
+
+    def __init__(self, path: str, raw: bytes, mtime: int):
+        text = raw.decode("utf-8").replace("\r\n", "\n")
+        if PROMPT_SEPARATOR not in text:
+            raise ValueError(f"프롬프트 파일에 system과 user 프롬프트를 구분하는 '{PROMPT_SEPARATOR}' 마커가 없습니다: {path}")
+        self.path = path
+        self.mtime = mtime
+        self.content_hash = hashlib.sha256(raw).hexdigest()
+        # 치환 전에 나누므로 치환 값(문서 등)에 '---'가 있어도 system/user 경계가 바뀌지 않음
+        self.system_template, self.user_template = text.split(PROMPT_SEPARATOR, 1)
+        self.placeholders = find_placeholders(self.system_template) | find_placeholders(self.user_template)
+
+    def render(self, **kwargs) -> Tuple[str, str]:
+        """변수를 치환한 (system_prompt, user_prompt)를 반환합니다."""
+        missing = self.placeholders - kwargs.keys()
+        if missing:
+            raise KeyError(f"프롬프트 '{self.path}'에 필요한 값이 없습니다: {sorted(missing)}")
+        return self.system_template.format_map(kwargs), self.user_template.format_map(kwargs)
+
+
+class PromptRegistry:
+    """
+    프롬프트 템플릿을 한 번만 읽어 검증/분리해 두는 레지스트리.
+    호출마다 파일을 다시 읽지 않고 mtime만 확인해서, 파일이 바뀐 경우에만 다시 로드합니다.
+    """
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def _read(self, path: str) -> PromptTemplate:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"프롬프트 파일이 없습니다: {path}")
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            return PromptTemplate(path, f.read(), mtime)
+
+    def get(self, path: str) -> PromptTemplate:
+        key = os.path.abspath(path)
+        template = self._templates.get(key)
+        try:
+            mtime = os.stat(key).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if template is not None and template.mtime == mtime:
+            return template
+        with self._lock:
+            template = self._templates.get(key)
+            if template is None or template.mtime != mtime:
+                if template is not None:
+                    print(f"프롬프트 파일 변경 감지, 다시 로드합니다: {path}")
+                template = self._read(key)
+                self._templates[key] = template
+            return template
+
+    def render(self, path: str, **kwargs) -> Tuple[str, str]:
+        return self.get(path).render(**kwargs)
+
+    def content_hash(self, path: str) -> str:
+        """템플릿 파일 내용의 sha256 (응답 캐시 / 체크포인트 fingerprint 키로 사용)."""
+        return self.get(path).content_hash
+
+
+_registry: Optional[PromptRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """프로세스 전역 PromptRegistry를 반환합니다."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PromptRegistry()
+        return _registry
@@ -0,0 +1,192 @@
+import os
+import json
+import mmap
+import hashlib
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List
+
+from utils.checkpoint_utils import atomic_write_json
+
+STORE_VERSION = 1
+# 질문 테이블 컬럼 (columnar: 컬럼별 리스트로 저장)
+QUESTION_COLUMNS = ("unified_id", "doc_id", "question", "ground_truths")
+# 문서 테이블 컬럼 (문서 본문은 documents.<hash>.bin에, 여기에는 위치와 본문 해시만 저장)
+DOCUMENT_COLUMNS = ("source_dir", "source_file", "department", "offset", "length", "content_hash")
+
+
+def document_hash(document: str) -> str:
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+class QAItem(Mapping):
+    """
+    통합 QA 항목 하나의 읽기 전용 뷰.
+    기존 dict 항목과 같은 키(unified_id, source_file, source_dir, department, document, question, ground_truths)에
+    doc_id가 더해지며, document 본문은 처음 접근할 때 저장소에서 읽습니다.
+    """
+    __slots__ = ("_store", "_row")
+    KEYS = ("unified_id", "doc_id", "source_file", "source_dir", "department", "document", "question", "ground_truths")
+
+    def __init__(self, store: "QAStore", row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        store, row = self._store, self._row
+        if key in ("unified_id", "doc_id", "question", "ground_truths"):
+            return store.questions[key][row]
+        doc_id = store.questions["doc_id"][row]
+        if key == "document":
+            return store.document(doc_id)
+        if key in ("source_dir", "source_file", "department"):
+            return store.documents[key][doc_id]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    @property
+    def document_hash(self) -> str:
+        """문서 본문의 sha256 (저장소에 기록되어 있으면 본문을 읽지 않음)."""
+        return self._store.document_hash(self._store.questions["doc_id"][self._row])
+
+    def __repr__(self) -> str:
+        return f"QAItem(unified_id={self['unified_id']}, doc_id={self['doc_id']})"
+
+
+class QAStore:
+    """
+    통합 QA 데이터셋의 정규화 저장소.
+    학생 기록(문서)은 내용이 같으면 한 번만 문서 파일에 저장하고, 질문은 doc_id로 문서를 가리킵니다.
+
+        <store_dir>/index.json                버전, 문서 파일 이름, 문서 테이블, 질문 테이블 (컬럼별 리스트)
+        <store_dir>/documents.<hash>.bin      UTF-8 문서 본문을 이어 붙인 파일 (mmap으로 필요한 문서만 읽음)
+
+    메모리 사용량은 질문 수가 아니라 실제로 접근한 고유 문서 수에 비례합니다.
+    """
+    def __init__(self, store_dir: str):
+        self.store_dir = store_dir
+        self.index_path = os.path.join(store_dir, "index.json")
+
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"지원하지 않는 QA 저장소 버전입니다: {index.get('version')} ({store_dir})")
+        self.blob_path = os.path.join(store_dir, index["blob"])
+        self.documents: Dict[str, List[Any]] = index["documents"]
+        self.questions: Dict[str, List[Any]] = index["questions"]
+
+        self._blob = None
+        self._doc_cache: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def exists(store_dir: str) -> bool:
+        return os.path.exists(os.path.join(store_dir, "index.json"))
+
+    @property
+    def num_documents(self) -> int:
+        return len(self.documents["offset"])
+
+    def __len__(self) -> int:
+        return len(self.questions["unified_id"])
+
+    def __iter__(self) -> Iterator[QAItem]:
+        return (QAItem(self, row) for row in range(len(self)))
+
+    def __getitem__(self, row: int) -> QAItem:
+        return QAItem(self, row)
+
+    def items(self) -> List[QAItem]:
+        return list(self)
+
+    def _open_blob(self):
+        if self._blob is None and os.path.getsize(self.blob_path) > 0:
+            with open(self.blob_path, "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._blob
+
+    def document(self, doc_id: int) -> str:
+        """문서 본문. 처음 읽을 때 한 번만 디코딩하고, 같은 문서를 가리키는 질문들은 같은 문자열을 공유합니다."""
+        text = self._doc_cache.get(doc_id)
+        if text is not None:
+            return text
+        with self._lock:
+            if doc_id not in self._doc_cache:
+                offset, length = self.documents["offset"][doc_id], self.documents["length"][doc_id]
+                blob = self._open_blob()
+                self._doc_cache[doc_id] = blob[offset:offset + length].decode("utf-8") if length else ""
+            return self._doc_cache[doc_id]
+
+    def document_hash(self, doc_id: int) -> str:
+        # content_hash 컬럼이 없는 이전 저장소는 본문을 읽어 계산
+        if "content_hash" in self.documents:
+            return self.documents["content_hash"][doc_id]
+        return document_hash(self.document(doc_id))
+
+    def close(self):
+        with self._lock:
+            if self._blob is not None:
+                self._blob.close()
+                self._blob = None
+            self._doc_cache.clear()
+
+    @classmethod
+    def write(cls, store_dir: str, items: Iterable[Dict[str, Any]]) -> "QAStore":
+        """
+        prepare_dataset.py 형식의 항목들(dict)을 정규화해서 저장합니다.
+        (원본 디렉토리, 파일, 학과, 문서 내용)이 같은 항목은 같은 문서 행을 씁니다.
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        documents = {column: [] for column in DOCUMENT_COLUMNS}
+        questions = {column: [] for column in QUESTION_COLUMNS}
+        doc_ids: Dict[tuple, int] = {}
+        blob_offsets: Dict[str, tuple] = {}
+
+        tmp_blob_path = os.path.join(store_dir, f"documents.{os.getpid()}.tmp")
+        blob_hash = hashlib.sha256()
+        with open(tmp_blob_path, "wb") as blob:
+            for item in items:
+                document = item.get("document", "")
+                content_hash = document_hash(document)
+                key = (item.get("source_dir", ""), item.get("source_file", ""), item.get("department", ""), content_hash)
+                doc_id = doc_ids.get(key)
+                if doc_id is None:
+                    # 본문이 같으면 (다른 파일의 같은 기록이라도) blob에는 한 번만 씀
+                    if content_hash not in blob_offsets:
+                        data = document.encode("utf-8")
+                        blob_offsets[content_hash] = (blob.tell(), len(data))
+                        blob.write(data)
+                        blob_hash.update(data)
+                    offset, length = blob_offsets[content_hash]
+                    doc_id = doc_ids[key] = len(documents["offset"])
+                    documents["source_dir"].append(key[0])
+                    documents["source_file"].append(key[1])
+                    documents["department"].append(key[2])
+                    documents["offset"].append(offset)
+                    documents["length"].append(length)
+                    documents["content_hash"].append(content_hash)
+
+                questions["unified_id"].append(item["unified_id"])
+                questions["doc_id"].append(doc_id)
+                questions["question"].append(item.get("question", ""))
+                questions["ground_truths"].append(item.get("ground_truths", []))
+            blob.flush()
+            os.fsync(blob.fileno())
+        # 문서 파일 이름에 내용 해시를 넣고 index.json을 마지막에 원자적으로 교체하므로,
+        # 중간에 중단되어도 이전 index.json은 이전 문서 파일을 그대로 가리킴
+        blob_name = f"documents.{blob_hash.hexdigest()[:16]}.bin"
+        os.replace(tmp_blob_path, os.path.join(store_dir, blob_name))
+        atomic_write_json(os.path.join(store_dir, "index.json"),
+                          {"version": STORE_VERSION, "blob": blob_name, "documents": documents, "questions": questions},
+                          indent=None)
+
+        for name in os.listdir(store_dir):
+            if name.startswith("documents.") and name.endswith(".bin") and name != blob_name:
+                os.remove(os.path.join(store_dir, name))
+        return cls(store_dir)
+
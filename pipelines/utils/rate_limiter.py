@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from utils.async_dispatcher import load_provider_limits
+from utils.telemetry import get_telemetry
+
+# 여러 프로세스가 동시에 깨어나 같은 순간에 다시 경쟁하지 않도록 대기 시간에 더하는 최대 jitter (초)
+MAX_WAIT_JITTER = 0.05
+
+
+class SharedRateLimiter:
+    """
+    같은 장비의 여러 프로세스(main.py의 process 모드 등)가 함께 쓰는 provider/모델별 RPM/TPM 토큰 버킷.
+    버킷 상태는 SQLite 파일 하나에 두고, 읽고 갱신하는 과정은 BEGIN IMMEDIATE 트랜잭션(파일 잠금)으로 직렬화합니다.
+
+    - acquire(): 요청 1개와 추정 토큰을 함께 예약하고, 부족하면 채워질 때까지 기다림
+    - settle(): 호출이 끝난 뒤 실제 토큰 사용량과 추정치의 차이를 반영
+    - block(): 429를 받은 프로세스가 Retry-After 동안 같은 모델의 다른 프로세스 호출도 멈춤
+
+    한도는 load_provider_limits()의 provider별 rpm/tpm을 모델마다 적용하고,
+    model_limits({"provider/model": {"rpm": ..., "tpm": ...}})로 모델별로 덮어쓸 수 있습니다.
+    같은 파일에 utils.adaptive_concurrency의 프로세스 간 공유 상태(concurrency, in_flight 테이블)도 둡니다.
+    """
+    def __init__(self, db_path: str, provider_limits: Optional[Dict[str, Dict[str, int]]] = None,
+                 model_limits: Optional[Dict[str, Dict[str, int]]] = None):
+        self.db_path = db_path
+        self.provider_limits = load_provider_limits(provider_limits)
+        self.model_limits = model_limits or {}
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork된 자식 프로세스는 부모의 연결을 물려받지 않고 새로 엽니다.
+        if self._conn is None or self._conn_pid != os.getpid():
+            dir_path = os.path.dirname(self.db_path)
+            if dir_path:
+                os.makedirs(dir_path, exist_ok=True)
+            # 트랜잭션을 직접 시작하므로 autocommit 모드로 엶
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # 버킷 상태는 잃어도 다시 채워지면 그만이므로 commit마다 fsync하지 않음
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY, requests REAL, tokens REAL, updated_at REAL, blocked_until REAL)"
+            )
+            # 동시 요청 수 제어(utils.adaptive_concurrency)가 프로세스 간에 공유하는 AIMD 상태와 pid별 진행 중 요청 수
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS concurrency ("
+                " key TEXT PRIMARY KEY, limit_value REAL, slow_start INTEGER, latency_baseline REAL,"
+                " error_rate REAL, last_decrease_at REAL, updated_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS in_flight (key TEXT, pid INTEGER, count INTEGER, PRIMARY KEY (key, pid))"
+            )
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def override_provider_limits(self, overrides: Dict[str, Dict[str, int]]):
+        """provider별 한도를 덮어씁니다 (load_provider_limits의 overrides와 같은 형식, rpm/tpm만 사용)."""
+        with self._lock:
+            for provider, values in overrides.items():
+                self.provider_limits.setdefault(provider, {}).update(values)
+
+    def limits_for(self, provider: str, model: str) -> Tuple[Optional[int], Optional[int]]:
+        """(분당 요청 수, 분당 토큰 수). 없으면 None (제한 없음)."""
+        limits = {**self.provider_limits.get(provider, {}), **self.model_limits.get(f"{provider}/{model}", {})}
+        return limits.get("rpm"), limits.get("tpm")
+
+    @contextmanager
+    def transaction(self):
+        """
+        BEGIN IMMEDIATE 트랜잭션 안의 연결을 빌려줍니다. 같은 파일을 쓰는 모든 프로세스와 직렬화되며,
+        블록이 예외 없이 끝나면 commit, 아니면 rollback합니다.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _reserve(self, key: str, rpm: Optional[int], tpm: Optional[int], tokens: float) -> float:
+        """예약에 성공하면 0, 아니면 다시 시도하기까지 기다릴 시간(초)."""
+        with self.transaction() as conn:
+            now = time.time()
+            row = conn.execute("SELECT requests, tokens, updated_at, blocked_until FROM buckets WHERE key = ?",
+                               (key,)).fetchone()
+            requests, available, updated_at, blocked_until = row or (rpm or 0, tpm or 0, now, 0.0)
+
+            # 마지막 갱신 이후 지난 시간만큼 분당 한도를 초당 균등하게 채움
+            elapsed = max(now - updated_at, 0.0)
+            requests = min(rpm, requests + elapsed * rpm / 60.0) if rpm else 0.0
+            available = min(tpm, available + elapsed * tpm / 60.0) if tpm else 0.0
+            # 한 번에 용량보다 큰 요청은 용량만큼만 기다린 뒤 통과시킴
+            tokens = min(tokens, tpm) if tpm else 0.0
+
+            wait = max(blocked_until - now, 0.0)
+            if rpm and requests < 1:
+                wait = max(wait, (1 - requests) * 60.0 / rpm)
+            if tpm and available < tokens:
+                wait = max(wait, (tokens - available) * 60.0 / tpm)
+            if wait <= 0:
+                requests -= 1 if rpm else 0
+                available -= tokens
+            conn.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?)",
+                         (key, requests, available, now, blocked_until))
+        return wait
+
+    def acquire(self, provider: str, model: str, tokens: int = 0) -> float:
+        """요청 1개와 tokens개의 토큰을 예약합니다. 기다린 시간(초)을 반환합니다."""
+        rpm, tpm = self.limits_for(provider, model)
+        if not rpm and not tpm:
+            return 0.0
+        key = f"{provider}/{model}"
+        waited = 0.0
+        while True:
+            wait = self._reserve(key, rpm, tpm, tokens)
+            if wait <= 0:
+                break
+            wait += random.uniform(0, MAX_WAIT_JITTER)
+            time.sleep(wait)
+            waited += wait
+        if waited:
+            get_telemetry().incr("rate_limit_wait_seconds", waited, provider=provider, model=model)
+        return waited
+
+    def settle(self, provider: str, model: str, extra_tokens: int):
+        """실제 사용 토큰이 예약한 추정치보다 많으면 그만큼 더 빼고, 적으면 돌려줍니다."""
+        rpm, tpm = self.limits_for(provider, model)
+        if not tpm or not extra_tokens:
+            return
+        with self._lock:
+            # 단일 UPDATE는 그 자체로 원자적. 버킷이 음수가 되면 그만큼 다음 예약이 기다림
+            self._connect().execute("UPDATE buckets SET tokens = MIN(tokens - ?, ?) WHERE key = ?",
+                                    (extra_tokens, tpm, f"{provider}/{model}"))
+
+    def block(self, provider: str, model: str, seconds: float):
+        """seconds 동안 모든 프로세스에서 이 모델의 새 예약을 멈춥니다 (429 Retry-After 공유)."""
+        rpm, tpm = self.limits_for(provider, model)
+        if not rpm and not tpm:
+            return
+        until = time.time() + seconds
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO buckets VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (f"{provider}/{model}", rpm or 0, tpm or 0, time.time(), until)
+            )
+
+
+_limiter: Optional[SharedRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[SharedRateLimiter]:
+    """
+    환경변수로 설정되는 프로세스 전역 rate limiter를 반환합니다 (LLM_RATE_LIMIT=off이면 None).
+    LLM_RATE_LIMIT_PATH, LLM_MODEL_RATE_LIMITS ('{"openai/gpt-4o-mini": {"rpm": 5000, "tpm": 2000000}}' 형식 JSON)
+    provider별 기본 한도는 OPENAI_RPM / OPENAI_TPM 등 (utils.async_dispatcher.load_provider_limits)
+    """
+    global _limiter
+    if os.getenv("LLM_RATE_LIMIT", "shared") == "off":
+        return None
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = SharedRateLimiter(
+                db_path=os.getenv("LLM_RATE_LIMIT_PATH", os.path.join("data", "cache", "rate_limits.sqlite3")),
+                model_limits=json.loads(os.getenv("LLM_MODEL_RATE_LIMITS", "{}")),
+            )
+        return _limiter
@@ -0,0 +1,221 @@
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# rouge_score.tokenize와 동일한 규칙 (use_stemmer=False)
+_NON_ALPHANUM_RE = re.compile(r"[^a-z0-9]+")
+_SPACES_RE = re.compile(r"\s+")
+_VALID_TOKEN_RE = re.compile(r"^[a-z0-9]+$")
+
+
+def rouge_score_tokenize(text: str) -> List[str]:
+    """rouge_score의 기본 토크나이저(DefaultTokenizer, stemmer 없음)와 같은 결과를 냅니다."""
+    text = _NON_ALPHANUM_RE.sub(" ", text.lower())
+    return [token for token in _SPACES_RE.split(text) if _VALID_TOKEN_RE.match(token)]
+
+
+def _fmeasure(precision: float, recall: float) -> float:
+    if precision + recall > 0:
+        return 2 * precision * recall / (precision + recall)
+    return 0.0
+
+
+def _fmeasure_array(precision: np.ndarray, recall: np.ndarray) -> np.ndarray:
+    """_fmeasure와 같은 연산 순서의 원소별 버전 (rouge_score와 비트 단위로 같은 값)."""
+    denominator = precision + recall
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator > 0, 2 * precision * recall / denominator, 0.0)
+
+
+def _segment_ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """[starts[k], starts[k] + lengths[k]) 구간들을 이어 붙인 인덱스 배열."""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+class TokenVocab:
+    """토큰 문자열을 정수 id로 intern합니다."""
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def encode(self, tokens: Sequence[str]) -> np.ndarray:
+        with self._lock:
+            ids = [self._ids.setdefault(token, len(self._ids)) for token in tokens]
+        return np.asarray(ids, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+class PreparedReference:
+    """정답 하나를 미리 토큰화한 결과: 정수 토큰 배열, unigram 개수, LCS용 위치 비트마스크."""
+    __slots__ = ("ids", "unique_ids", "counts", "match_masks")
+
+    def __init__(self, ids: np.ndarray):
+        self.ids = ids
+        self.unique_ids, self.counts = np.unique(ids, return_counts=True)
+        # 토큰 id별로 정답에서 등장하는 위치를 비트로 표시 (bit-parallel LCS용)
+        masks: Dict[int, int] = {}
+        for position, token_id in enumerate(ids.tolist()):
+            masks[token_id] = masks.get(token_id, 0) | (1 << position)
+        self.match_masks = masks
+
+
+def lcs_length_bitparallel(reference: PreparedReference, prediction_ids: Sequence[int]) -> int:
+    """
+    Allison-Dix / Hyyrö의 bit-parallel 알고리즘으로 LCS 길이를 계산합니다.
+    정답 길이 m을 파이썬 정수의 비트로 표현하므로 예측 토큰 하나당 O(m / word size) 연산입니다.
+    """
+    m = len(reference.ids)
+    if m == 0:
+        return 0
+    full = (1 << m) - 1
+    v = full
+    masks = reference.match_masks
+    for token_id in prediction_ids:
+        match = masks.get(token_id)
+        if match is None:
+            continue
+        u = v & match
+        v = ((v + u) | (v - u)) & full
+    return m - bin(v).count("1")
+
+
+class RougeEngine:
+    """
+    ROUGE-1 / ROUGE-L F1 엔진.
+    정답 세트는 한 번만 토큰화/정수화해서 재사용하고, unigram 겹침은 numpy로, LCS는 bit-parallel로 계산합니다.
+    기본 토크나이저를 쓰면 rouge_score.RougeScorer(['rouge1', 'rougeL'], use_stemmer=False)와 같은 값을 냅니다.
+    """
+    def __init__(self, tokenizer: Optional[Callable[[str], List[str]]] = None):
+        self.tokenizer = tokenizer or rouge_score_tokenize
+        self.vocab = TokenVocab()
+
+    def encode(self, text: str) -> np.ndarray:
+        return self.vocab.encode(self.tokenizer(text))
+
+    def prepare_references(self, ground_truths: Sequence[str]) -> List[PreparedReference]:
+        return [PreparedReference(self.encode(gt)) for gt in ground_truths]
+
+    def _score_one(self, prediction_ids: np.ndarray, unique_pred: np.ndarray, pred_counts: np.ndarray,
+                   reference: PreparedReference) -> Dict[str, float]:
+        # ROUGE-1: 공통 토큰별 min(개수)의 합
+        _, pred_idx, ref_idx = np.intersect1d(unique_pred, reference.unique_ids,
+                                              assume_unique=True, return_indices=True)
+        overlap = int(np.minimum(pred_counts[pred_idx], reference.counts[ref_idx]).sum())
+        rouge1 = _fmeasure(overlap / max(len(prediction_ids), 1), overlap / max(len(reference.ids), 1))
+
+        # ROUGE-L: LCS 기반
+        if len(prediction_ids) == 0 or len(reference.ids) == 0:
+            rouge_l = 0.0
+        else:
+            lcs = lcs_length_bitparallel(reference, prediction_ids.tolist())
+            rouge_l = _fmeasure(lcs / len(prediction_ids), lcs / len(reference.ids))
+        return {"rouge1_f1": rouge1, "rougeL_f1": rouge_l}
+
+    def score_max(self, generated_answer: str, references: List[PreparedReference]) -> Dict[str, float]:
+        """생성 답변 하나와 정답 후보들 간 ROUGE F1의 최댓값을 반환합니다."""
+        if not generated_answer or not references:
+            return {"rouge1_f1": 0.0, "rougeL_f1": 0.0}
+        prediction_ids = self.encode(generated_answer)
+        unique_pred, pred_counts = np.unique(prediction_ids, return_counts=True)
+        scores = [self._score_one(prediction_ids, unique_pred, pred_counts, ref) for ref in references]
+        return {
+            "rouge1_f1": max(s["rouge1_f1"] for s in scores),
+            "rougeL_f1": max(s["rougeL_f1"] for s in scores),
+        }
+
+    def score_batch(self, generated_answers: Sequence[Optional[str]],
+                    references_list: Sequence[List[PreparedReference]]) -> List[Dict[str, float]]:
+        """
+        한 모델의 모든 답변을 한 번에 채점합니다. 결과는 답변마다 score_max와 같습니다.
+
+        ROUGE-1은 모든 (답변, 정답) 쌍의 unigram 겹침을 (쌍 번호, 토큰 id) 키의 교집합 한 번으로 구하고,
+        ROUGE-L은 LCS가 unigram 겹침을 넘지 않으므로 (ROUGE-L F1 <= ROUGE-1 F1)
+        ROUGE-1 F1이 높은 정답부터 LCS를 계산하다가 더 나아질 수 없으면 멈춥니다.
+        """
+        results = [{"rouge1_f1": 0.0, "rougeL_f1": 0.0} for _ in generated_answers]
+        targets = [(i, self.encode(answer), refs)
+                   for i, (answer, refs) in enumerate(zip(generated_answers, references_list)) if answer and refs]
+        if not targets:
+            return results
+
+        predictions = [ids for _, ids, _ in targets]
+        pred_lens = np.array([len(ids) for ids in predictions], dtype=np.int64)
+        refs_per_answer = np.array([len(refs) for _, _, refs in targets], dtype=np.int64)
+        pair_answer = np.repeat(np.arange(len(targets)), refs_per_answer)
+        pair_refs = [ref for _, _, refs in targets for ref in refs]
+        ref_lens = np.array([len(ref.ids) for ref in pair_refs], dtype=np.int64)
+        num_pairs = len(pair_refs)
+
+        # 정답과 답변의 토큰 id는 모두 이 vocab에서 나왔으므로 vocab 크기보다 작음
+        vocab_size = max(len(self.vocab), 1)
+
+        # 답변별 unique 토큰과 개수 (답변 번호 * vocab_size + 토큰 id로 한 번에 np.unique)
+        pred_keys = np.concatenate([answer * vocab_size + ids for answer, ids in enumerate(predictions)])
+        pred_unique, pred_counts = np.unique(pred_keys, return_counts=True)
+        unique_starts = np.searchsorted(pred_unique, np.arange(len(targets)) * vocab_size)
+        unique_lens = np.diff(np.append(unique_starts, len(pred_unique)))
+
+        # 쌍마다 그 답변의 unique 토큰을 펼치고, 정답 쪽과 같은 (쌍 번호, 토큰 id) 키로 교집합
+        pair_pred_index = _segment_ranges(unique_starts[pair_answer], unique_lens[pair_answer])
+        pair_of_pred = np.repeat(np.arange(num_pairs), unique_lens[pair_answer])
+        pair_pred_keys = pair_of_pred * vocab_size + pred_unique[pair_pred_index] % vocab_size
+        pair_ref_keys = np.concatenate([p * vocab_size + ref.unique_ids for p, ref in enumerate(pair_refs)])
+        pair_ref_counts = np.concatenate([ref.counts for ref in pair_refs])
+        common, pred_idx, ref_idx = np.intersect1d(pair_pred_keys, pair_ref_keys,
+                                                   assume_unique=True, return_indices=True)
+        overlap = np.bincount(common // vocab_size,
+                              weights=np.minimum(pred_counts[pair_pred_index[pred_idx]], pair_ref_counts[ref_idx]),
+                              minlength=num_pairs)
+
+        pair_pred_lens = pred_lens[pair_answer]
+        rouge1 = _fmeasure_array(overlap / np.maximum(pair_pred_lens, 1), overlap / np.maximum(ref_lens, 1))
+        pair_starts = np.concatenate([[0], np.cumsum(refs_per_answer)[:-1]])
+        best_rouge1 = np.maximum.reduceat(rouge1, pair_starts)
+
+        for k, (i, prediction_ids, _) in enumerate(targets):
+            best_rouge_l = 0.0
+            if len(prediction_ids):
+                prediction_list = prediction_ids.tolist()
+                start = pair_starts[k]
+                for p in start + np.argsort(-rouge1[start:start + refs_per_answer[k]], kind="stable"):
+                    if rouge1[p] <= best_rouge_l:
+                        break
+                    lcs = lcs_length_bitparallel(pair_refs[p], prediction_list)
+                    best_rouge_l = max(best_rouge_l, _fmeasure(lcs / len(prediction_list), lcs / int(ref_lens[p])))
+            results[i] = {"rouge1_f1": float(best_rouge1[k]), "rougeL_f1": best_rouge_l}
+        return results
+
+
+def verify_against_rouge_score(engine: RougeEngine, generated_answers: Sequence[str],
+                               ground_truths_list: Sequence[Sequence[str]], tolerance: float = 1e-9) -> float:
+    """
+    같은 입력을 rouge_score로도 채점해 최대 절대 오차를 반환하고, tolerance를 넘으면 ValueError를 냅니다.
+    (엔진이 rouge_score 기본 토크나이저를 사용할 때만 의미가 있습니다.)
+    """
+    from rouge_score import rouge_scorer
+    scorer = rouge_scorer.RougeScorer(['rouge1', 'rougeL'], use_stemmer=False)
+
+    max_diff = 0.0
+    for answer, ground_truths in zip(generated_answers, ground_truths_list):
+        ours = engine.score_max(answer, engine.prepare_references(ground_truths))
+        if not answer or not ground_truths:
+            expected = {"rouge1_f1": 0.0, "rougeL_f1": 0.0}
+        else:
+            scores = [scorer.score(gt, answer) for gt in ground_truths]
+            expected = {
+                "rouge1_f1": max(s['rouge1'].fmeasure for s in scores),
+                "rougeL_f1": max(s['rougeL'].fmeasure for s in scores),
+            }
+        for key in ("rouge1_f1", "rougeL_f1"):
+            max_diff = max(max_diff, abs(ours[key] - expected[key]))
+    if max_diff > tolerance:
+        raise ValueError(f"ROUGE 엔진과 rouge_score의 차이가 허용치를 넘었습니다: {max_diff}")
+    return max_diff
@@ -0,0 +1,78 @@
+import os
+import json
+import time
+import hashlib
+from typing import Any, Dict, Iterable, List
+
+from utils.checkpoint_utils import atomic_write_json
+
+LEDGER_VERSION = 1
+
+
+def content_hash(value: Any) -> str:
+    """
+    JSON으로 직렬화할 수 있는 값의 내용 해시 (dict 키 순서와 무관).
+    변경 감지에만 쓰므로 ledger 크기를 줄이려고 앞 16자리만 씁니다.
+    """
+    encoded = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class RunLedger:
+    """
+    평가 출력물(파일 또는 항목)마다 그 출력을 만든 입력들의 해시를 기록합니다.
+
+        {"version": 1, "entries": {출력 키: {"inputs": {입력 이름: 해시}, "updated_at": ...}}}
+
+    입력 이름(예: qa, prompt, model, metric)은 파이프라인이 정하며,
+    다시 실행할 때 stale_inputs()로 바뀐 입력만 확인해 필요한 부분(답변 생성 또는 채점)만 다시 계산합니다.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            # 형식이 바뀐 ledger는 버리고 전부 다시 계산
+            if data.get("version") == LEDGER_VERSION:
+                self.entries = data.get("entries", {})
+        self._dirty = False
+
+    def stale_inputs(self, key: str, inputs: Dict[str, str]) -> List[str]:
+        """기록과 해시가 다른 입력 이름들. 기록이 없으면 모든 입력."""
+        recorded = self.entries.get(key, {}).get("inputs")
+        if recorded is None:
+            return list(inputs)
+        return [name for name, value in inputs.items() if recorded.get(name) != value]
+
+    def plan(self, key: str, inputs: Dict[str, str], scoring_inputs: Iterable[str]) -> str:
+        """
+        이전 출력을 어떻게 쓸지 정합니다.
+        reuse: 입력이 모두 그대로, rescore: scoring_inputs만 바뀜 (기존 답변으로 채점만 다시), regenerate: 그 밖
+        """
+        stale = self.stale_inputs(key, inputs)
+        if not stale:
+            return "reuse"
+        if set(stale) <= set(scoring_inputs):
+            return "rescore"
+        return "regenerate"
+
+    def record(self, key: str, inputs: Dict[str, str]):
+        self.entries[key] = {"inputs": dict(inputs), "updated_at": time.time()}
+        self._dirty = True
+
+    def forget(self, key: str):
+        if self.entries.pop(key, None) is not None:
+            self._dirty = True
+
+    def prune(self, keep_keys: Iterable[str]):
+        """keep_keys에 없는 항목(삭제된 QA, 평가 대상에서 빠진 모델 등)을 지웁니다."""
+        keep = set(keep_keys)
+        for key in [k for k in self.entries if k not in keep]:
+            self.forget(key)
+
+    def save(self):
+        if not self._dirty:
+            return
+        atomic_write_json(self.path, {"version": LEDGER_VERSION, "entries": self.entries}, indent=None)
+        self._dirty = False
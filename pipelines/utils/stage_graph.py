@@ -0,0 +1,146 @@
+import time
+import queue
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+_STOP = object()
+
+
+class Stage:
+    """
+    파이프라인의 한 단계. 자신의 bounded 입력 큐와 워커 스레드를 가지며,
+    fn(item)의 반환값을 다음 단계로 넘깁니다.
+    """
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1, queue_size: int = 64):
+        self.name = name
+        self.fn = fn
+        self.workers = max(workers, 1)
+        self.queue = queue.Queue(maxsize=max(queue_size, 1))
+
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=1000)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            processed, failed, in_flight = self.processed, self.failed, self.in_flight
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "in_flight": in_flight,
+            "processed": processed,
+            "failed": failed,
+            "latency_avg_sec": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p50_sec": percentile(0.5),
+            "latency_p95_sec": percentile(0.95),
+        }
+
+
+class StageGraph:
+    """
+    Stage들을 순서대로 연결한 처리량 중심 파이프라인 스케줄러.
+    문서 A가 뒤 단계에서 기다리는 동안 문서 B는 앞 단계를 진행할 수 있고,
+    큐가 가득 차면 앞 단계가 멈추는 방식으로 backpressure가 걸립니다.
+    """
+    def __init__(self, stages: List[Stage], on_complete: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[Any, str, Exception], None]] = None):
+        if not stages:
+            raise ValueError("최소 하나의 stage가 필요합니다.")
+        self.stages = stages
+        self.on_complete = on_complete
+        self.on_error = on_error
+        self._started = False
+        self._reporter: Optional[threading.Thread] = None
+        self._reporter_stop = threading.Event()
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                break
+            with stage._lock:
+                stage.in_flight += 1
+            started = time.monotonic()
+            try:
+                output = stage.fn(item)
+            except Exception as e:
+                with stage._lock:
+                    stage.in_flight -= 1
+                    stage.failed += 1
+                    stage.latencies.append(time.monotonic() - started)
+                if self.on_error:
+                    self.on_error(item, stage.name, e)
+                continue
+            with stage._lock:
+                stage.in_flight -= 1
+                stage.processed += 1
+                stage.latencies.append(time.monotonic() - started)
+
+            if next_stage is not None:
+                next_stage.queue.put(output)
+            elif self.on_complete:
+                self.on_complete(output)
+
+    def start(self):
+        for index, stage in enumerate(self.stages):
+            for i in range(stage.workers):
+                thread = threading.Thread(target=self._worker, args=(index,),
+                                          name=f"{stage.name}-{i}", daemon=True)
+                thread.start()
+                stage._threads.append(thread)
+        self._started = True
+
+    def submit(self, item: Any):
+        """첫 단계 큐에 넣습니다. 큐가 가득 차면 자리가 날 때까지 기다립니다."""
+        if not self._started:
+            self.start()
+        self.stages[0].queue.put(item)
+
+    def close_and_wait(self):
+        """앞 단계부터 차례로 종료 신호를 보내고 모든 항목이 끝날 때까지 기다립니다."""
+        for stage in self.stages:
+            for _ in stage._threads:
+                stage.queue.put(_STOP)
+            for thread in stage._threads:
+                thread.join()
+        self.stop_reporter()
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        return {stage.name: stage.metrics() for stage in self.stages}
+
+    def format_metrics(self) -> str:
+        lines = []
+        for name, m in self.metrics().items():
+            lines.append(f"  {name:<16} queue {m['queue_depth']:>3}/{m['queue_capacity']:<3} "
+                         f"in-flight {m['in_flight']:>3}  done {m['processed']:>5}  failed {m['failed']:>3}  "
+                         f"p50 {m['latency_p50_sec']:.2f}s  p95 {m['latency_p95_sec']:.2f}s")
+        return "\n".join(lines)
+
+    def start_reporter(self, interval: float = 30.0):
+        """interval초마다 단계별 큐 깊이/지연 시간을 출력합니다."""
+        def report():
+            while not self._reporter_stop.wait(interval):
+                print(f"[stage 상태]\n{self.format_metrics()}")
+
+        self._reporter = threading.Thread(target=report, name="stage-reporter", daemon=True)
+        self._reporter.start()
+
+    def stop_reporter(self):
+        if self._reporter:
+            self._reporter_stop.set()
+            self._reporter.join()
+            self._reporter = None
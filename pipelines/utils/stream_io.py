@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from utils.telemetry import get_telemetry
+
+_WHITESPACE = " \t\r\n"
+
+
+class _IncrementalJSONObjectReader:
+    """
+    최상위가 {"key": value, ...} 형태인 큰 JSON 파일을 청크 단위로 읽으면서 (key, value)를 하나씩 돌려줍니다.
+    전체 파일을 메모리에 올리지 않으므로 수백 MB 파일도 일정한 메모리로 읽을 수 있습니다.
+    """
+    def __init__(self, f, chunk_size: int = 1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # 이미 처리한 앞부분은 버려서 버퍼가 커지지 않게 함
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """공백을 건너뛰고 다음 문자를 반환합니다. 파일 끝이면 빈 문자열."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read_more():
+                return ""
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"JSON 형식 오류: '{char}'가 필요합니다 (위치 근처: {self.buf[self.pos:self.pos + 40]!r})")
+        self.pos += 1
+
+    def _decode_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # 버퍼 끝에서 끝난 값(예: 숫자)은 잘렸을 수 있으므로 더 읽어서 확인
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._read_more():
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return value
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._decode_value()
+            self._expect(":")
+            value = self._decode_value()
+            yield key, value
+            next_char = self._peek()
+            if next_char == ",":
+                self.pos += 1
+            elif next_char == "}":
+                return
+            else:
+                raise ValueError("JSON 형식 오류: ',' 또는 '}'가 필요합니다.")
+
+
+def iter_raw_documents(raw_path: str) -> Iterator[Tuple[str, str, str]]:
+    """
+    원본 문서를 스트리밍으로 읽어 (id, department, document)를 하나씩 돌려줍니다.
+    - .jsonl: 한 줄에 {"id": ..., "department": ..., "document": ...}
+    - .json: 기존 raw.json 형식 {id: {"department": ..., "document": ...}}
+    """
+    with open(raw_path, "r", encoding="utf-8") as f:
+        if raw_path.endswith(".jsonl"):
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                yield str(record["id"]), record["department"], record["document"]
+        else:
+            for id, record in _IncrementalJSONObjectReader(f):
+                yield id, record["department"], record["document"]
+
+
+class JsonlShardWriter:
+    """결과를 완료되는 즉시 append-only JSONL 샤드에 한 줄씩 기록합니다. 여러 스레드에서 호출해도 안전합니다."""
+    def __init__(self, output_dir: str, prefix: str = "results", max_records_per_shard: int = 10000):
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.max_records_per_shard = max_records_per_shard
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+
+        self.records_written = 0
+        self.bytes_written = 0
+        self._shard_index = -1
+        self._shard_records = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def current_path(self) -> Optional[str]:
+        return self._file.name if self._file else None
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        self._shard_index += 1
+        self._shard_records = 0
+        path = os.path.join(self.output_dir, f"{self.prefix}_{self.run_id}_{self._shard_index:05d}.jsonl")
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None or self._shard_records >= self.max_records_per_shard:
+                self._rotate()
+            self._file.write(line)
+            self._file.flush()
+            self._shard_records += 1
+            self.records_written += 1
+            num_bytes = len(line.encode("utf-8"))
+            self.bytes_written += num_bytes
+        get_telemetry().incr("bytes_written", num_bytes, target="jsonl")
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ProgressCounter:
+    """완료 건수와 처리량(건/초)을 일정 간격으로 출력하는 진행 카운터."""
+    def __init__(self, label: str = "문서", report_every: int = 10, report_interval: float = 10.0):
+        self.label = label
+        self.report_every = report_every
+        self.report_interval = report_interval
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._last_report = self.started_at
+        self._lock = threading.Lock()
+
+    def update(self, ok: bool = True):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            now = time.monotonic()
+            if self.done % self.report_every == 0 or now - self._last_report >= self.report_interval:
+                self._last_report = now
+                self._report(now)
+
+    def _report(self, now: float):
+        elapsed = max(now - self.started_at, 1e-9)
+        print(f"[진행] {self.label} {self.done}건 완료 (실패 {self.failed}건), "
+              f"{self.done / elapsed:.2f}건/초, 경과 {elapsed:.1f}초")
+
+    def summary(self) -> Dict[str, float]:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        return {"done": self.done, "failed": self.failed, "elapsed_sec": elapsed, "per_sec": self.done / elapsed}
@@ -0,0 +1,304 @@
+import re
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+# provider의 JSON schema / function calling 모드에 넘기는 응답 스키마 (OpenAI strict 모드 규칙을 따름)
+NUMBERED_ANSWERS_SCHEMA = {
+    "name": "numbered_answers",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "answers": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {"type": "integer", "description": "question index"},
+                        "answer": {"type": "string"},
+                    },
+                    "required": ["index", "answer"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["answers"],
+        "additionalProperties": False,
+    },
+}
+
+GROUND_TRUTH_SCHEMA = {
+    "name": "ground_truth",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "answers": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {"type": "integer", "description": "question index"},
+                        "answers": {"type": "array", "items": {"type": "string"}},
+                    },
+                    "required": ["index", "answers"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["answers"],
+        "additionalProperties": False,
+    },
+}
+
+PRIORITY_SCHEMA = {
+    "name": "priority",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "ranked": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "ranking": {"type": "integer"},
+                        "index": {"type": "integer", "description": "index of the question in the given list, from 1"},
+                        "level": {"type": "integer", "description": "difficulty level"},
+                        "category": {"type": "string"},
+                        "question": {"type": "string"},
+                    },
+                    "required": ["ranking", "index", "level", "category", "question"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["ranked"],
+        "additionalProperties": False,
+    },
+}
+
+
+def with_json_instruction(user_prompt: str, json_schema: Dict[str, Any]) -> str:
+    """텍스트 답변 형식 대신 스키마에 맞는 JSON으로 답하라는 지시문을 붙입니다."""
+    return (
+        f"{user_prompt}\n\n"
+        "Instead of the answer format above, return only a JSON object that matches this JSON schema (no extra text):\n"
+        f"{json.dumps(json_schema['schema'], ensure_ascii=False)}"
+    )
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """응답에서 JSON 객체를 꺼냅니다. ```json 코드 블록이나 앞뒤 설명이 붙어 있어도 되고, 없으면 None."""
+    text = (text or "").strip()
+    if "{" not in text:
+        return None
+    start, end = text.find("{"), text.rfind("}")
+    for candidate in (text, text[start:end + 1]):
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def _json_items(text: str, key: str) -> Optional[List[Dict[str, Any]]]:
+    """응답이 {key: [객체, ...]} 형식의 JSON이면 객체 목록을, 아니면 None(텍스트로 파싱)을 반환합니다."""
+    data = extract_json(text)
+    if not isinstance(data, dict) or not isinstance(data.get(key), list):
+        return None
+    return [item for item in data[key] if isinstance(item, dict)]
+
+
+def _as_index(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# "1: 답변", "(2): 답변", "3. 답변", "4) 답변" 형태의 번호 줄 ("3.14 ..."처럼 숫자가 바로 이어지면 번호가 아님)
+_NUMBERED_LINE_RE = re.compile(r'^\s*\(?(\d+)\)?\s*[:.)](?!\d)\s*(.*)$')
+
+
+def split_numbered_answers(answers_text: str, num_questions: int) -> Dict[int, str]:
+    """
+    번호 매긴 답변 텍스트를 한 번 훑어 {질문 번호(1부터): 답변}으로 나눕니다.
+    번호 없는 줄은 앞 답변에 이어 붙이고, 범위를 벗어난 번호나 이미 나온 번호는 앞 답변의 일부로 봅니다.
+    빈 답변은 결과에 넣지 않으므로, 빠진 번호는 호출자가 다시 요청할 수 있습니다.
+    """
+    answers: Dict[int, List[str]] = {}
+    current = None
+    for line in (answers_text or "").splitlines():
+        match = _NUMBERED_LINE_RE.match(line)
+        if match and 1 <= int(match.group(1)) <= num_questions and int(match.group(1)) not in answers:
+            current = int(match.group(1))
+            answers[current] = [match.group(2).strip()]
+        elif current is not None and line.strip():
+            answers[current].append(line.strip())
+
+    result = {}
+    for index, parts in answers.items():
+        answer = " ".join(p for p in parts if p).strip()
+        if answer.startswith('(') and answer.endswith(')'):
+            answer = answer[1:-1].strip()
+        if answer:
+            result[index] = answer
+    return result
+
+
+def parse_numbered_answers(answers_text: str, num_questions: int) -> Dict[int, str]:
+    """NUMBERED_ANSWERS_SCHEMA 형식의 JSON이면 그대로, 아니면 번호 매긴 텍스트로 파싱합니다."""
+    items = _json_items(answers_text, "answers")
+    if items is None:
+        return split_numbered_answers(answers_text, num_questions)
+    result = {}
+    for item in items:
+        index, answer = _as_index(item.get("index")), str(item.get("answer") or "").strip()
+        if index is not None and 1 <= index <= num_questions and answer and index not in result:
+            result[index] = answer
+    return result
+
+
+# "(번호): [(답변1.), (답변2.)]" 또는 "번호: [답변1., 답변2.]" 형태의 항목 하나 (여러 줄에 걸칠 수 있음)
+_GROUND_TRUTH_ITEM_RE = re.compile(r'\(?(\d+)\)?\s*:\s*\[(.*?)\](?=[ \t,]*(?:\n|$)|\s*\(?\d+\)?\s*:)', re.DOTALL)
+_PARENTHESIZED_RE = re.compile(r'\((.*?)\)', re.DOTALL)
+
+
+def _split_ground_truth_answers(body: str) -> List[str]:
+    body = body.strip()
+    if body.startswith("("):
+        answers = _PARENTHESIZED_RE.findall(body)
+    else:
+        answers = body.split(".,")
+    return [a.strip().strip('()').replace('"', "").replace("'", "").strip() for a in answers if a.strip()]
+
+
+def parse_ground_truth(result_text: str) -> Dict[str, List[str]]:
+    """
+    ground truth 응답을 {질문 번호(문자열): [답변, ...]}로 파싱합니다.
+    GROUND_TRUTH_SCHEMA 형식의 JSON이 아니면 텍스트를 정규식 한 번으로 훑습니다.
+    """
+    items = _json_items(result_text, "answers")
+    if items is not None:
+        ground_truth = {}
+        for item in items:
+            index = _as_index(item.get("index"))
+            answers = [str(a).strip() for a in item.get("answers") or [] if str(a).strip()]
+            if index is not None and answers:
+                ground_truth.setdefault(str(index), answers)
+        return ground_truth
+
+    ground_truth = {}
+    for key, body in _GROUND_TRUTH_ITEM_RE.findall(result_text or ""):
+        answers = _split_ground_truth_answers(body)
+        if answers:
+            ground_truth.setdefault(key, answers)
+    return ground_truth
+
+
+# 순위 번호: "1.", "2)", "3:", "(4)", "(5)." — 구분자가 없거나 숫자가 바로 이어지면("2024년에", "3.14") 번호가 아님
+_RANK_PREFIX = r'\s*(?:\((?P<paren_ranking>\d+)\)[.:]?|(?P<ranking>\d+)[.):](?!\d))\s*'
+
+# "(순위). level:(난이도)\t[카테고리](질문)" — 번호 외의 부분은 모두 생략될 수 있음
+_PRIORITY_LINE_RE = re.compile(
+    r'^' + _RANK_PREFIX +
+    r'(?:level\s*:\s*(?P<level>\d+))?\s*'
+    r'(?:\[(?P<category>[^\]]*)\])?\s*'
+    r'(?P<question>.*?)\s*$'
+)
+_RANK_PREFIX_RE = re.compile(r'^' + _RANK_PREFIX)
+_LEVEL_RE = re.compile(r'level\s*:\s*\d+')
+_CATEGORY_RE = re.compile(r'\[.*?\]')
+
+
+def clean_priority_question(line: str) -> str:
+    """우선순위 응답 한 줄에서 번호, level, [카테고리]를 떼고 질문 내용만 남깁니다."""
+    line = _LEVEL_RE.sub("", _RANK_PREFIX_RE.sub("", line, count=1))
+    # category 뒤 나머지 텍스트만
+    return _CATEGORY_RE.split(line, maxsplit=1)[-1].strip().replace('"', "").replace("'", "")
+
+
+def parse_priority_line(line: str) -> Optional[Dict[str, Any]]:
+    """우선순위 응답 한 줄을 ranking/level/category/question으로 나눕니다. 번호로 시작하지 않으면 None."""
+    match = _PRIORITY_LINE_RE.match(line)
+    if not match or not match.group("question"):
+        return None
+    level = match.group("level")
+    return {
+        "ranking": match.group("ranking") or match.group("paren_ranking"),
+        "level": int(level) if level else None,
+        "category": match.group("category"),
+        "question": match.group("question").replace('"', "").replace("'", "").strip(),
+    }
+
+
+def parse_priority(result_text: str) -> List[Dict[str, Any]]:
+    """
+    우선순위 응답을 순위 순서의 질문 목록으로 파싱합니다.
+    PRIORITY_SCHEMA 형식의 JSON이면 입력 질문 번호(index)도 함께 돌려줍니다.
+    텍스트 응답은 비어 있지 않은 줄마다 질문 하나입니다.
+    """
+    items = _json_items(result_text, "ranked")
+    if items is not None:
+        ranked = []
+        for item in items:
+            question = str(item.get("question") or "").strip()
+            if not question:
+                continue
+            ranked.append({
+                "ranking": str(item.get("ranking") or len(ranked) + 1),
+                "level": _as_index(item.get("level")),
+                "category": item.get("category") or None,
+                "question": question,
+                "index": _as_index(item.get("index")),
+            })
+        return ranked
+
+    ranked, unnumbered = [], []
+    for line in (result_text or "").splitlines():
+        if not line.strip():
+            continue
+        parsed = parse_priority_line(line)
+        if parsed is None:
+            # 번호 없는 줄도 버리지 않고 질문으로 둠
+            question = clean_priority_question(line)
+            if not question:
+                continue
+            parsed = {"ranking": None, "level": None, "category": None, "question": question}
+            unnumbered.append(parsed)
+        ranked.append(parsed)
+
+    # ranking은 ground truth를 질문에 다시 붙이는 키이므로, 번호 없는 줄에는 쓰이지 않은 다음 번호를 매김
+    next_ranking = max((int(item["ranking"]) for item in ranked if item["ranking"]), default=0)
+    for item in unnumbered:
+        next_ranking += 1
+        item["ranking"] = str(next_ranking)
+    return ranked
+
+
+def fill_missing(parsed: Dict[Any, Any], expected_keys: List[Any],
+                 ask: Callable[[List[Any]], Dict[Any, Any]], max_reasks: int = 1) -> Dict[Any, Any]:
+    """
+    parsed에 빠진 키만 다시 요청해 채웁니다.
+    ask(빠진 키 목록)는 그 키들에 대한 {키: 값}을 돌려주며, 전체 목록을 다시 생성하지 않습니다.
+    """
+    for _ in range(max_reasks):
+        missing = [key for key in expected_keys if key not in parsed]
+        if not missing:
+            break
+        print(f"    응답에서 {len(missing)}개 항목을 찾지 못해 해당 항목만 다시 요청합니다: {missing}")
+        for key, value in ask(missing).items():
+            if key in missing and value:
+                parsed[key] = value
+    return parsed
+
+
+def map_reask_answers(answers: Dict[str, Any], missing_keys: List[str]) -> Dict[str, Any]:
+    """
+    빠진 질문만 다시 요청한 응답 {번호: 값}을 원래 키로 옮깁니다.
+    응답 번호가 모두 빠진 키 중 하나면 그대로 쓰고, 정확히 1..k(k = 빠진 키 수)면 1부터 새로 매긴 것으로 보고
+    위치로 맞춥니다. 그 밖의 번호 조합은 어느 질문의 답인지 알 수 없으므로 버립니다.
+    """
+    if set(answers) <= set(missing_keys):
+        return dict(answers)
+    if set(answers) == {str(position) for position in range(1, len(missing_keys) + 1)}:
+        return {key: answers[str(position)] for position, key in enumerate(missing_keys, start=1)}
+    return {}
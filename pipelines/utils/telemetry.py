@@ -0,0 +1,356 @@
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+# 모델별 대략적인 가격 (USD / 1M 토큰, 입력, 출력). 요약 보고서의 비용 추정에만 사용합니다.
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "claude-3-5-sonnet-20241022": (3.00, 15.00),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+# 이벤트별 지연 분위수 계산을 위해 보관하는 최대 샘플 수
+MAX_LATENCY_SAMPLES = 10000
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+class TelemetrySink(ABC):
+    """이벤트(dict)를 받는 출력 대상 인터페이스."""
+    @abstractmethod
+    def emit(self, event: Dict[str, Any]):
+        ...
+
+    def close(self):
+        pass
+
+
+class JsonlSink(TelemetrySink):
+    """이벤트를 한 줄에 하나씩 JSONL 파일에 이어 씁니다."""
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class AggregatorSink(TelemetrySink):
+    """
+    프로세스 안에서 이벤트를 (종류, 라벨)별로 집계합니다.
+    Prometheus 출력과 실행 요약 보고서는 모두 이 집계를 기반으로 합니다.
+    """
+    NUMERIC_FIELDS = ("prompt_tokens", "completion_tokens", "retries", "items", "bytes")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.events: Dict[Tuple[str, LabelKey], Dict[str, Any]] = {}
+        self.counters: Dict[Tuple[str, LabelKey], float] = defaultdict(float)
+        self.gauges: Dict[Tuple[str, LabelKey], float] = {}
+
+    # 카운터/게이지 이벤트에서 라벨이 아닌 필드
+    METRIC_FIELDS = ("kind", "name", "value", "pid", "ts")
+
+    def emit(self, event: Dict[str, Any]):
+        if event["kind"] in ("counter", "gauge"):
+            labels = {k: v for k, v in event.items() if k not in self.METRIC_FIELDS}
+            if event["kind"] == "counter":
+                self.incr(event["name"], event["value"], labels)
+            else:
+                self.set_gauge(event["name"], event["value"], labels)
+            return
+        labels = {"provider": event.get("provider"), "model": event.get("model"), "name": event.get("name")}
+        key = (event["kind"], _label_key(labels))
+        with self._lock:
+            stats = self._stats(key)
+            stats["count"] += 1
+            if event.get("error"):
+                stats["errors"] += 1
+            duration = event.get("duration_s")
+            if duration is not None:
+                stats["duration_s"] += duration
+                if len(stats["durations"]) < MAX_LATENCY_SAMPLES:
+                    stats["durations"].append(duration)
+            if event.get("cache"):
+                stats["cache"][event["cache"]] += 1
+            for field in self.NUMERIC_FIELDS:
+                stats[field] += event.get(field) or 0
+
+    def _stats(self, key: Tuple[str, LabelKey]) -> Dict[str, Any]:
+        stats = self.events.get(key)
+        if stats is None:
+            stats = {"count": 0, "errors": 0, "duration_s": 0.0, "durations": [],
+                     "cache": defaultdict(int), **{f: 0 for f in self.NUMERIC_FIELDS}}
+            self.events[key] = stats
+        return stats
+
+    def take(self) -> Dict[str, Any]:
+        """
+        지금까지의 집계를 pickle할 수 있는 dict로 꺼내고 비웁니다.
+        fork된 워커 프로세스가 결과와 함께 부모에게 돌려주면 부모가 merge()로 합칩니다.
+        """
+        with self._lock:
+            state = {
+                "events": {key: {**stats, "cache": dict(stats["cache"])} for key, stats in self.events.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+            self.events = {}
+            self.counters = defaultdict(float)
+            self.gauges = {}
+        return state
+
+    def merge(self, state: Dict[str, Any]):
+        """다른 프로세스에서 take()한 집계를 더합니다. 게이지는 마지막 값으로 덮어씁니다."""
+        with self._lock:
+            for key, other in state["events"].items():
+                stats = self._stats(key)
+                for field in ("count", "errors", "duration_s", *self.NUMERIC_FIELDS):
+                    stats[field] += other[field]
+                stats["durations"].extend(other["durations"][:MAX_LATENCY_SAMPLES - len(stats["durations"])])
+                for result, count in other["cache"].items():
+                    stats["cache"][result] += count
+            for key, value in state["counters"].items():
+                self.counters[key] += value
+            self.gauges.update(state["gauges"])
+
+    def incr(self, name: str, value: float = 1, labels: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.counters[(name, _label_key(labels or {}))] += value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self.gauges[(name, _label_key(labels or {}))] = value
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            events = []
+            for (kind, labels), stats in sorted(self.events.items()):
+                durations = sorted(stats["durations"])
+                entry = {"kind": kind, **dict(labels),
+                         **{k: v for k, v in stats.items() if k not in ("durations", "cache")},
+                         "cache": dict(stats["cache"])}
+                if durations:
+                    entry["p50_s"] = durations[int(0.50 * (len(durations) - 1))]
+                    entry["p95_s"] = durations[int(0.95 * (len(durations) - 1))]
+                prices = MODEL_PRICES.get(dict(labels).get("model", ""))
+                if kind == "llm_call" and prices:
+                    entry["estimated_cost_usd"] = (stats["prompt_tokens"] * prices[0]
+                                                   + stats["completion_tokens"] * prices[1]) / 1e6
+                events.append(entry)
+            counters = [{"name": name, **dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            gauges = [{"name": name, **dict(labels), "value": value}
+                      for (name, labels), value in sorted(self.gauges.items())]
+        return {"events": events, "counters": counters, "gauges": gauges}
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition 형식으로 집계를 출력합니다."""
+        def fmt(labels: LabelKey) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        lines = []
+        with self._lock:
+            for (kind, labels), stats in sorted(self.events.items()):
+                metric = f"pipeline_{kind}"
+                lines.append(f"{metric}_total{fmt(labels)} {stats['count']}")
+                lines.append(f"{metric}_errors_total{fmt(labels)} {stats['errors']}")
+                lines.append(f"{metric}_duration_seconds_sum{fmt(labels)} {stats['duration_s']}")
+                lines.append(f"{metric}_duration_seconds_count{fmt(labels)} {len(stats['durations'])}")
+                for field in self.NUMERIC_FIELDS:
+                    if stats[field]:
+                        lines.append(f"{metric}_{field}_total{fmt(labels)} {stats[field]}")
+                for result, count in stats["cache"].items():
+                    lines.append(f"{metric}_cache_total{fmt(labels + (('result', result),))} {count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"pipeline_{name}_total{fmt(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                lines.append(f"pipeline_{name}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class PrometheusExporter:
+    """
+    로컬 포트에서 /metrics 요청에 집계 결과를 Prometheus text 형식으로 응답하는 HTTP 서버.
+    서버 스레드는 fork로 복제되지 않으므로, 만든 프로세스에서만 닫습니다.
+    """
+    def __init__(self, aggregator: AggregatorSink, port: int, host: str = "127.0.0.1"):
+        aggregator_ref = aggregator
+        self.pid = os.getpid()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = aggregator_ref.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="prometheus-exporter", daemon=True)
+        self.thread.start()
+        print(f"Prometheus 메트릭 제공 중: http://{host}:{self.server.server_address[1]}/metrics")
+
+    def close(self):
+        if self.pid != os.getpid():
+            return
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class Telemetry:
+    """
+    LLM 호출 / 채점 / 파일 쓰기 이벤트를 구조화해 여러 sink로 보내는 허브.
+    항상 AggregatorSink를 포함하므로 실행이 끝나면 summary()로 요약을 얻을 수 있습니다.
+    Prometheus exporter는 엔트리 포인트 프로세스에서 start_exporter()로 명시적으로 시작합니다.
+    """
+    def __init__(self, sinks: Optional[List[TelemetrySink]] = None):
+        self.aggregator = AggregatorSink()
+        self.sinks: List[TelemetrySink] = [self.aggregator] + list(sinks or [])
+        self.exporter: Optional[PrometheusExporter] = None
+        self.started_at = time.time()
+
+    def start_exporter(self, port: int) -> PrometheusExporter:
+        if self.exporter is None:
+            self.exporter = PrometheusExporter(self.aggregator, port)
+        return self.exporter
+
+    def add_sink(self, sink: TelemetrySink):
+        self.sinks.append(sink)
+
+    def emit(self, kind: str, **fields):
+        event = {"kind": kind, "pid": os.getpid(), **fields}
+        for sink in self.sinks:
+            try:
+                sink.emit(event)
+            except Exception as e:
+                # 계측 실패가 파이프라인을 멈추지 않도록 함
+                print(f"telemetry sink 오류 ({type(sink).__name__}): {e}")
+
+    @contextmanager
+    def span(self, kind: str, **fields):
+        """
+        블록의 시작/종료 시각과 소요 시간을 기록합니다. yield된 dict에 토큰 수 등을 채우면 함께 기록됩니다.
+        예외가 나면 error 필드를 채운 뒤 그대로 다시 던집니다.
+        """
+        record = dict(fields)
+        started_at, started = time.time(), time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["start_ts"] = started_at
+            record["end_ts"] = time.time()
+            record["duration_s"] = time.perf_counter() - started
+            self.emit(kind, **record)
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """
+        쓴 바이트 수, rate limit 대기 시간 등 누적 값을 counter 이벤트로 기록합니다.
+        다른 이벤트처럼 모든 sink로 가므로, 자식 프로세스의 값도 TELEMETRY_JSONL에 남습니다.
+        """
+        self.emit("counter", name=name, value=value, ts=time.time(), **labels)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        self.emit("gauge", name=name, value=value, ts=time.time(), **labels)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = self.aggregator.summary()
+        llm_events = [e for e in summary["events"] if e["kind"] == "llm_call"]
+        summary["totals"] = {
+            "wall_s": time.time() - self.started_at,
+            "llm_calls": sum(e["count"] for e in llm_events),
+            "llm_errors": sum(e["errors"] for e in llm_events),
+            "llm_retries": sum(e["retries"] for e in llm_events),
+            "prompt_tokens": sum(e["prompt_tokens"] for e in llm_events),
+            "completion_tokens": sum(e["completion_tokens"] for e in llm_events),
+            "estimated_cost_usd": sum(e.get("estimated_cost_usd", 0.0) for e in llm_events),
+        }
+        return summary
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        totals = summary["totals"]
+        lines = [f"[telemetry] LLM 호출 {totals['llm_calls']}회 (오류 {totals['llm_errors']}, 재시도 {totals['llm_retries']}), "
+                 f"토큰 입력 {totals['prompt_tokens']} / 출력 {totals['completion_tokens']}, "
+                 f"추정 비용 ${totals['estimated_cost_usd']:.4f}"]
+        for e in summary["events"]:
+            label = "/".join(str(e[k]) for k in ("provider", "model", "name") if e.get(k))
+            latency = f", p50 {e['p50_s']:.3f}s p95 {e['p95_s']:.3f}s" if "p50_s" in e else ""
+            cache = f", 캐시 {e['cache']}" if e["cache"] else ""
+            lines.append(f"  {e['kind']:<12} {label:<40} {e['count']}회, 총 {e['duration_s']:.1f}s{latency}{cache}")
+        for c in summary["counters"]:
+            labels = ", ".join(f"{k}={v}" for k, v in c.items() if k not in ("name", "value"))
+            lines.append(f"  {c['name']:<12} {labels:<40} {c['value']:.0f}")
+        return "\n".join(lines)
+
+    def write_summary(self, path: str):
+        from utils.checkpoint_utils import atomic_write_json
+        atomic_write_json(path, self.summary(), indent=2)
+
+    def close(self):
+        if self.exporter:
+            self.exporter.close()
+        for sink in self.sinks:
+            sink.close()
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """
+    환경변수로 설정되는 프로세스 전역 Telemetry를 반환합니다.
+    TELEMETRY_JSONL (이벤트 JSONL 경로)
+    """
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            sinks = []
+            if os.getenv("TELEMETRY_JSONL"):
+                sinks.append(JsonlSink(os.getenv("TELEMETRY_JSONL")))
+            _telemetry = Telemetry(sinks)
+        return _telemetry
+
+
+def start_exporter() -> Optional[PrometheusExporter]:
+    """
+    TELEMETRY_PROMETHEUS_PORT가 지정되어 있으면 전역 Telemetry의 /metrics 서버를 시작합니다.
+    워커 프로세스마다 같은 포트를 잡지 않도록 엔트리 포인트의 __main__에서만 호출합니다.
+    """
+    port = os.getenv("TELEMETRY_PROMETHEUS_PORT")
+    if not port:
+        return None
+    return get_telemetry().start_exporter(int(port))
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# 파이프라인 모듈은 utils.* 로 import하므로 엔트리 포인트와 같은 경로를 추가
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BASE_DIR, os.path.join(BASE_DIR, "pipelines")]
@@ -0,0 +1,111 @@
+import sqlite3
+
+import pytest
+
+from utils.korean_tokenizer import (
+    CachedTokenizer,
+    KoreanTokenizer,
+    decompose_jamo,
+    get_tokenizer,
+    strip_particle,
+)
+
+
+@pytest.mark.parametrize("eojeol, expected", [
+    ("학생이", "학생"),
+    ("학교에서", "학교"),
+    ("서울에서부터", "서울"),
+    ("문화와", "문화"),
+    ("ai를", "ai"),
+    # 한 글자 조사는 어간이 두 글자 이상 남을 때만 제거
+    ("소가", "소가"),
+    ("그는", "그는"),
+    # 두 글자 이상 조사는 한 글자 어간도 남김
+    ("집에서", "집"),
+    # 조사가 없거나 조사만 있는 어절은 그대로
+    ("나라", "나라"),
+    ("에서", "에서"),
+])
+def test_strip_particle(eojeol, expected):
+    assert strip_particle(eojeol) == expected
+
+
+def test_decompose_jamo():
+    assert decompose_jamo("한글 a") == "ㅎㅏㄴㄱㅡㄹ a"
+    assert decompose_jamo("가") == "ㄱㅏ"
+
+
+@pytest.mark.parametrize("mode, text, expected", [
+    ("morpheme", "학생들이 학교에서 AI를 배운다!", ["학생들", "학교", "ai", "배운다"]),
+    # 한글과 영문/숫자가 섞인 어절은 나눔
+    ("morpheme", "2024년에 GPT4로", ["2024", "년", "gpt4"]),
+    ("morpheme", "!!! ...", []),
+    ("syllable", "학생이 AI를", ["학", "생", "a", "i"]),
+    ("jamo", "학생이", ["ㅎ", "ㅏ", "ㄱ", "ㅅ", "ㅐ", "ㅇ"]),
+])
+def test_korean_tokenizer_modes(mode, text, expected):
+    assert KoreanTokenizer(mode).tokenize(text) == expected
+
+
+def test_korean_tokenizer_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        KoreanTokenizer("word")
+
+
+def test_get_tokenizer_names():
+    assert get_tokenizer("korean").name == "korean_morpheme_v1"
+    assert get_tokenizer("korean_jamo").name == "korean_jamo_v1"
+    with pytest.raises(ValueError):
+        get_tokenizer("unknown")
+
+
+class CountingTokenizer(KoreanTokenizer):
+    def __init__(self):
+        super().__init__("morpheme")
+        self.calls = 0
+
+    def tokenize(self, text):
+        self.calls += 1
+        return super().tokenize(text)
+
+
+def test_cached_tokenizer_lru():
+    base = CountingTokenizer()
+    tokenizer = CachedTokenizer(base, lru_size=2)
+    for text in ["가방을", "나무가", "가방을", "다리를", "나무가"]:
+        tokenizer.tokenize(text)
+    # "나무가"는 "다리를"이 들어오며 LRU에서 밀려나 다시 토큰화
+    assert tokenizer.stats() == {"hits": 1, "disk_hits": 0, "misses": 4, "lru_size": 2}
+    assert base.calls == 4
+
+
+def _disk_rows(cache_dir):
+    with sqlite3.connect(str(cache_dir / "token_cache.sqlite3")) as conn:
+        return conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+
+def test_cached_tokenizer_disk_hit_and_miss(tmp_path):
+    first = CachedTokenizer(CountingTokenizer(), cache_dir=str(tmp_path))
+    assert first.tokenize("학생이 공부를") == ["학생", "공부"]
+    first.flush()
+
+    base = CountingTokenizer()
+    second = CachedTokenizer(base, cache_dir=str(tmp_path))
+    assert second.tokenize("학생이 공부를") == ["학생", "공부"]
+    assert second.tokenize("새 문장을") == ["새", "문장"]
+    assert second.stats() == {"hits": 0, "disk_hits": 1, "misses": 1, "lru_size": 2}
+    assert base.calls == 1
+
+
+def test_cached_tokenizer_batches_disk_writes(tmp_path):
+    tokenizer = CachedTokenizer(KoreanTokenizer(), cache_dir=str(tmp_path), lru_size=1, commit_every=3)
+    for text in ["가", "나", "다", "라"]:
+        tokenizer.tokenize(text)
+    # commit_every개가 모이면 한 번에 쓰고, 나머지는 flush()에서 씀
+    assert _disk_rows(tmp_path) == 3
+    # 아직 쓰지 않은 결과도 LRU에서 밀려난 뒤 다시 토큰화하지 않음
+    tokenizer.tokenize("가")
+    tokenizer.tokenize("라")
+    assert tokenizer.stats()["misses"] == 4
+    tokenizer.flush()
+    assert _disk_rows(tmp_path) == 4
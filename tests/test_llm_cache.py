@@ -0,0 +1,37 @@
+import pytest
+
+from utils.llm_cache import LLMResponseCache
+
+PROMPT = ("openai", "gpt-4o-mini", "system", "user", 0.7, 4096)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / "llm_cache.sqlite3"))
+
+
+def test_readwrite_returns_cached_response(cache):
+    assert cache.cached_call(*PROMPT, lambda: "첫 응답") == "첫 응답"
+    assert cache.cached_call(*PROMPT, lambda: "새 응답") == "첫 응답"
+    assert (cache.hits, cache.writes) == (1, 1)
+
+
+def test_refresh_skips_read_and_overwrites(cache):
+    cache.cached_call(*PROMPT, lambda: "파싱 못한 응답")
+    with cache.refresh():
+        assert cache.cached_call(*PROMPT, lambda: "새 응답") == "새 응답"
+    # 새 응답으로 덮어썼으므로 다음 실행은 새 응답을 읽음
+    assert cache.cached_call(*PROMPT, lambda: "또 다른 응답") == "새 응답"
+    assert not cache.refreshing
+
+
+def test_bypass_neither_reads_nor_writes(cache):
+    cache.cached_call(*PROMPT, lambda: "첫 응답")
+    with cache.bypass():
+        assert cache.cached_call(*PROMPT, lambda: "새 응답") == "새 응답"
+    assert cache.cached_call(*PROMPT, lambda: "또 다른 응답") == "첫 응답"
+
+
+def test_empty_response_is_not_cached(cache):
+    assert cache.cached_call(*PROMPT, lambda: "") == ""
+    assert cache.cached_call(*PROMPT, lambda: "응답") == "응답"
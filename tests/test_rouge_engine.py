@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from utils.rouge_engine import RougeEngine, verify_against_rouge_score
+
+
+def _random_inputs(seed, num_answers=300):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(50)]
+
+    def sentence(max_len):
+        return " ".join(rng.choice(words) for _ in range(rng.randint(0, max_len)))
+
+    answers = [sentence(40) if rng.random() > 0.05 else None for _ in range(num_answers)]
+    ground_truths = [[sentence(30) for _ in range(rng.randint(0, 5))] for _ in answers]
+    return answers, ground_truths
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_score_batch_matches_score_max(seed):
+    engine = RougeEngine()
+    answers, ground_truths = _random_inputs(seed)
+    references = [engine.prepare_references(gts) for gts in ground_truths]
+    expected = [engine.score_max(answer or "", refs) for answer, refs in zip(answers, references)]
+    assert engine.score_batch(answers, references) == expected
+
+
+@pytest.mark.parametrize("answer, ground_truths, expected", [
+    (None, ["a b"], {"rouge1_f1": 0.0, "rougeL_f1": 0.0}),
+    ("a b", [], {"rouge1_f1": 0.0, "rougeL_f1": 0.0}),
+    ("!!!", ["a b"], {"rouge1_f1": 0.0, "rougeL_f1": 0.0}),
+    ("a b c", ["a b c"], {"rouge1_f1": 1.0, "rougeL_f1": 1.0}),
+    # 순서가 뒤집히면 unigram은 모두 겹치지만 LCS는 1
+    ("c b a", ["a b c", "x y"], {"rouge1_f1": 1.0, "rougeL_f1": 1 / 3}),
+])
+def test_score_batch_edge_cases(answer, ground_truths, expected):
+    engine = RougeEngine()
+    assert engine.score_batch([answer], [engine.prepare_references(ground_truths)]) == [expected]
+
+
+def test_matches_rouge_score():
+    pytest.importorskip("rouge_score")
+    engine = RougeEngine()
+    answers, ground_truths = _random_inputs(3, num_answers=100)
+    assert verify_against_rouge_score(engine, [a or "" for a in answers], ground_truths) <= 1e-9
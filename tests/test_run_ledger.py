@@ -0,0 +1,69 @@
+import pytest
+
+from utils.run_ledger import RunLedger, content_hash
+
+INPUTS = {"qa": "q1", "prompt": "p1", "ground_truth": "g1", "metric": "m1"}
+SCORING_INPUTS = ("ground_truth", "metric")
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = RunLedger(str(tmp_path / "run_ledger.json"))
+    ledger.record("a", INPUTS)
+    return ledger
+
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+
+@pytest.mark.parametrize("changes, expected", [
+    ({}, []),
+    ({"metric": "m2"}, ["metric"]),
+    ({"qa": "q2", "ground_truth": "g2"}, ["qa", "ground_truth"]),
+])
+def test_stale_inputs(ledger, changes, expected):
+    assert ledger.stale_inputs("a", {**INPUTS, **changes}) == expected
+
+
+def test_stale_inputs_without_record(ledger):
+    assert ledger.stale_inputs("missing", INPUTS) == list(INPUTS)
+    # 기록에 없던 입력이 새로 생기면 그 입력만 바뀐 것으로 봄
+    assert ledger.stale_inputs("a", {**INPUTS, "model": "x"}) == ["model"]
+
+
+@pytest.mark.parametrize("changes, expected", [
+    ({}, "reuse"),
+    # 정답 세트나 채점 방식만 바뀌면 기존 답변으로 채점만 다시
+    ({"ground_truth": "g2"}, "rescore"),
+    ({"ground_truth": "g2", "metric": "m2"}, "rescore"),
+    ({"prompt": "p2"}, "regenerate"),
+    ({"prompt": "p2", "metric": "m2"}, "regenerate"),
+])
+def test_plan(ledger, changes, expected):
+    assert ledger.plan("a", {**INPUTS, **changes}, SCORING_INPUTS) == expected
+
+
+def test_plan_after_forget(ledger):
+    # 빈 답변 등으로 지운 항목은 다시 생성
+    ledger.forget("a")
+    assert ledger.plan("a", INPUTS, SCORING_INPUTS) == "regenerate"
+
+
+def test_prune_and_save(tmp_path, ledger):
+    ledger.record("b", INPUTS)
+    ledger.record("c", INPUTS)
+    ledger.prune(["a", "c", "not-recorded"])
+    assert sorted(ledger.entries) == ["a", "c"]
+    ledger.save()
+
+    reloaded = RunLedger(ledger.path)
+    assert sorted(reloaded.entries) == ["a", "c"]
+    assert reloaded.plan("c", INPUTS, SCORING_INPUTS) == "reuse"
+
+
+def test_other_version_is_discarded(tmp_path):
+    path = tmp_path / "run_ledger.json"
+    path.write_text('{"version": 0, "entries": {"a": {"inputs": {}}}}', encoding="utf-8")
+    assert RunLedger(str(path)).entries == {}
@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from utils.structured_output import (
+    clean_priority_question,
+    fill_missing,
+    map_reask_answers,
+    parse_ground_truth,
+    parse_numbered_answers,
+    parse_priority,
+    split_numbered_answers,
+)
+
+
+@pytest.mark.parametrize("text, num_questions, expected", [
+    # 기본 번호 형식들
+    ("1: 답A\n2: 답B", 2, {1: "답A", 2: "답B"}),
+    ("(1): 답A\n(2): 답B", 2, {1: "답A", 2: "답B"}),
+    ("1. 답A\n2) 답B", 2, {1: "답A", 2: "답B"}),
+    # 순서가 바뀌어도 번호로 맞춤, 빠진 번호는 결과에 없음
+    ("3: 답C\n1: 답A", 3, {1: "답A", 3: "답C"}),
+    # 번호 없는 줄은 앞 답변에 이어 붙임
+    ("1: 첫 줄\n둘째 줄\n2: 답B", 2, {1: "첫 줄 둘째 줄", 2: "답B"}),
+    # 범위를 벗어난 번호와 중복 번호는 앞 답변의 일부
+    ("1: 답A\n5: 덧붙임\n1: 다시", 2, {1: "답A 5: 덧붙임 1: 다시"}),
+    # 괄호로 감싼 답변은 괄호를 벗김
+    ("1: (답A)", 1, {1: "답A"}),
+    # 소수나 연도로 시작하는 줄은 번호가 아님
+    ("1: 원주율은\n3.14 입니다", 3, {1: "원주율은 3.14 입니다"}),
+    ("1: 사건은\n2024년에 일어남", 3, {1: "사건은 2024년에 일어남"}),
+    # 빈 답변은 빠진 것으로 봄
+    ("1:\n2: 답B", 2, {2: "답B"}),
+    ("", 2, {}),
+])
+def test_split_numbered_answers(text, num_questions, expected):
+    assert split_numbered_answers(text, num_questions) == expected
+
+
+@pytest.mark.parametrize("text, num_questions, expected", [
+    (json.dumps({"answers": [{"index": 2, "answer": "답B"}, {"index": 1, "answer": "답A"}]}), 2,
+     {1: "답A", 2: "답B"}),
+    # 코드 블록과 앞뒤 설명이 붙은 JSON
+    ("결과:\n```json\n" + json.dumps({"answers": [{"index": 1, "answer": "답A"}]}) + "\n```", 1, {1: "답A"}),
+    # 범위 밖, 빈 답변, 중복 번호는 버림
+    (json.dumps({"answers": [{"index": 3, "answer": "x"}, {"index": 1, "answer": " "},
+                             {"index": 2, "answer": "답B"}, {"index": 2, "answer": "중복"}]}), 2, {2: "답B"}),
+    # 숫자 문자열 index
+    (json.dumps({"answers": [{"index": "1", "answer": "답A"}]}), 1, {1: "답A"}),
+    # answers 키가 없으면 텍스트로 파싱
+    ('1: {"a": 1} 형태', 1, {1: '{"a": 1} 형태'}),
+])
+def test_parse_numbered_answers(text, num_questions, expected):
+    assert parse_numbered_answers(text, num_questions) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    # 괄호로 감싼 답변 목록
+    ("(1): [(답A1.), (답A2.)]\n(2): [(답B1.)]", {"1": ["답A1.", "답A2."], "2": ["답B1."]}),
+    # ".,"로 나눈 답변 목록과 따옴표
+    ('1: [답A1., "답A2."]\n2: [답B1.]', {"1": ["답A1", "답A2."], "2": ["답B1."]}),
+    # 여러 줄에 걸친 항목
+    ("1: [(답A1.),\n(답A2.)]\n2: [(답B1.)]", {"1": ["답A1.", "답A2."], "2": ["답B1."]}),
+    # 같은 번호가 다시 나오면 처음 것을 씀, 빈 목록은 버림
+    ("1: [(답A.)]\n1: [(다시.)]\n2: []", {"1": ["답A."]}),
+    ("답변 없음", {}),
+])
+def test_parse_ground_truth_text(text, expected):
+    assert parse_ground_truth(text) == expected
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({"answers": [{"index": 1, "answers": ["답A1", " 답A2 "]}, {"index": 2, "answers": ["답B"]}]},
+     {"1": ["답A1", "답A2"], "2": ["답B"]}),
+    # 빈 답변 목록, index 없는 항목, 중복 index는 버림
+    ({"answers": [{"index": 1, "answers": ["", " "]}, {"answers": ["x"]},
+                  {"index": 2, "answers": ["답B"]}, {"index": 2, "answers": ["중복"]}]},
+     {"2": ["답B"]}),
+])
+def test_parse_ground_truth_json(data, expected):
+    assert parse_ground_truth(json.dumps(data, ensure_ascii=False)) == expected
+
+
+def _summary(ranked):
+    return [(r["ranking"], r["level"], r["category"], r["question"]) for r in ranked]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1. level:2\t[사실]질문A\n2. level:1\t[추론]질문B",
+     [("1", 2, "사실", "질문A"), ("2", 1, "추론", "질문B")]),
+    # 번호 형식들과 따옴표
+    ('(1). level:3 [사실] "질문A"\n2) 질문B\n3: 질문C\n(4) 질문D',
+     [("1", 3, "사실", "질문A"), ("2", None, None, "질문B"), ("3", None, None, "질문C"), ("4", None, None, "질문D")]),
+    # 구분자 없이 숫자로 시작하는 줄은 번호 없는 줄이고, 쓰이지 않은 다음 순위를 받음
+    ("1. 질문A\n2024년에 일어난 일은?\n3.14 is pi\n2. 질문B",
+     [("1", None, None, "질문A"), ("3", None, None, "2024년에 일어난 일은?"),
+      ("4", None, None, "3.14 is pi"), ("2", None, None, "질문B")]),
+    # 번호 없는 줄도 버리지 않음, 빈 줄은 건너뜀
+    ("[사실]질문A\n\nlevel:2 질문B",
+     [("1", None, None, "질문A"), ("2", None, None, "질문B")]),
+    ("", []),
+])
+def test_parse_priority_text(text, expected):
+    assert _summary(parse_priority(text)) == expected
+
+
+def test_parse_priority_json():
+    data = {"ranked": [
+        {"ranking": 1, "index": 2, "level": 3, "category": "사실", "question": "질문B"},
+        {"ranking": 2, "index": 1, "level": 1, "category": "", "question": " 질문A "},
+        {"ranking": 3, "index": 3, "level": 1, "category": "추론", "question": ""},
+    ]}
+    ranked = parse_priority(json.dumps(data, ensure_ascii=False))
+    assert _summary(ranked) == [("1", 3, "사실", "질문B"), ("2", 1, None, "질문A")]
+    assert [r["index"] for r in ranked] == [2, 1]
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("1. level:2\t[사실]질문A", "질문A"),
+    ("(3) \"질문C\"", "질문C"),
+    ("2024년에 일어난 일은?", "2024년에 일어난 일은?"),
+    ("3.14 is pi", "3.14 is pi"),
+])
+def test_clean_priority_question(line, expected):
+    assert clean_priority_question(line) == expected
+
+
+@pytest.mark.parametrize("answers, missing_keys, expected", [
+    # 원래 번호로 답한 응답은 그대로
+    ({"5": ["답5"], "2": ["답2"]}, ["2", "5"], {"2": ["답2"], "5": ["답5"]}),
+    ({"5": ["답5"]}, ["2", "5"], {"5": ["답5"]}),
+    # 1부터 새로 매긴 응답은 위치로 맞춤
+    ({"1": ["답2"], "2": ["답5"]}, ["2", "5"], {"2": ["답2"], "5": ["답5"]}),
+    # 어느 쪽인지 알 수 없는 번호 조합은 버림
+    ({"1": ["x"], "5": ["y"]}, ["2", "5"], {}),
+    ({"1": ["x"]}, ["2", "5"], {}),
+    ({}, ["2"], {}),
+])
+def test_map_reask_answers(answers, missing_keys, expected):
+    assert map_reask_answers(answers, missing_keys) == expected
+
+
+def test_fill_missing_with_renumbered_reask():
+    keys = ["1", "2", "3", "4", "5"]
+    parsed = {"1": ["답1"], "3": ["답3"], "4": ["답4"]}
+    asked = []
+
+    def ask(missing):
+        asked.append(missing)
+        return map_reask_answers({"1": ["답2"], "2": ["답5"]}, missing)
+
+    assert fill_missing(parsed, keys, ask) == {"1": ["답1"], "2": ["답2"], "3": ["답3"], "4": ["답4"], "5": ["답5"]}
+    assert asked == [["2", "5"]]
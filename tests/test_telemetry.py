@@ -0,0 +1,55 @@
+import multiprocessing
+
+import pytest
+
+from utils.telemetry import Telemetry
+
+
+def _record(telemetry, calls):
+    for i in range(calls):
+        with telemetry.span("llm_call", provider="openai", model="gpt-4o-mini", cache="miss") as record:
+            record["prompt_tokens"], record["completion_tokens"] = 100, 20
+    telemetry.incr("bytes_written", 10, target="json")
+
+
+def _summary_without_timing(telemetry):
+    summary = telemetry.summary()
+    for event in summary["events"]:
+        for field in ("duration_s", "p50_s", "p95_s"):
+            event.pop(field, None)
+    summary.pop("totals")
+    return summary
+
+
+def test_take_and_merge_equals_single_process():
+    single, parent, child = Telemetry(), Telemetry(), Telemetry()
+    _record(single, 2)
+    _record(single, 3)
+    _record(parent, 2)
+    _record(child, 3)
+    parent.aggregator.merge(child.aggregator.take())
+
+    assert _summary_without_timing(parent) == _summary_without_timing(single)
+    assert parent.summary()["totals"]["llm_calls"] == 5
+    # take()는 집계를 비움
+    assert child.summary()["totals"]["llm_calls"] == 0
+
+
+_FORKED = Telemetry()
+
+
+def _child_calls(calls):
+    _FORKED.aggregator.take()
+    _record(_FORKED, calls)
+    return _FORKED.aggregator.take()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="fork 필요")
+def test_merge_from_forked_workers():
+    parent = Telemetry()
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        for state in pool.map(_child_calls, [1, 2, 3]):
+            parent.aggregator.merge(state)
+    totals = parent.summary()["totals"]
+    assert (totals["llm_calls"], totals["prompt_tokens"], totals["completion_tokens"]) == (6, 600, 120)
+    assert parent.summary()["counters"] == [{"name": "bytes_written", "target": "json", "value": 30}]